@@ -1,8 +1,10 @@
+# One certificate per distribution, covering its aliases
 resource "aws_acm_certificate" "redirect" {
+  for_each                  = local.distribution_groups
   provider                  = aws.us-east-1
-  domain_name               = local.redirect_domains[0]
+  domain_name               = each.value[0]
   validation_method         = "DNS"
-  subject_alternative_names = local.redirect_domains
+  subject_alternative_names = each.value
   lifecycle {
     create_before_destroy = true
   }
@@ -18,7 +20,9 @@ resource "aws_acm_certificate" "redirect" {
 resource "aws_route53_record" "cert_validation" {
   provider = aws.us-east-1
   for_each = var.create_certificate_dns_records ? {
-    for dvo in aws_acm_certificate.redirect.domain_validation_options : dvo.domain_name => {
+    for dvo in flatten([
+      for certificate in aws_acm_certificate.redirect : certificate.domain_validation_options
+    ]) : dvo.domain_name => {
       name   = dvo.resource_record_name
       record = dvo.resource_record_value
       type   = dvo.resource_record_type
@@ -34,14 +38,26 @@ resource "aws_route53_record" "cert_validation" {
 }
 
 resource "aws_acm_certificate_validation" "redirect" {
+  for_each        = aws_acm_certificate.redirect
   provider        = aws.us-east-1
-  certificate_arn = aws_acm_certificate.redirect.arn
+  certificate_arn = each.value.arn
 
   # Only specify FQDNs when we create the records ourselves.
   # When create_certificate_dns_records = false, the validation resource
   # will still wait for the certificate to become valid, but relies on
   # existing DNS records created by another module.
   validation_record_fqdns = var.create_certificate_dns_records ? [
-    for d in aws_route53_record.cert_validation : d.fqdn
+    for dvo in each.value.domain_validation_options :
+    aws_route53_record.cert_validation[dvo.domain_name].fqdn
   ] : null
 }
+
+moved {
+  from = aws_acm_certificate.redirect
+  to   = aws_acm_certificate.redirect["0"]
+}
+
+moved {
+  from = aws_acm_certificate_validation.redirect
+  to   = aws_acm_certificate_validation.redirect["0"]
+}
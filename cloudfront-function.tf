@@ -6,6 +6,23 @@
 # Other methods (POST, PUT, DELETE, PATCH) use the method-preserving
 # equivalent (308 or 307) so clients resend the request body with the
 # same method to the new location.
+#
+# Exact-path entries from redirect_map, wildcard redirect_rules, and the
+# per-host and per-country targets are compiled into the function code as
+# object literals. The code size is checked at plan time against the
+# CloudFront Functions limit so an oversized map fails `terraform plan`
+# instead of the publish call.
+#
+# With create_key_value_store, redirect entries live in a CloudFront
+# KeyValueStore associated with the function instead, so they can be
+# updated (tools/kvs_sync.py) without republishing the function.
+
+resource "aws_cloudfront_key_value_store" "redirect" {
+  count = var.create_key_value_store ? 1 : 0
+
+  name    = "redirect-${random_string.this.result}"
+  comment = "Redirect entries for ${var.redirect_to}"
+}
 
 resource "aws_cloudfront_function" "redirect" {
   count = local.use_cloudfront_function ? 1 : 0
@@ -15,14 +32,33 @@ resource "aws_cloudfront_function" "redirect" {
   comment = "Redirect all HTTP methods for ${var.redirect_to}"
   publish = true
 
-  code = templatefile("${path.module}/templates/redirect-all-methods.js.tftpl", {
-    redirect_hostname    = local.redirect_hostname
-    redirect_path        = local.redirect_path != null ? local.redirect_path : ""
-    get_head_status_code = var.permanent_redirect ? 301 : 302
-    other_status_code    = var.permanent_redirect ? 308 : 307
-    response_headers = {
-      for name, value in var.response_headers :
-      lower(name) => jsonencode(value)
+  code = local.cloudfront_function_code
+
+  key_value_store_associations = var.create_key_value_store ? [
+    aws_cloudfront_key_value_store.redirect[0].arn
+  ] : null
+
+  lifecycle {
+    precondition {
+      condition     = local.cloudfront_function_code_size <= local.cloudfront_function_max_code_size
+      error_message = <<-EOT
+        The rendered CloudFront Function is ${local.cloudfront_function_code_size} bytes,
+        which exceeds the ${local.cloudfront_function_max_code_size}-byte CloudFront Functions
+        code size limit. Reduce the number of redirect_map, redirect_rules,
+        host_redirects and geo_redirects entries or shorten their targets (e.g.
+        "/new/path" instead of "${local.redirect_hostname}/new/path"), or use
+        create_key_value_store.
+      EOT
+    }
+    precondition {
+      condition     = local.cloudfront_function_entries <= local.cloudfront_function_max_entries
+      error_message = <<-EOT
+        redirect_map, redirect_rules, host_redirects and geo_redirects (one
+        entry per country) have ${local.cloudfront_function_entries} entries
+        combined. At most
+        ${local.cloudfront_function_max_entries} entries can be compiled
+        into the CloudFront Function without risking its compute-utilization budget.
+      EOT
     }
-  })
+  }
 }
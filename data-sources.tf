@@ -1,3 +1,5 @@
 data "aws_route53_zone" "redirect" {
   zone_id = var.zone_id
 }
+
+data "aws_caller_identity" "current" {}
@@ -15,8 +15,8 @@ resource "aws_route53_record" "extra" {
 
   alias {
     evaluate_target_health = false
-    name                   = aws_cloudfront_distribution.redirect.domain_name
-    zone_id                = aws_cloudfront_distribution.redirect.hosted_zone_id
+    name                   = aws_cloudfront_distribution.redirect[local.redirect_hostname_groups[each.key]].domain_name
+    zone_id                = aws_cloudfront_distribution.redirect[local.redirect_hostname_groups[each.key]].hosted_zone_id
   }
 }
 
@@ -37,8 +37,8 @@ resource "aws_route53_record" "extra_aaaa" {
 
   alias {
     evaluate_target_health = false
-    name                   = aws_cloudfront_distribution.redirect.domain_name
-    zone_id                = aws_cloudfront_distribution.redirect.hosted_zone_id
+    name                   = aws_cloudfront_distribution.redirect[local.redirect_hostname_groups[each.key]].domain_name
+    zone_id                = aws_cloudfront_distribution.redirect[local.redirect_hostname_groups[each.key]].hosted_zone_id
   }
 }
 
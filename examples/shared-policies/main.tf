@@ -0,0 +1,74 @@
+# Shared Policies Example
+#
+# This example shows many redirects in one account sharing a single cache
+# policy and response headers policy. CloudFront limits custom cache policies
+# to 20 per account by default; with shared policies the number of redirects
+# is limited by distributions instead.
+#
+# Usage:
+#   1. Update the zone name to your domain
+#   2. Update the redirects map to your hostnames and targets
+#   3. Run: terraform init && terraform apply
+
+terraform {
+  required_version = ">= 1.1"
+
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = ">= 5.62, < 7.0"
+    }
+  }
+}
+
+# Primary provider - your main region
+provider "aws" {
+  region = "us-west-2"
+}
+
+# Required for ACM certificates (CloudFront requirement)
+provider "aws" {
+  alias  = "us-east-1"
+  region = "us-east-1"
+}
+
+# Look up your existing Route 53 hosted zone
+data "aws_route53_zone" "redirect" {
+  name = "example.com" # Replace with your domain
+}
+
+locals {
+  redirects = {
+    "old-blog" = "blog.target.com"
+    "old-docs" = "docs.target.com"
+    "old-shop" = "shop.target.com"
+  }
+}
+
+# One policy set for all redirects below
+module "redirect_policies" {
+  source  = "registry.infrahouse.com/infrahouse/http-redirect/aws//modules/redirect-policies"
+  version = "2.0.0"
+
+  name_suffix = "shared"
+}
+
+module "http-redirect" {
+  source   = "registry.infrahouse.com/infrahouse/http-redirect/aws"
+  version  = "2.0.0"
+  for_each = local.redirects
+
+  redirect_hostnames = [each.key]
+  redirect_to        = each.value
+  zone_id            = data.aws_route53_zone.redirect.zone_id
+
+  # Use the shared policies instead of creating two per redirect
+  cache_policy_id            = module.redirect_policies.cache_policy_id
+  response_headers_policy_id = module.redirect_policies.response_headers_policy_id
+
+  # Pass both providers to the module
+  providers = {
+    aws           = aws
+    aws.us-east-1 = aws.us-east-1
+  }
+}
@@ -0,0 +1,14 @@
+output "cache_policy_id" {
+  description = "Cache policy shared by all redirects"
+  value       = module.redirect_policies.cache_policy_id
+}
+
+output "response_headers_policy_id" {
+  description = "Response headers policy shared by all redirects"
+  value       = module.redirect_policies.response_headers_policy_id
+}
+
+output "cloudfront_distribution_ids" {
+  description = "CloudFront distribution ID of each redirect"
+  value       = { for name, redirect in module.http-redirect : name => redirect.cloudfront_distribution_id }
+}
@@ -0,0 +1,37 @@
+# Edge cache invalidation when the redirect configuration changes.
+#
+# S3 website redirects are cached for up to redirect_ttl, so a new
+# redirect_to or permanent_redirect would only show up once the cached
+# responses expire. With invalidate_on_change, a change of
+# local.redirect_cache_inputs replaces this resource, and its provisioner
+# runs tools/invalidation.py for each distribution. The tool coalesces
+# invalidation_paths into wildcards that fit the CloudFront invalidation
+# limits and sends them in one request.
+#
+# The provisioner runs on the machine running Terraform, with python3 and
+# boto3 installed and the AWS credentials of its environment. They are not
+# the provider's: with an assume_role provider, invalidation_role_arn
+# makes the tool assume the same role.
+
+resource "terraform_data" "invalidation" {
+  for_each = var.invalidate_on_change ? aws_cloudfront_distribution.redirect : {}
+
+  triggers_replace = {
+    distribution_id = each.value.id
+    config          = sha256(jsonencode(local.redirect_cache_inputs))
+    paths           = var.invalidation_paths
+  }
+
+  provisioner "local-exec" {
+    working_dir = path.module
+    command = join(" ", compact([
+      "python3 -m tools.invalidation ${each.value.id}",
+      "--paths-json \"$INVALIDATION_PATHS\"",
+      var.wait_for_invalidation ? "--wait" : "",
+      var.invalidation_role_arn != null ? "--role-arn ${var.invalidation_role_arn}" : "",
+    ]))
+    environment = {
+      INVALIDATION_PATHS = jsonencode(var.invalidation_paths)
+    }
+  }
+}
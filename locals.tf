@@ -7,38 +7,370 @@ locals {
     }
   )
 
+  # Tags of the distributions and of the resources monitoring them
+  distribution_tags = merge(
+    local.default_module_tags,
+    {
+      module_version : local.module_version
+    }
+  )
+
   # Parse redirect_to into components for routing rule
   # Format: "hostname[/path][?query]"
   redirect_parts = regex("^(?P<hostname>[^/?]+)(?P<path>/[^?]*)?(?P<query>\\?.*)?$", var.redirect_to)
 
+  # The request path is appended to redirect_path and starts with "/", so
+  # trailing slashes are dropped ("example.com/landing/" + "/a" would give
+  # "/landing//a", which the destination may redirect again). Runs of "/"
+  # are collapsed in every configured target. Keep in sync with
+  # tools.cloudfront_function.canonical_target.
   redirect_hostname = local.redirect_parts.hostname
-  redirect_path     = try(local.redirect_parts.path, "")
+  redirect_path     = replace(replace(coalesce(local.redirect_parts.path, "/"), "/\\/{2,}/", "/"), "/\\/+$/", "")
   redirect_query    = try(local.redirect_parts.query, "")
 
+  # All hostname prefixes served: redirect_hostnames, then the host_redirects
+  # hosts not already listed (in key order).
+  redirect_hostnames = distinct(concat(var.redirect_hostnames, keys(var.host_redirects)))
+
   # Construct fully qualified domain names from redirect_hostnames
   # Reduces code duplication across acm.tf, dns.tf, main.tf, and outputs.tf
   redirect_domains = [
-    for record in var.redirect_hostnames :
+    for record in local.redirect_hostnames :
     trimprefix(join(".", [record, data.aws_route53_zone.redirect.name]), ".")
   ]
 
   # Map version for for_each usage in DNS records
   # Key is the hostname prefix, value is the fully qualified domain name
   redirect_domains_map = {
-    for record in var.redirect_hostnames :
+    for record in local.redirect_hostnames :
     record => trimprefix(join(".", [record, data.aws_route53_zone.redirect.name]), ".")
   }
 
+  # Hostnames packed in order into distributions of at most
+  # hosts_per_distribution aliases, each with one certificate for its
+  # aliases. Group "0" is the only one unless there are more hostnames, so
+  # existing deployments keep a single distribution. Appending hostnames
+  # only fills the last group or adds new ones.
+  distribution_groups = {
+    for index, domains in chunklist(local.redirect_domains, var.hosts_per_distribution) :
+    tostring(index) => domains
+  }
+
+  # Distribution group of each hostname prefix (for DNS records)
+  redirect_hostname_groups = {
+    for index, record in local.redirect_hostnames :
+    record => tostring(floor(index / var.hosts_per_distribution))
+  }
+
+  # host_redirects keyed by fully qualified domain name, as the function sees
+  # the Host header. The request path is appended to the targets, so they
+  # are canonicalized like redirect_path.
+  host_redirects = {
+    for record, target in var.host_redirects :
+    local.redirect_domains_map[record] => replace(replace(target, "/\\/{2,}/", "/"), "/\\/+$/", "")
+  }
+
+  # Exact redirect_map targets with runs of "/" collapsed; a trailing slash
+  # is part of the target and kept.
+  redirect_map = {
+    for source, target in var.redirect_map : source => replace(target, "/\\/{2,}/", "/")
+  }
+
+  # geo_redirects compiled for the function: the distinct regional hosts
+  # (country entries, then continent entries, in key order) and each viewer
+  # country => index of its host. A country entry takes precedence over its
+  # continent's. Keep in sync with tools.cloudfront_function.compile_geo_redirects.
+  country_continents = jsondecode(file("${path.module}/templates/country-continents.json"))
+  geo_hosts          = distinct(concat(values(var.geo_redirects.countries), values(var.geo_redirects.continents)))
+  geo_countries      = merge(
+    {
+      for country, continent in local.country_continents :
+      country => index(local.geo_hosts, var.geo_redirects.continents[continent])
+      if contains(keys(var.geo_redirects.continents), continent)
+    },
+    {
+      for country, hostname in var.geo_redirects.countries :
+      country => index(local.geo_hosts, hostname)
+    },
+  )
+
+  # weighted_targets compiled for the function: the hosts and the running
+  # total of their weights, the upper bound of each host's hash buckets.
+  # Keep in sync with tools.cloudfront_function.compile_weighted_targets.
+  weighted_hosts  = [for target in var.weighted_targets : target.host]
+  weighted_bounds = [
+    for index in range(length(var.weighted_targets)) :
+    sum(concat([0], slice(var.weighted_targets[*].weight, 0, index + 1)))
+  ]
+
+  # Per-request target canonicalization (target_canonicalization). S3
+  # routing rules cannot rewrite paths, so it needs the function. Keep in
+  # sync with tools.cloudfront_function.canonical_path.
+  canonicalize_targets = (
+    var.target_canonicalization.trailing_slash != "keep" ||
+    var.target_canonicalization.collapse_slashes ||
+    var.target_canonicalization.lowercase ||
+    length(var.target_canonicalization.index_files) > 0
+  )
+
+  # Viewer headers the function reads; CloudFront only adds them to the
+  # request when they are in the cache (or origin request) policy.
+  cache_key_headers = length(local.geo_countries) > 0 ? ["CloudFront-Viewer-Country"] : []
+
+  # Caching of the redirect status class in use (permanent_redirect):
+  # the edge TTL and the Cache-Control header sent to browsers.
+  redirect_ttl           = var.permanent_redirect ? var.permanent_redirect_ttl : var.temporary_redirect_ttl
+  redirect_cache_control = coalesce(
+    var.permanent_redirect ? var.permanent_redirect_cache_control : var.temporary_redirect_cache_control,
+    local.redirect_ttl > 0 ? "max-age=${local.redirect_ttl}" : "no-store"
+  )
+
+  # What cached S3 redirects depend on; a change triggers an invalidation
+  # with invalidate_on_change (invalidation.tf). Function responses are not
+  # cached, but turning the function off again would serve S3 redirects
+  # cached before it was turned on.
+  redirect_cache_inputs = {
+    redirect_hostname       = local.redirect_hostname
+    redirect_path           = local.redirect_path
+    permanent_redirect      = var.permanent_redirect
+    redirect_ttl            = local.redirect_ttl
+    redirect_cache_control  = local.redirect_cache_control
+    use_cloudfront_function = local.use_cloudfront_function
+  }
+
+  cache_policy_id = (
+    var.cache_policy_id != null ? var.cache_policy_id : module.policies[0].cache_policy_id
+  )
+  response_headers_policy_id = (
+    var.response_headers_policy_id != null ?
+    var.response_headers_policy_id :
+    module.policies[0].response_headers_policy_id
+  )
+
   # Whether to deploy a CloudFront Function for redirect handling.
-  # Required when non-GET methods are enabled or custom response headers are set,
-  # because S3 website hosting cannot handle either of those.
-  use_cloudfront_function = var.allow_non_get_methods || length(var.response_headers) > 0
+  # Required when non-GET methods are enabled, custom response headers are set,
+  # or redirect entries come from a map, per-host or per-viewer targets or a
+  # KeyValueStore, because S3 website hosting cannot handle those. Also
+  # when query strings are handled by the function
+  # (cache_key_query_string_behavior = "function"), so campaign parameters
+  # do not split the cache or reach the S3 origin.
+  # In edge_only mode there is no S3 origin, so the function is always on.
+  use_cloudfront_function = (
+    var.edge_only ||
+    var.allow_non_get_methods ||
+    length(var.response_headers) > 0 ||
+    length(var.redirect_map) > 0 ||
+    length(var.redirect_rules) > 0 ||
+    var.create_key_value_store ||
+    length(var.host_redirects) > 0 ||
+    length(local.geo_countries) > 0 ||
+    length(var.weighted_targets) > 0 ||
+    local.canonicalize_targets ||
+    var.cache_key_query_string_behavior == "function"
+  )
+
+  # Wildcard rules compiled into a source prefix -> target table, e.g.
+  # "/blog/*" => "news.example.com/articles/*" becomes "/blog/" => "...".
+  # The function looks up each "/"-terminated prefix of the request path,
+  # longest first. When several rules share a source, the first one wins.
+  redirect_rules_table = {
+    for source, targets in {
+      for rule in var.redirect_rules : trimsuffix(rule.source, "*") => rule.target...
+    } : source => replace(targets[0], "/\\/{2,}/", "/")
+  }
+
+  # Rendered CloudFront Function code. Kept here (rather than inline in
+  # aws_cloudfront_function.redirect) so the size can be checked at plan time.
+  cloudfront_function_code = templatefile("${path.module}/templates/redirect-all-methods.js.tftpl", {
+    redirect_hostname           = local.redirect_hostname
+    redirect_path               = local.redirect_path
+    get_head_status_code        = var.permanent_redirect ? 301 : 302
+    get_head_status_description = var.permanent_redirect ? "Moved Permanently" : "Found"
+    other_status_code           = var.permanent_redirect ? 308 : 307
+    other_status_description    = var.permanent_redirect ? "Permanent Redirect" : "Temporary Redirect"
+    has_redirect_map            = length(var.redirect_map) > 0
+    redirect_map                = jsonencode(local.redirect_map)
+    has_redirect_rules          = length(local.redirect_rules_table) > 0
+    redirect_rules              = jsonencode(local.redirect_rules_table)
+    has_host_redirects          = length(local.host_redirects) > 0
+    host_redirects              = jsonencode(local.host_redirects)
+    has_geo_redirects           = length(local.geo_countries) > 0
+    geo_hosts                   = jsonencode(local.geo_hosts)
+    geo_countries               = jsonencode(local.geo_countries)
+    has_weighted_targets        = length(var.weighted_targets) > 0
+    weighted_hosts              = jsonencode(local.weighted_hosts)
+    weighted_bounds             = jsonencode(local.weighted_bounds)
+    weighted_target_cookie      = jsonencode(var.weighted_target_cookie)
+    per_viewer_host             = length(local.geo_countries) > 0 || length(var.weighted_targets) > 0
+    canonicalize                = local.canonicalize_targets
+    add_trailing_slash          = var.target_canonicalization.trailing_slash == "add"
+    remove_trailing_slash       = var.target_canonicalization.trailing_slash == "remove"
+    collapse_slashes            = var.target_canonicalization.collapse_slashes
+    lowercase_path              = var.target_canonicalization.lowercase
+    has_index_files             = length(var.target_canonicalization.index_files) > 0
+    index_files                 = jsonencode(var.target_canonicalization.index_files)
+    use_key_value_store         = var.create_key_value_store
+    cache_control               = jsonencode(local.redirect_cache_control)
+    response_headers = {
+      for name, value in var.response_headers :
+      lower(name) => jsonencode(value)
+    }
+    diagnostics = var.diagnostics_headers
+  })
+
+  # CloudFront Functions limits. The code size limit is a hard service quota;
+  # base64 length * 3/4 gives the UTF-8 byte count (plus at most two bytes of
+  # padding), whereas length() on the code itself would count characters.
+  # The entry limit keeps the per-request cost of evaluating the redirect map,
+  # rule and host literals well within the function compute-utilization budget.
+  cloudfront_function_max_code_size = 10240
+  cloudfront_function_code_size     = length(base64encode(local.cloudfront_function_code)) * 3 / 4
+  cloudfront_function_max_entries   = 500
+  cloudfront_function_entries       = length(var.redirect_map) + length(local.redirect_rules_table) + length(var.host_redirects) + length(local.geo_countries)
+
+  # Logs go to the bucket this module creates, or to an existing bucket
+  # (cloudfront_logging_bucket_name) shared by several instances, each
+  # writing under its own cloudfront_logging_prefix.
+  cloudfront_logging_enabled = var.create_logging_bucket || var.cloudfront_logging_bucket_name != null
+  create_logs_bucket         = var.create_logging_bucket && var.cloudfront_logging_bucket_name == null
+
+  # Name of the bucket this module creates; also the base of per-instance
+  # resource names (Glue database), which must not collide in a shared bucket.
+  cloudfront_logs_default_bucket_name = "${replace(data.aws_route53_zone.redirect.name, ".", "-")}-cf-logs-${random_string.this.result}"
+  cloudfront_logs_bucket_name         = (
+    var.cloudfront_logging_bucket_name != null ?
+    var.cloudfront_logging_bucket_name :
+    local.cloudfront_logs_default_bucket_name
+  )
+  cloudfront_logs_bucket_arn = (
+    local.create_logs_bucket ?
+    module.cloudfront_logs_bucket[0].bucket_arn :
+    "arn:aws:s3:::${local.cloudfront_logs_bucket_name}"
+  )
 
   # CloudFront logging bucket domain name (for logging_config)
   # Format: bucket-name.s3.amazonaws.com
   cloudfront_logging_bucket = (
-    var.create_logging_bucket ?
+    local.create_logs_bucket ?
     module.cloudfront_logs_bucket[0].bucket_domain_name :
-    null
+    local.cloudfront_logging_enabled ? "${local.cloudfront_logs_bucket_name}.s3.amazonaws.com" : null
+  )
+
+  # Statement IDs must be unique when the policies of several instances
+  # sharing a bucket are combined (source_policy_documents).
+  cloudfront_logs_sid_suffix = var.cloudfront_logging_bucket_name != null ? random_string.this.result : ""
+
+  cloudfront_parquet_logs = local.cloudfront_logging_enabled && var.cloudfront_logging_format == "parquet"
+
+  # Parquet logs (standard logging v2) are delivered to Hive-style hour
+  # partitions under cloudfront_logging_prefix.
+  cloudfront_log_prefix      = trimsuffix(var.cloudfront_logging_prefix, "/")
+  cloudfront_log_suffix_path = join("/", compact([
+    local.cloudfront_log_prefix, "year={yyyy}/month={MM}/day={dd}/hour={HH}"
+  ]))
+  cloudfront_log_location = "s3://${join("/", compact([local.cloudfront_logs_bucket_name, local.cloudfront_log_prefix]))}/"
+
+  # Fields of Parquet logs, in delivery order. CloudFront field names are not
+  # valid Athena column names, so the Glue table reads columns by position
+  # under sanitized names. Keep in sync with tools/log_converter.py.
+  cloudfront_log_all_fields = [
+    "date", "time", "x-edge-location", "sc-bytes", "c-ip", "cs-method",
+    "cs(Host)", "cs-uri-stem", "sc-status", "cs(Referer)", "cs(User-Agent)",
+    "cs-uri-query", "cs(Cookie)", "x-edge-result-type", "x-edge-request-id",
+    "x-host-header", "cs-protocol", "cs-bytes", "time-taken", "x-forwarded-for",
+    "ssl-protocol", "ssl-cipher", "x-edge-response-result-type",
+    "cs-protocol-version", "fle-status", "fle-encrypted-fields", "c-port",
+    "time-to-first-byte", "x-edge-detailed-result-type", "sc-content-type",
+    "sc-content-len", "sc-range-start", "sc-range-end",
+  ]
+  cloudfront_log_fields = [
+    for field in local.cloudfront_log_all_fields : field
+    if var.cloudfront_logging_include_cookies || field != "cs(Cookie)"
+  ]
+  cloudfront_log_columns = [
+    for field in local.cloudfront_log_fields : trim(replace(lower(field), "/[^0-9a-z]+/", "_"), "_")
+  ]
+
+  # CloudWatch alarms of create_monitoring (monitoring.tf). Keep in sync with
+  # tools.monitoring.ALARMS. Origin metrics only exist with an S3 origin, and
+  # function metrics only with the CloudFront Function.
+  monitoring_distribution_alarms = merge(
+    var.edge_only ? {} : {
+      origin_latency = {
+        metric_name         = "OriginLatency"
+        statistic           = "p90"
+        evaluation_periods  = 3
+        datapoints_to_alarm = 2
+        threshold           = var.monitoring_thresholds.origin_latency_ms
+        description         = "p90 origin latency of cache misses above ${var.monitoring_thresholds.origin_latency_ms} ms"
+      }
+    },
+    {
+      error_5xx_rate = {
+        metric_name         = "5xxErrorRate"
+        statistic           = "Average"
+        evaluation_periods  = 3
+        datapoints_to_alarm = 2
+        threshold           = var.monitoring_thresholds.error_5xx_rate
+        description         = "More than ${var.monitoring_thresholds.error_5xx_rate}% of responses are 5xx errors"
+      }
+    },
+  )
+  monitoring_function_alarms = local.use_cloudfront_function ? {
+    function_compute_utilization = {
+      metric_name         = "FunctionComputeUtilization"
+      statistic           = "Maximum"
+      evaluation_periods  = 3
+      datapoints_to_alarm = 2
+      threshold           = var.monitoring_thresholds.function_compute_utilization
+      description         = "CloudFront Function compute utilization above ${var.monitoring_thresholds.function_compute_utilization}%"
+    }
+    function_throttles = {
+      metric_name         = "FunctionThrottles"
+      statistic           = "Sum"
+      evaluation_periods  = 1
+      datapoints_to_alarm = 1
+      threshold           = var.monitoring_thresholds.function_throttles
+      description         = "More than ${var.monitoring_thresholds.function_throttles} CloudFront Function invocations throttled"
+    }
+  } : {}
+
+  # Each distribution alarm for each distribution group
+  monitoring_alarms_by_distribution = {
+    for pair in setproduct(keys(local.distribution_groups), keys(local.monitoring_distribution_alarms)) :
+    "${pair[1]}-${pair[0]}" => merge(
+      local.monitoring_distribution_alarms[pair[1]], { name = pair[1], group = pair[0] }
+    )
+  }
+
+  # Dashboard metrics, by widget of templates/dashboard.json.tftpl: each
+  # metric for each distribution (in group key order) or for the function.
+  # Keep in sync with tools.monitoring.dashboard_variables().
+  monitoring_distribution_ids  = [for distribution in aws_cloudfront_distribution.redirect : distribution.id]
+  monitoring_function_name     = one(aws_cloudfront_function.redirect[*].name)
+  monitoring_dashboard_metrics = merge(
+    {
+      for widget, names in {
+        requests         = ["Requests"]
+        error_rates      = ["4xxErrorRate", "5xxErrorRate"]
+        cache_hit_rate   = ["CacheHitRate"]
+        origin_latency   = ["OriginLatency"]
+        bytes_downloaded = ["BytesDownloaded"]
+      } :
+      widget => jsonencode([
+        for pair in setproduct(names, local.monitoring_distribution_ids) :
+        ["AWS/CloudFront", pair[0], "DistributionId", pair[1], "Region", "Global"]
+      ])
+    },
+    {
+      for widget, names in {
+        function_utilization = ["FunctionComputeUtilization"]
+        function_invocations = ["FunctionInvocations", "FunctionThrottles", "FunctionExecutionErrors"]
+      } :
+      widget => jsonencode([
+        for name in names :
+        ["AWS/CloudFront", name, "FunctionName", coalesce(local.monitoring_function_name, "-"), "Region", "Global"]
+      ])
+    },
   )
 }
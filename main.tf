@@ -4,78 +4,57 @@ resource "random_string" "this" {
   upper   = false
 }
 
-# Cache policy for redirect behavior
-# Forwards query strings to preserve them in redirects
-resource "aws_cloudfront_cache_policy" "redirect" {
-  name        = "redirect-cache-policy-${random_string.this.result}"
-  comment     = "Cache policy for HTTP redirect module"
-  min_ttl     = 0
-  default_ttl = 86400
-  max_ttl     = 31536000
+# Cache and security headers policies, unless supplied by the caller (for
+# example one set shared by many instances, see modules/redirect-policies).
+module "policies" {
+  count  = var.cache_policy_id == null || var.response_headers_policy_id == null ? 1 : 0
+  source = "./modules/redirect-policies"
 
-  parameters_in_cache_key_and_forwarded_to_origin {
-    query_strings_config {
-      query_string_behavior = "all"
-    }
-    headers_config {
-      header_behavior = "none"
-    }
-    cookies_config {
-      cookie_behavior = "none"
-    }
-  }
-}
-
-# Security headers policy for redirect responses
-resource "aws_cloudfront_response_headers_policy" "security_headers" {
-  name    = "redirect-security-headers-${random_string.this.result}"
-  comment = "Security headers policy for HTTP redirect module"
-
-  security_headers_config {
-    strict_transport_security {
-      access_control_max_age_sec = 31536000
-      include_subdomains         = true
-      preload                    = true
-      override                   = true
-    }
-
-    content_type_options {
-      override = true
-    }
+  name_suffix                    = random_string.this.result
+  create_cache_policy            = var.cache_policy_id == null
+  create_response_headers_policy = var.response_headers_policy_id == null
 
-    frame_options {
-      frame_option = "DENY"
-      override     = true
-    }
+  default_ttl       = local.redirect_ttl
+  cache_control     = local.redirect_cache_control
+  cache_key_headers = local.cache_key_headers
+  server_timing     = var.diagnostics_headers
+}
 
-    referrer_policy {
-      referrer_policy = "strict-origin-when-cross-origin"
-      override        = true
-    }
+moved {
+  from = aws_cloudfront_cache_policy.redirect
+  to   = module.policies[0].aws_cloudfront_cache_policy.redirect[0]
+}
 
-    xss_protection {
-      mode_block = true
-      protection = true
-      override   = true
-    }
-  }
+moved {
+  from = aws_cloudfront_response_headers_policy.security_headers
+  to   = module.policies[0].aws_cloudfront_response_headers_policy.security_headers[0]
 }
 
+# One distribution per group of hostnames (see local.distribution_groups),
+# all with the same origin, policies and function.
 resource "aws_cloudfront_distribution" "redirect" {
+  for_each            = local.distribution_groups
   enabled             = true
   is_ipv6_enabled     = true
   default_root_object = ""
   price_class         = var.cloudfront_price_class
   web_acl_id          = var.web_acl_id
 
+  # S3 website endpoint holding the routing rules. In edge_only mode the
+  # CloudFront Function answers every request and the origin is never
+  # contacted, but a distribution needs one: point it at the target host.
   origin {
-    domain_name = aws_s3_bucket_website_configuration.redirect.website_endpoint
+    domain_name = (
+      var.edge_only ?
+      local.redirect_hostname :
+      aws_s3_bucket_website_configuration.redirect[0].website_endpoint
+    )
     origin_id   = "redirect-origin"
 
     custom_origin_config {
       http_port              = 80
       https_port             = 443
-      origin_protocol_policy = "http-only"
+      origin_protocol_policy = var.edge_only ? "https-only" : "http-only"
       origin_ssl_protocols   = ["TLSv1.2"]
     }
   }
@@ -86,9 +65,9 @@ resource "aws_cloudfront_distribution" "redirect" {
     ] : ["GET", "HEAD"]
     cached_methods             = ["GET", "HEAD"]
     target_origin_id           = "redirect-origin"
-    viewer_protocol_policy     = "redirect-to-https"
-    cache_policy_id            = aws_cloudfront_cache_policy.redirect.id
-    response_headers_policy_id = aws_cloudfront_response_headers_policy.security_headers.id
+    viewer_protocol_policy     = var.single_hop_http_redirect ? "allow-all" : "redirect-to-https"
+    cache_policy_id            = local.cache_policy_id
+    response_headers_policy_id = local.response_headers_policy_id
 
     dynamic "function_association" {
       for_each = local.use_cloudfront_function ? [1] : []
@@ -100,8 +79,9 @@ resource "aws_cloudfront_distribution" "redirect" {
   }
 
   # Logging enabled by default for compliance (ISO 27001, SOC 2)
+  # (cloudfront_logging_format = "parquet" uses standard logging v2, see s3-logs.tf)
   dynamic "logging_config" {
-    for_each = var.create_logging_bucket ? [1] : []
+    for_each = local.cloudfront_logging_enabled && var.cloudfront_logging_format == "legacy" ? [1] : []
     content {
       bucket          = local.cloudfront_logging_bucket
       include_cookies = var.cloudfront_logging_include_cookies
@@ -110,7 +90,7 @@ resource "aws_cloudfront_distribution" "redirect" {
   }
   #
   viewer_certificate {
-    acm_certificate_arn      = aws_acm_certificate_validation.redirect.certificate_arn
+    acm_certificate_arn      = aws_acm_certificate_validation.redirect[each.key].certificate_arn
     ssl_support_method       = "sni-only"
     minimum_protocol_version = "TLSv1.2_2021"
   }
@@ -121,12 +101,12 @@ resource "aws_cloudfront_distribution" "redirect" {
     }
   }
 
-  aliases    = local.redirect_domains
+  aliases    = each.value
   depends_on = [module.cloudfront_logs_bucket]
-  tags = merge(
-    local.default_module_tags,
-    {
-      module_version : local.module_version
-    }
-  )
+  tags       = local.distribution_tags
+}
+
+moved {
+  from = aws_cloudfront_distribution.redirect
+  to   = aws_cloudfront_distribution.redirect["0"]
 }
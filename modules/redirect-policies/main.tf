@@ -0,0 +1,89 @@
+# Cache policy for redirect behavior
+# S3 website redirects carry no Cache-Control header, so default_ttl is the
+# edge TTL of the redirects.
+# Query strings are forwarded so S3 website redirects preserve them. Every
+# parameter is part of the cache key: a cached S3 redirect carries the query
+# string it was built for. CloudFront Function responses are not cached.
+# Headers are only in the cache key for the function: CloudFront adds
+# CloudFront-Viewer-* headers to requests when the policy includes them.
+resource "aws_cloudfront_cache_policy" "redirect" {
+  count       = var.create_cache_policy ? 1 : 0
+  name        = "redirect-cache-policy-${var.name_suffix}"
+  comment     = "Cache policy for HTTP redirect module"
+  min_ttl     = 0
+  default_ttl = var.default_ttl
+  max_ttl     = 31536000
+
+  parameters_in_cache_key_and_forwarded_to_origin {
+    query_strings_config {
+      query_string_behavior = "all"
+    }
+    headers_config {
+      header_behavior = length(var.cache_key_headers) > 0 ? "whitelist" : "none"
+      dynamic "headers" {
+        for_each = length(var.cache_key_headers) > 0 ? [1] : []
+        content {
+          items = var.cache_key_headers
+        }
+      }
+    }
+    cookies_config {
+      cookie_behavior = "none"
+    }
+  }
+}
+
+# Security headers policy for redirect responses
+resource "aws_cloudfront_response_headers_policy" "security_headers" {
+  count   = var.create_response_headers_policy ? 1 : 0
+  name    = "redirect-security-headers-${var.name_suffix}"
+  comment = "Security headers policy for HTTP redirect module"
+
+  security_headers_config {
+    strict_transport_security {
+      access_control_max_age_sec = 31536000
+      include_subdomains         = true
+      preload                    = true
+      override                   = true
+    }
+
+    content_type_options {
+      override = true
+    }
+
+    frame_options {
+      frame_option = "DENY"
+      override     = true
+    }
+
+    referrer_policy {
+      referrer_policy = "strict-origin-when-cross-origin"
+      override        = true
+    }
+
+    xss_protection {
+      mode_block = true
+      protection = true
+      override   = true
+    }
+  }
+
+  # Diagnostics for real-user monitoring (Server-Timing), on every response
+  dynamic "server_timing_headers_config" {
+    for_each = var.server_timing ? [1] : []
+    content {
+      enabled       = true
+      sampling_rate = 100
+    }
+  }
+
+  # Browser caching of S3 website redirects. The CloudFront Function sets
+  # its own value, which is kept (override = false).
+  custom_headers_config {
+    items {
+      header   = "Cache-Control"
+      value    = var.cache_control
+      override = false
+    }
+  }
+}
@@ -0,0 +1,9 @@
+output "cache_policy_id" {
+  description = "ID of the cache policy (null if create_cache_policy is false)"
+  value       = var.create_cache_policy ? aws_cloudfront_cache_policy.redirect[0].id : null
+}
+
+output "response_headers_policy_id" {
+  description = "ID of the response headers policy (null if create_response_headers_policy is false)"
+  value       = var.create_response_headers_policy ? aws_cloudfront_response_headers_policy.security_headers[0].id : null
+}
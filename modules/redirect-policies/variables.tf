@@ -0,0 +1,88 @@
+variable "name_suffix" {
+  description = <<-EOT
+    Suffix of the policy names: redirect-cache-policy-<name_suffix> and
+    redirect-security-headers-<name_suffix>. Policy names are unique per account.
+  EOT
+  type        = string
+
+  validation {
+    condition     = can(regex("^[A-Za-z0-9_-]{1,40}$", var.name_suffix))
+    error_message = "name_suffix must be 1-40 letters, digits, hyphens or underscores."
+  }
+}
+
+variable "create_cache_policy" {
+  description = "Create the cache policy"
+  type        = bool
+  default     = true
+}
+
+variable "create_response_headers_policy" {
+  description = "Create the response headers policy"
+  type        = bool
+  default     = true
+}
+
+variable "default_ttl" {
+  description = <<-EOT
+    Edge TTL of redirects, in seconds. Match permanent_redirect_ttl (or
+    temporary_redirect_ttl with permanent_redirect = false) of the instances
+    using the policy.
+  EOT
+  type        = number
+  default     = 86400
+
+  validation {
+    condition = (
+      var.default_ttl >= 0 &&
+      var.default_ttl <= 31536000 &&
+      floor(var.default_ttl) == var.default_ttl
+    )
+    error_message = <<-EOT
+      default_ttl must be a whole number of seconds between 0 and 31536000 (one year).
+    EOT
+  }
+}
+
+variable "cache_control" {
+  description = <<-EOT
+    Cache-Control header added to redirects that do not have one (S3 website
+    redirects). Match the Cache-Control the instances' CloudFront Functions send.
+  EOT
+  type        = string
+  default     = "max-age=86400"
+
+  validation {
+    condition     = can(regex("^[^\r\n]+$", var.cache_control))
+    error_message = "cache_control must be a non-empty single-line header value."
+  }
+}
+
+variable "server_timing" {
+  description = <<-EOT
+    Add CloudFront's Server-Timing header to responses: cache hit or miss,
+    origin DNS, connect and first-byte times, the edge location (cdn-pop)
+    and the request ID (cdn-rid). Enable it when the http-redirect module
+    instances using the policy set diagnostics_headers.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "cache_key_headers" {
+  description = <<-EOT
+    Request headers in the cache key, e.g. ["CloudFront-Viewer-Country"] for
+    http-redirect module instances with geo_redirects. CloudFront adds
+    CloudFront-Viewer-* headers to requests, where the CloudFront Function
+    reads them, only when the policy includes them.
+  EOT
+  type        = list(string)
+  default     = []
+
+  validation {
+    condition     = length(var.cache_key_headers) <= 10
+    error_message = <<-EOT
+      cache_key_headers can have at most 10 names (CloudFront cache policy quota).
+    EOT
+  }
+}
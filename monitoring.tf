@@ -0,0 +1,97 @@
+# Opt-in observability (create_monitoring): CloudFront additional metrics,
+# CloudWatch alarms and a dashboard.
+#
+# CloudFront publishes its metrics, and those of CloudFront Functions, in
+# us-east-1 with the dimension Region = Global, so the alarms and the
+# dashboard live there too. Alarm definitions are in
+# local.monitoring_distribution_alarms and local.monitoring_function_alarms;
+# tools/monitoring.py replays recorded metric samples through them to tune
+# monitoring_thresholds, and renders the dashboard offline.
+
+# Additional metrics: cache hit rate, origin latency and error rates by
+# status code (401, 403, 404, 502, 503, 504).
+resource "aws_cloudfront_monitoring_subscription" "redirect" {
+  for_each        = var.create_monitoring ? aws_cloudfront_distribution.redirect : {}
+  distribution_id = each.value.id
+
+  monitoring_subscription {
+    realtime_metrics_subscription_config {
+      realtime_metrics_subscription_status = "Enabled"
+    }
+  }
+}
+
+resource "aws_cloudwatch_metric_alarm" "distribution" {
+  provider = aws.us-east-1
+  for_each = var.create_monitoring ? local.monitoring_alarms_by_distribution : {}
+
+  alarm_name        = "http-redirect-${random_string.this.result}-${each.value.group}-${replace(each.value.name, "_", "-")}"
+  alarm_description = "${each.value.description} on ${join(", ", local.distribution_groups[each.value.group])}"
+
+  namespace   = "AWS/CloudFront"
+  metric_name = each.value.metric_name
+  dimensions  = {
+    DistributionId = aws_cloudfront_distribution.redirect[each.value.group].id
+    Region         = "Global"
+  }
+  # Percentiles (p90) are extended statistics
+  statistic          = startswith(each.value.statistic, "p") ? null : each.value.statistic
+  extended_statistic = startswith(each.value.statistic, "p") ? each.value.statistic : null
+  period             = 300
+
+  comparison_operator = "GreaterThanThreshold"
+  threshold           = each.value.threshold
+  evaluation_periods  = each.value.evaluation_periods
+  datapoints_to_alarm = each.value.datapoints_to_alarm
+  # No requests, no datapoints: a quiet redirect is a healthy one.
+  treat_missing_data = "notBreaching"
+
+  alarm_actions = var.alarm_actions
+  ok_actions    = var.alarm_actions
+  tags          = local.distribution_tags
+
+  # Additional metrics are published only once the subscription is enabled.
+  depends_on = [aws_cloudfront_monitoring_subscription.redirect]
+}
+
+resource "aws_cloudwatch_metric_alarm" "function" {
+  provider = aws.us-east-1
+  for_each = var.create_monitoring ? local.monitoring_function_alarms : {}
+
+  alarm_name        = "http-redirect-${random_string.this.result}-${replace(each.key, "_", "-")}"
+  alarm_description = "${each.value.description} (${aws_cloudfront_function.redirect[0].name})"
+
+  namespace   = "AWS/CloudFront"
+  metric_name = each.value.metric_name
+  dimensions  = {
+    FunctionName = aws_cloudfront_function.redirect[0].name
+    Region       = "Global"
+  }
+  statistic = each.value.statistic
+  period    = 300
+
+  comparison_operator = "GreaterThanThreshold"
+  threshold           = each.value.threshold
+  evaluation_periods  = each.value.evaluation_periods
+  datapoints_to_alarm = each.value.datapoints_to_alarm
+  treat_missing_data  = "notBreaching"
+
+  alarm_actions = var.alarm_actions
+  ok_actions    = var.alarm_actions
+  tags          = local.distribution_tags
+}
+
+# CloudWatch dashboards take no tags.
+resource "aws_cloudwatch_dashboard" "redirect" {
+  provider = aws.us-east-1
+  count    = var.create_monitoring ? 1 : 0
+
+  dashboard_name = "http-redirect-${random_string.this.result}"
+  dashboard_body = templatefile("${path.module}/templates/dashboard.json.tftpl", {
+    region       = "us-east-1"
+    has_origin   = !var.edge_only
+    use_function = local.use_cloudfront_function
+    metrics      = local.monitoring_dashboard_metrics
+    thresholds   = var.monitoring_thresholds
+  })
+}
@@ -1,35 +1,52 @@
 output "cloudfront_distribution_id" {
-  description = "The identifier for the CloudFront distribution"
-  value       = aws_cloudfront_distribution.redirect.id
+  description = "The identifier for the CloudFront distribution (the first one when hostnames span several, see cloudfront_distributions)"
+  value       = aws_cloudfront_distribution.redirect["0"].id
 }
 
 output "cloudfront_distribution_arn" {
-  description = "The ARN (Amazon Resource Name) for the CloudFront distribution"
-  value       = aws_cloudfront_distribution.redirect.arn
+  description = "The ARN (Amazon Resource Name) for the CloudFront distribution (the first one when hostnames span several)"
+  value       = aws_cloudfront_distribution.redirect["0"].arn
 }
 
 output "cloudfront_domain_name" {
-  description = "The domain name corresponding to the CloudFront distribution (e.g., d111111abcdef8.cloudfront.net)"
-  value       = aws_cloudfront_distribution.redirect.domain_name
+  description = "The domain name corresponding to the CloudFront distribution (e.g., d111111abcdef8.cloudfront.net; the first one when hostnames span several)"
+  value       = aws_cloudfront_distribution.redirect["0"].domain_name
+}
+
+output "cloudfront_distributions" {
+  description = "All CloudFront distributions, by group index (\"0\", \"1\", ...): id, arn, domain_name and the aliases each one serves"
+  value = {
+    for group, distribution in aws_cloudfront_distribution.redirect : group => {
+      id          = distribution.id
+      arn         = distribution.arn
+      domain_name = distribution.domain_name
+      aliases     = local.distribution_groups[group]
+    }
+  }
 }
 
 output "s3_bucket_name" {
-  description = "The name of the S3 bucket used as the redirect origin"
-  value       = aws_s3_bucket.redirect.id
+  description = "The name of the S3 bucket used as the redirect origin (null if edge_only is true)"
+  value       = var.edge_only ? null : aws_s3_bucket.redirect[0].id
 }
 
 output "s3_bucket_arn" {
-  description = "The ARN of the S3 bucket used as the redirect origin"
-  value       = aws_s3_bucket.redirect.arn
+  description = "The ARN of the S3 bucket used as the redirect origin (null if edge_only is true)"
+  value       = var.edge_only ? null : aws_s3_bucket.redirect[0].arn
 }
 
 output "acm_certificate_arn" {
-  description = "The ARN of the ACM certificate used by CloudFront (provisioned in us-east-1)"
-  value       = aws_acm_certificate.redirect.arn
+  description = "The ARN of the ACM certificate used by CloudFront (provisioned in us-east-1; the first one when hostnames span several distributions)"
+  value       = aws_acm_certificate.redirect["0"].arn
+}
+
+output "acm_certificate_arns" {
+  description = "ARNs of the ACM certificates, by distribution group index"
+  value       = { for group, certificate in aws_acm_certificate.redirect : group => certificate.arn }
 }
 
 output "redirect_domains" {
-  description = "List of fully qualified domain names that redirect to the target (computed from redirect_hostnames and zone)"
+  description = "List of fully qualified domain names that redirect to the target (computed from redirect_hostnames, host_redirects and zone)"
   value       = local.redirect_domains
 }
 
@@ -71,11 +88,63 @@ output "caa_records" {
 }
 
 output "cloudfront_logs_bucket_name" {
-  description = "Name of the S3 bucket for CloudFront access logs (null if logging disabled)"
-  value       = var.create_logging_bucket ? module.cloudfront_logs_bucket[0].bucket_name : null
+  description = "Name of the S3 bucket for CloudFront access logs, created or shared (null if logging disabled)"
+  value       = local.cloudfront_logging_enabled ? local.cloudfront_logs_bucket_name : null
 }
 
 output "cloudfront_logs_bucket_arn" {
-  description = "ARN of the S3 bucket for CloudFront access logs (null if logging disabled)"
-  value       = var.create_logging_bucket ? module.cloudfront_logs_bucket[0].bucket_arn : null
+  description = "ARN of the S3 bucket for CloudFront access logs, created or shared (null if logging disabled)"
+  value       = local.cloudfront_logging_enabled ? local.cloudfront_logs_bucket_arn : null
+}
+
+output "cloudfront_logs_bucket_policy_json" {
+  description = "Bucket policy letting CloudFront write this instance's logs under cloudfront_logging_prefix; combine into the policy of a shared bucket (null if logging disabled)"
+  value       = local.cloudfront_logging_enabled ? data.aws_iam_policy_document.cloudfront_logs[0].json : null
+}
+
+output "cloudfront_logs_table" {
+  description = "Glue table over the Parquet access logs as database.table, for Athena (null if create_log_table is false)"
+  value = (
+    var.create_log_table ?
+    "${aws_glue_catalog_table.cloudfront_logs[0].database_name}.${aws_glue_catalog_table.cloudfront_logs[0].name}" :
+    null
+  )
+}
+
+output "cache_policy_id" {
+  description = "ID of the CloudFront cache policy of the distribution (created or supplied)"
+  value       = local.cache_policy_id
+}
+
+output "response_headers_policy_id" {
+  description = "ID of the CloudFront response headers policy of the distribution (created or supplied)"
+  value       = local.response_headers_policy_id
+}
+
+output "key_value_store_arn" {
+  description = "ARN of the CloudFront KeyValueStore holding redirect entries (null if create_key_value_store is false)"
+  value       = var.create_key_value_store ? aws_cloudfront_key_value_store.redirect[0].arn : null
+}
+
+output "key_value_store_id" {
+  description = "ID of the CloudFront KeyValueStore holding redirect entries (null if create_key_value_store is false)"
+  value       = var.create_key_value_store ? aws_cloudfront_key_value_store.redirect[0].id : null
+}
+
+output "cloudfront_function_name" {
+  description = "Name of the CloudFront Function answering viewer requests (null if the module uses S3 website redirects only)"
+  value       = local.monitoring_function_name
+}
+
+output "monitoring_dashboard_name" {
+  description = "Name of the CloudWatch dashboard in us-east-1 (null if create_monitoring is false)"
+  value       = var.create_monitoring ? aws_cloudwatch_dashboard.redirect[0].dashboard_name : null
+}
+
+output "monitoring_alarm_arns" {
+  description = "ARNs of the CloudWatch alarms in us-east-1, by alarm name (empty if create_monitoring is false)"
+  value = merge(
+    { for alarm in aws_cloudwatch_metric_alarm.distribution : alarm.alarm_name => alarm.arn },
+    { for alarm in aws_cloudwatch_metric_alarm.function : alarm.alarm_name => alarm.arn },
+  )
 }
@@ -1,9 +1,12 @@
-# IAM policy document for CloudFront log delivery
+# IAM policy document for CloudFront log delivery, limited to this instance's
+# prefix. Applied to the bucket this module creates; for a shared bucket
+# (cloudfront_logging_bucket_name) it is the cloudfront_logs_bucket_policy_json
+# output, to be combined into the bucket policy by its owner.
 data "aws_iam_policy_document" "cloudfront_logs" {
-  count = var.create_logging_bucket ? 1 : 0
+  count = local.cloudfront_logging_enabled ? 1 : 0
 
   statement {
-    sid    = "AWSCloudFrontLogsWrite"
+    sid    = "AWSCloudFrontLogsWrite${local.cloudfront_logs_sid_suffix}"
     effect = "Allow"
 
     principals {
@@ -14,24 +17,74 @@ data "aws_iam_policy_document" "cloudfront_logs" {
     actions = ["s3:PutObject"]
 
     resources = [
-      "arn:aws:s3:::${replace(data.aws_route53_zone.redirect.name, ".", "-")}-cf-logs-${random_string.this.result}/*"
+      "arn:aws:s3:::${local.cloudfront_logs_bucket_name}/${var.cloudfront_logging_prefix}*"
     ]
 
     # Note: We don't add AWS:SourceArn condition here to avoid circular dependency
     # (CloudFront ARN depends on logging bucket, which depends on policy, which would depend on CloudFront)
     # The bucket is still secure as only CloudFront service can write to it
   }
+
+  # Standard logging v2 (Parquet) is delivered by CloudWatch Logs
+  dynamic "statement" {
+    for_each = local.cloudfront_parquet_logs ? [1] : []
+    content {
+      sid    = "AWSLogDeliveryWrite${local.cloudfront_logs_sid_suffix}"
+      effect = "Allow"
+
+      principals {
+        type        = "Service"
+        identifiers = ["delivery.logs.amazonaws.com"]
+      }
+
+      actions   = ["s3:PutObject"]
+      resources = ["arn:aws:s3:::${local.cloudfront_logs_bucket_name}/${var.cloudfront_logging_prefix}*"]
+
+      condition {
+        test     = "StringEquals"
+        variable = "s3:x-amz-acl"
+        values   = ["bucket-owner-full-control"]
+      }
+      condition {
+        test     = "StringEquals"
+        variable = "aws:SourceAccount"
+        values   = [data.aws_caller_identity.current.account_id]
+      }
+    }
+  }
+
+  dynamic "statement" {
+    for_each = local.cloudfront_parquet_logs ? [1] : []
+    content {
+      sid    = "AWSLogDeliveryAclCheck${local.cloudfront_logs_sid_suffix}"
+      effect = "Allow"
+
+      principals {
+        type        = "Service"
+        identifiers = ["delivery.logs.amazonaws.com"]
+      }
+
+      actions   = ["s3:GetBucketAcl"]
+      resources = ["arn:aws:s3:::${local.cloudfront_logs_bucket_name}"]
+
+      condition {
+        test     = "StringEquals"
+        variable = "aws:SourceAccount"
+        values   = [data.aws_caller_identity.current.account_id]
+      }
+    }
+  }
 }
 
 # S3 bucket for CloudFront access logs
 # Uses infrahouse/s3-bucket/aws module for compliance and best practices
 module "cloudfront_logs_bucket" {
-  count   = var.create_logging_bucket ? 1 : 0
+  count   = local.create_logs_bucket ? 1 : 0
   source  = "registry.infrahouse.com/infrahouse/s3-bucket/aws"
   version = "0.3.1"
 
   # Use zone name for bucket naming (not redirect_domains which may start with "")
-  bucket_name = "${replace(data.aws_route53_zone.redirect.name, ".", "-")}-cf-logs-${random_string.this.result}"
+  bucket_name = local.cloudfront_logs_bucket_name
 
   # Allow bucket deletion with contents in test/dev environments
   force_destroy = var.cloudfront_logging_bucket_force_destroy
@@ -52,3 +105,117 @@ module "cloudfront_logs_bucket" {
     }
   )
 }
+
+# Standard logging v2: Parquet access logs in Hive-style hour partitions.
+# CloudFront log delivery is configured in us-east-1, like the distribution.
+resource "aws_cloudwatch_log_delivery_source" "cloudfront" {
+  for_each = local.cloudfront_parquet_logs ? local.distribution_groups : {}
+  provider = aws.us-east-1
+
+  name         = "cf-${aws_cloudfront_distribution.redirect[each.key].id}"
+  log_type     = "ACCESS_LOGS"
+  resource_arn = aws_cloudfront_distribution.redirect[each.key].arn
+  tags         = local.default_module_tags
+}
+
+resource "aws_cloudwatch_log_delivery_destination" "cloudfront" {
+  count    = local.cloudfront_parquet_logs ? 1 : 0
+  provider = aws.us-east-1
+
+  name          = "cf-logs-${random_string.this.result}"
+  output_format = "parquet"
+
+  delivery_destination_configuration {
+    destination_resource_arn = local.cloudfront_logs_bucket_arn
+  }
+  tags = local.default_module_tags
+}
+
+# Distributions share the destination and partitions; file names include
+# the distribution ID.
+resource "aws_cloudwatch_log_delivery" "cloudfront" {
+  for_each = aws_cloudwatch_log_delivery_source.cloudfront
+  provider = aws.us-east-1
+
+  delivery_source_name     = each.value.name
+  delivery_destination_arn = aws_cloudwatch_log_delivery_destination.cloudfront[0].arn
+  record_fields            = local.cloudfront_log_fields
+
+  s3_delivery_configuration {
+    suffix_path = local.cloudfront_log_suffix_path
+    # The suffix path already names the partitions (year=...), so CloudFront
+    # must not rewrite it.
+    enable_hive_compatible_path = false
+  }
+  tags = local.default_module_tags
+}
+
+# Glue table over the Parquet logs for Athena. Partition projection computes
+# partition locations from the query's WHERE clause, so no crawler or
+# MSCK REPAIR is needed and only the requested hours are read.
+resource "aws_glue_catalog_database" "cloudfront_logs" {
+  count = var.create_log_table ? 1 : 0
+  name  = replace(local.cloudfront_logs_default_bucket_name, "-", "_")
+
+  lifecycle {
+    precondition {
+      condition     = local.cloudfront_parquet_logs
+      error_message = "create_log_table requires logging (create_logging_bucket or cloudfront_logging_bucket_name) and cloudfront_logging_format = \"parquet\"."
+    }
+  }
+  tags = local.default_module_tags
+}
+
+resource "aws_glue_catalog_table" "cloudfront_logs" {
+  count         = var.create_log_table ? 1 : 0
+  name          = "cloudfront_logs"
+  database_name = aws_glue_catalog_database.cloudfront_logs[0].name
+  table_type    = "EXTERNAL_TABLE"
+
+  parameters = {
+    EXTERNAL                    = "TRUE"
+    classification              = "parquet"
+    "projection.enabled"        = "true"
+    "projection.year.type"      = "integer"
+    "projection.year.range"     = "2024,2099"
+    "projection.month.type"     = "integer"
+    "projection.month.range"    = "1,12"
+    "projection.month.digits"   = "2"
+    "projection.day.type"       = "integer"
+    "projection.day.range"      = "1,31"
+    "projection.day.digits"     = "2"
+    "projection.hour.type"      = "integer"
+    "projection.hour.range"     = "0,23"
+    "projection.hour.digits"    = "2"
+    "storage.location.template" = "${local.cloudfront_log_location}year=$${year}/month=$${month}/day=$${day}/hour=$${hour}"
+  }
+
+  dynamic "partition_keys" {
+    for_each = ["year", "month", "day", "hour"]
+    content {
+      name = partition_keys.value
+      type = "int"
+    }
+  }
+
+  storage_descriptor {
+    location      = local.cloudfront_log_location
+    input_format  = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat"
+    output_format = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat"
+
+    ser_de_info {
+      serialization_library = "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+      parameters = {
+        "parquet.column.index.access" = "true"
+      }
+    }
+
+    dynamic "columns" {
+      for_each = local.cloudfront_log_columns
+      content {
+        name = columns.value
+        type = "string"
+      }
+    }
+  }
+}
@@ -1,11 +1,15 @@
+# Redirect origin for S3 website routing-rule mode. Not created in
+# edge_only mode, where the CloudFront Function answers every request.
 resource "aws_s3_bucket" "redirect" {
+  count         = var.edge_only ? 0 : 1
   bucket_prefix = "http-redirect-"
   force_destroy = true
   tags          = local.default_module_tags
 }
 
 resource "aws_s3_bucket_server_side_encryption_configuration" "redirect" {
-  bucket = aws_s3_bucket.redirect.id
+  count  = var.edge_only ? 0 : 1
+  bucket = aws_s3_bucket.redirect[0].id
 
   rule {
     apply_server_side_encryption_by_default {
@@ -15,7 +19,8 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "redirect" {
 }
 
 resource "aws_s3_bucket_website_configuration" "redirect" {
-  bucket = aws_s3_bucket.redirect.bucket
+  count  = var.edge_only ? 0 : 1
+  bucket = aws_s3_bucket.redirect[0].bucket
 
   index_document {
     suffix = "index.html"
@@ -46,7 +51,8 @@ resource "aws_s3_bucket_website_configuration" "redirect" {
 }
 
 resource "aws_s3_bucket_public_access_block" "redirect" {
-  bucket                  = aws_s3_bucket.redirect.bucket
+  count                   = var.edge_only ? 0 : 1
+  bucket                  = aws_s3_bucket.redirect[0].bucket
   block_public_acls       = true
   block_public_policy     = true
   ignore_public_acls      = true
@@ -54,6 +60,7 @@ resource "aws_s3_bucket_public_access_block" "redirect" {
 }
 
 data "aws_iam_policy_document" "enforce_ssl_policy" {
+  count = var.edge_only ? 0 : 1
   statement {
     sid    = "AllowSSLRequestsOnly"
     effect = "Deny"
@@ -63,8 +70,8 @@ data "aws_iam_policy_document" "enforce_ssl_policy" {
     ]
 
     resources = [
-      aws_s3_bucket.redirect.arn,
-      "${aws_s3_bucket.redirect.arn}/*",
+      aws_s3_bucket.redirect[0].arn,
+      "${aws_s3_bucket.redirect[0].arn}/*",
     ]
 
     principals {
@@ -82,6 +89,7 @@ data "aws_iam_policy_document" "enforce_ssl_policy" {
 }
 
 resource "aws_s3_bucket_policy" "redirect" {
-  bucket = aws_s3_bucket.redirect.id
-  policy = data.aws_iam_policy_document.enforce_ssl_policy.json
+  count  = var.edge_only ? 0 : 1
+  bucket = aws_s3_bucket.redirect[0].id
+  policy = data.aws_iam_policy_document.enforce_ssl_policy[0].json
 }
@@ -1,4 +1,7 @@
 terraform {
+  # terraform_data (invalidation.tf)
+  required_version = ">= 1.4"
+
   //noinspection HILUnresolvedReference
   required_providers {
     aws = {
@@ -12,6 +12,32 @@ module "test" {
   allow_non_get_methods          = var.allow_non_get_methods
   permanent_redirect             = var.permanent_redirect
   response_headers               = var.response_headers
+  redirect_map                   = var.redirect_map
+  redirect_rules                 = var.redirect_rules
+  create_key_value_store         = var.create_key_value_store
+  single_hop_http_redirect       = var.single_hop_http_redirect
+  edge_only                      = var.edge_only
+  host_redirects                 = var.host_redirects
+  geo_redirects                  = var.geo_redirects
+  weighted_targets               = var.weighted_targets
+  weighted_target_cookie         = var.weighted_target_cookie
+  target_canonicalization        = var.target_canonicalization
+  hosts_per_distribution         = var.hosts_per_distribution
+  invalidate_on_change           = var.invalidate_on_change
+  wait_for_invalidation          = var.wait_for_invalidation
+  invalidation_role_arn          = var.role_arn
+  create_monitoring              = var.create_monitoring
+  diagnostics_headers            = var.diagnostics_headers
+
+  cache_key_query_string_behavior = var.cache_key_query_string_behavior
+
+  permanent_redirect_ttl           = var.permanent_redirect_ttl
+  permanent_redirect_cache_control = var.permanent_redirect_cache_control
+  temporary_redirect_ttl           = var.temporary_redirect_ttl
+  temporary_redirect_cache_control = var.temporary_redirect_cache_control
+
+  cloudfront_logging_format = var.cloudfront_logging_format
+  create_log_table          = var.create_log_table
 
   cloudfront_logging_bucket_force_destroy = true # Allow test cleanup
 }
@@ -9,3 +9,31 @@ output "acm_certificate_arn" {
 output "cloudfront_distribution_id" {
   value = module.test.cloudfront_distribution_id
 }
+
+output "key_value_store_arn" {
+  value = module.test.key_value_store_arn
+}
+
+output "s3_bucket_name" {
+  value = module.test.s3_bucket_name
+}
+
+output "cloudfront_logs_bucket_name" {
+  value = module.test.cloudfront_logs_bucket_name
+}
+
+output "cloudfront_logs_table" {
+  value = module.test.cloudfront_logs_table
+}
+
+output "cloudfront_distributions" {
+  value = module.test.cloudfront_distributions
+}
+
+output "monitoring_dashboard_name" {
+  value = module.test.monitoring_dashboard_name
+}
+
+output "monitoring_alarm_arns" {
+  value = module.test.monitoring_alarm_arns
+}
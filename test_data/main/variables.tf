@@ -39,3 +39,149 @@ variable "response_headers" {
   type        = map(string)
   default     = {}
 }
+
+variable "redirect_map" {
+  description = "Exact-path redirects that take precedence over redirect_to"
+  type        = map(string)
+  default     = {}
+}
+
+variable "redirect_rules" {
+  description = "Ordered wildcard redirect rules, matched by longest source prefix"
+  type = list(object({
+    source = string
+    target = string
+  }))
+  default = []
+}
+
+variable "create_key_value_store" {
+  description = "Create a CloudFront KeyValueStore for redirect entries"
+  type        = bool
+  default     = false
+}
+
+variable "single_hop_http_redirect" {
+  description = "Redirect plain-HTTP requests straight to the target in one hop"
+  type        = bool
+  default     = false
+}
+
+variable "cache_key_query_string_behavior" {
+  description = "Query string handling: all (S3 redirects) or function"
+  type        = string
+  default     = "all"
+}
+
+variable "edge_only" {
+  description = "Answer every request with the CloudFront Function, no S3 origin"
+  type        = bool
+  default     = false
+}
+
+variable "permanent_redirect_ttl" {
+  description = "Edge TTL and default browser max-age of 301/308 redirects"
+  type        = number
+  default     = 86400
+}
+
+variable "permanent_redirect_cache_control" {
+  description = "Cache-Control header of 301/308 redirects"
+  type        = string
+  default     = null
+}
+
+variable "temporary_redirect_ttl" {
+  description = "Edge TTL and default browser max-age of 302/307 redirects"
+  type        = number
+  default     = 86400
+}
+
+variable "temporary_redirect_cache_control" {
+  description = "Cache-Control header of 302/307 redirects"
+  type        = string
+  default     = "no-cache"
+}
+
+variable "cloudfront_logging_format" {
+  description = "Format of CloudFront access logs: legacy or parquet"
+  type        = string
+  default     = "legacy"
+}
+
+variable "create_log_table" {
+  description = "Create a Glue table over the Parquet access logs"
+  type        = bool
+  default     = false
+}
+
+variable "host_redirects" {
+  description = "Per-host targets: hostname prefix => target"
+  type        = map(string)
+  default     = {}
+}
+
+variable "geo_redirects" {
+  description = "Regional target hosts by viewer country and continent"
+  type = object({
+    countries  = optional(map(string), {})
+    continents = optional(map(string), {})
+  })
+  default = {}
+}
+
+variable "weighted_targets" {
+  description = "Target hosts to split redirected traffic across by weight"
+  type = list(object({
+    host   = string
+    weight = number
+  }))
+  default = []
+}
+
+variable "weighted_target_cookie" {
+  description = "Cookie whose value selects the viewer's weighted target"
+  type        = string
+  default     = null
+}
+
+variable "target_canonicalization" {
+  description = "Trailing-slash policy, slash collapsing, lowercasing and index files of redirect targets"
+  type = object({
+    trailing_slash   = optional(string, "keep")
+    collapse_slashes = optional(bool, false)
+    lowercase        = optional(bool, false)
+    index_files      = optional(list(string), [])
+  })
+  default = {}
+}
+
+variable "hosts_per_distribution" {
+  description = "Most hostnames per CloudFront distribution and certificate"
+  type        = number
+  default     = 10
+}
+
+variable "invalidate_on_change" {
+  description = "Invalidate the CloudFront cache when the redirect configuration changes"
+  type        = bool
+  default     = false
+}
+
+variable "wait_for_invalidation" {
+  description = "Wait for the invalidation to complete"
+  type        = bool
+  default     = false
+}
+
+variable "create_monitoring" {
+  description = "Create CloudFront additional metrics, CloudWatch alarms and a dashboard"
+  type        = bool
+  default     = false
+}
+
+variable "diagnostics_headers" {
+  description = "Add a Server-Timing header to redirect responses"
+  type        = bool
+  default     = false
+}
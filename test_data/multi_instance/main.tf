@@ -1,3 +1,46 @@
+module "policies" {
+  count       = var.shared_policies ? 1 : 0
+  source      = "./../../modules/redirect-policies"
+  name_suffix = "multi-instance-test"
+}
+
+# One logging bucket for both instances, each writing under its own prefix.
+# The instances read the bucket name from the ownership controls, so ACLs
+# are enabled before CloudFront starts delivering legacy logs.
+resource "random_string" "logs" {
+  length  = 8
+  special = false
+  upper   = false
+}
+
+resource "aws_s3_bucket" "logs" {
+  count         = var.shared_logs_bucket ? 1 : 0
+  bucket        = "http-redirect-test-logs-${random_string.logs.result}"
+  force_destroy = true
+}
+
+resource "aws_s3_bucket_ownership_controls" "logs" {
+  count  = var.shared_logs_bucket ? 1 : 0
+  bucket = aws_s3_bucket.logs[0].id
+  rule {
+    object_ownership = "BucketOwnerPreferred"
+  }
+}
+
+data "aws_iam_policy_document" "logs" {
+  count = var.shared_logs_bucket ? 1 : 0
+  source_policy_documents = [
+    module.instance_1.cloudfront_logs_bucket_policy_json,
+    module.instance_2.cloudfront_logs_bucket_policy_json,
+  ]
+}
+
+resource "aws_s3_bucket_policy" "logs" {
+  count  = var.shared_logs_bucket ? 1 : 0
+  bucket = aws_s3_bucket.logs[0].id
+  policy = data.aws_iam_policy_document.logs[0].json
+}
+
 module "instance_1" {
   source = "./../../"
   providers = {
@@ -8,6 +51,12 @@ module "instance_1" {
   redirect_hostnames = var.redirect_hostnames_1
   zone_id            = var.test_zone_id
 
+  cache_policy_id            = var.shared_policies ? module.policies[0].cache_policy_id : null
+  response_headers_policy_id = var.shared_policies ? module.policies[0].response_headers_policy_id : null
+
+  cloudfront_logging_bucket_name = var.shared_logs_bucket ? aws_s3_bucket_ownership_controls.logs[0].bucket : null
+  cloudfront_logging_prefix      = "cloudfront-logs/instance-1/"
+
   cloudfront_logging_bucket_force_destroy = true # Allow test cleanup
 }
 
@@ -21,5 +70,11 @@ module "instance_2" {
   redirect_hostnames = var.redirect_hostnames_2
   zone_id            = var.test_zone_id
 
+  cache_policy_id            = var.shared_policies ? module.policies[0].cache_policy_id : null
+  response_headers_policy_id = var.shared_policies ? module.policies[0].response_headers_policy_id : null
+
+  cloudfront_logging_bucket_name = var.shared_logs_bucket ? aws_s3_bucket_ownership_controls.logs[0].bucket : null
+  cloudfront_logging_prefix      = "cloudfront-logs/instance-2/"
+
   cloudfront_logging_bucket_force_destroy = true # Allow test cleanup
 }
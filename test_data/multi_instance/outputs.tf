@@ -8,6 +8,11 @@ output "instance_1_cloudfront_distribution_id" {
   value       = module.instance_1.cloudfront_distribution_id
 }
 
+output "instance_1_cache_policy_id" {
+  description = "Cache policy ID for first redirect instance"
+  value       = module.instance_1.cache_policy_id
+}
+
 output "instance_1_redirect_domains" {
   description = "Redirect domain names for first redirect instance"
   value       = module.instance_1.redirect_domains
@@ -18,7 +23,22 @@ output "instance_2_cloudfront_distribution_id" {
   value       = module.instance_2.cloudfront_distribution_id
 }
 
+output "instance_2_cache_policy_id" {
+  description = "Cache policy ID for second redirect instance"
+  value       = module.instance_2.cache_policy_id
+}
+
 output "instance_2_redirect_domains" {
   description = "Redirect domain names for second redirect instance"
   value       = module.instance_2.redirect_domains
 }
+
+output "instance_1_cloudfront_logs_bucket_name" {
+  description = "Logging bucket for first redirect instance"
+  value       = module.instance_1.cloudfront_logs_bucket_name
+}
+
+output "instance_2_cloudfront_logs_bucket_name" {
+  description = "Logging bucket for second redirect instance"
+  value       = module.instance_2.cloudfront_logs_bucket_name
+}
@@ -33,3 +33,15 @@ variable "redirect_hostnames_2" {
   description = "Hostname prefixes for second redirect instance"
   type        = list(string)
 }
+
+variable "shared_policies" {
+  description = "Share one cache and response headers policy between the instances"
+  type        = bool
+  default     = false
+}
+
+variable "shared_logs_bucket" {
+  description = "Write the logs of both instances to one bucket, under separate prefixes"
+  type        = bool
+  default     = false
+}
@@ -1,15 +1,46 @@
+import fcntl
 import json
 import logging
+import os
+import re
 import shutil
+from contextlib import contextmanager
+from importlib.resources import as_file, files
 from os import path as osp, remove
 from textwrap import dedent
+from urllib.parse import urlsplit
 
 import pytest
+import requests
+from botocore.exceptions import ClientError
 from infrahouse_core.logging import setup_logging
 from pytest_infrahouse import terraform_apply
+from pytest_infrahouse.terraform import run_with_retries
+
+from tools.edge_simulator import Instance, parse_tfvars, serve_in_thread
 
 DEFAULT_PROGRESS_INTERVAL = 10
 TERRAFORM_ROOT_DIR = "test_data"
+# Per-worker copies of the Terraform roots, each with its own state.
+TERRAFORM_WORK_DIR = osp.join(TERRAFORM_ROOT_DIR, ".work")
+# Providers downloaded by terraform init, shared by all roots and sessions.
+TF_PLUGIN_CACHE_DIR = osp.expanduser("~/.terraform.d/plugin-cache")
+
+# Simulated hosted zone for --edge-simulator runs.
+SIMULATED_ZONE_ID = "Z0SIMULATED"
+SIMULATED_ZONE_NAME = "redirect.simulated.test"
+
+# Tests that need AWS APIs or Terraform roots the simulator does not model.
+SIMULATOR_UNSUPPORTED = {
+    "test_shared_certificate_dns_records",
+    "test_multi_instance",
+    "test_key_value_store",
+    "test_edge_only",
+    "test_parquet_logging",
+    "test_host_redirects",
+    "test_invalidate_on_change",
+    "test_monitoring",
+}
 
 
 LOG = logging.getLogger(__name__)
@@ -18,8 +49,346 @@ LOG = logging.getLogger(__name__)
 setup_logging(LOG, debug=True)
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--edge-simulator",
+        action="store_true",
+        default=False,
+        help=(
+            "Run tests/test_module.py against the local edge simulator "
+            "(tools/edge_simulator.py) instead of deploying to AWS."
+        ),
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # Run tests on the session stack grouped by AWS provider version, so
+    # the stack is rebuilt once per version rather than on every switch.
+    items.sort(key=_stack_provider_version)
+    if not config.getoption("--edge-simulator"):
+        return
+    skip = pytest.mark.skip(reason="needs AWS; not supported by --edge-simulator")
+    for item in items:
+        if item.originalname in SIMULATOR_UNSUPPORTED:
+            item.add_marker(skip)
+
+
+def _stack_provider_version(item):
+    fixtures = getattr(item, "fixturenames", ())
+    # shared_certificate tears the stack down; run those tests first.
+    if "redirect_stack" not in fixtures or "shared_certificate" in fixtures:
+        return ""
+    if not hasattr(item, "callspec"):
+        return ""
+    return item.callspec.params.get("aws_provider_version", "")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def terraform_plugin_cache(request):
+    """
+    Let every ``terraform init`` reuse downloaded providers
+    (``TF_PLUGIN_CACHE_DIR``, unless already set).
+    """
+    if request.config.getoption("--edge-simulator"):
+        return None
+    cache_dir = os.environ.setdefault("TF_PLUGIN_CACHE_DIR", TF_PLUGIN_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+@pytest.fixture(scope="session")
+def subzone(request, terraform_plugin_cache):
+    """
+    Test DNS zone, like the plugin's ``subzone``, but applied from this
+    worker's copy of the plugin's root; a simulated zone with
+    ``--edge-simulator``.
+    """
+    if request.config.getoption("--edge-simulator"):
+        yield {
+            "subzone_id": {"value": SIMULATED_ZONE_ID},
+            "subzone_name": {"value": SIMULATED_ZONE_NAME},
+        }
+        return
+
+    test_role_arn = request.getfixturevalue("test_role_arn")
+    keep_after = request.getfixturevalue("keep_after")
+    route53 = request.getfixturevalue("boto3_session").client("route53")
+    with as_file(files("pytest_infrahouse").joinpath("data/subzone")) as source:
+        module_dir = prepare_terraform_root(source, name="subzone")
+    with open(osp.join(module_dir, "terraform.tfvars"), "w") as fp:
+        fp.write(
+            dedent(
+                f"""
+                parent_zone_name = "{request.getfixturevalue("test_zone_name")}"
+                region           = "{request.getfixturevalue("aws_region")}"
+                calling_test     = "{osp.basename(request.node.path)}"
+                """
+            )
+        )
+        if test_role_arn:
+            fp.write(f'role_arn = "{test_role_arn}"\n')
+
+    zone_id = None
+    destroyed = False
+    try:
+        with terraform_apply(
+            module_dir,
+            destroy_after=not keep_after,
+            json_output=True,
+        ) as tf_output:
+            zone_id = tf_output["subzone_id"]["value"]
+            yield tf_output
+            # Records left by the tests would block terraform destroy.
+            if not keep_after:
+                delete_zone_records(route53, zone_id)
+        destroyed = not keep_after
+    finally:
+        # terraform destroy did not run or failed: remove the zone directly.
+        if not keep_after and zone_id and not destroyed:
+            delete_zone_records(route53, zone_id)
+            delete_zone(route53, zone_id)
+
+
+def delete_zone_records(route53, zone_id):
+    """Delete all records of a hosted zone but its NS and SOA records."""
+    LOG.info("Deleting the records of DNS zone %s", zone_id)
+    try:
+        paginator = route53.get_paginator("list_resource_record_sets")
+        for page in paginator.paginate(HostedZoneId=zone_id):
+            for record_set in page["ResourceRecordSets"]:
+                if record_set["Type"] in ("NS", "SOA"):
+                    continue
+                route53.change_resource_record_sets(
+                    HostedZoneId=zone_id,
+                    ChangeBatch={
+                        "Changes": [
+                            {"Action": "DELETE", "ResourceRecordSet": record_set}
+                        ]
+                    },
+                )
+    except ClientError as err:
+        if err.response["Error"]["Code"] != "NoSuchHostedZone":
+            raise
+
+
+def delete_zone(route53, zone_id):
+    """Delete a hosted zone; a zone that no longer exists is fine."""
+    LOG.info("Deleting DNS zone %s", zone_id)
+    try:
+        route53.delete_hosted_zone(Id=zone_id)
+    except ClientError as err:
+        if err.response["Error"]["Code"] != "NoSuchHostedZone":
+            raise
+
+
+@contextmanager
+def simulated_terraform_apply(path):
+    """
+    Serve the module variables of ``test_data/main`` from
+    ``terraform.tfvars`` with :mod:`tools.edge_simulator`.
+
+    :return: Context manager yielding the ``host:port`` address of the
+        simulator and outputs shaped like ``terraform output -json``.
+    """
+    with open(osp.join(path, "terraform.tfvars"), encoding="utf-8") as fp:
+        variables = parse_tfvars(fp.read())
+    for name in ("region", "role_arn", "test_zone_id"):
+        variables.pop(name, None)
+    # test_data/main defaults that differ from the module's
+    variables.setdefault("redirect_hostnames", ["", "foo", "bar"])
+    instance = Instance(variables, zone_name=SIMULATED_ZONE_NAME)
+    with serve_in_thread(instance) as address:
+        outputs = {
+            "zone_name": SIMULATED_ZONE_NAME,
+            "acm_certificate_arn": "arn:aws:acm:us-east-1:000000000000:certificate/simulated",
+            "cloudfront_distribution_id": "ESIMULATED",
+            "key_value_store_arn": None,
+            "s3_bucket_name": None if instance.variables["edge_only"] else "simulated",
+            "cloudfront_logs_bucket_name": None,
+            "cloudfront_logs_table": None,
+            "cloudfront_distributions": {},
+        }
+        yield address, {name: {"value": value} for name, value in outputs.items()}
+
+
+class EdgeSimulator:
+    """
+    Stand-ins for ``terraform_apply()``, ``get()`` and ``request()`` of the
+    test module. Requests go to the simulator the last
+    :meth:`terraform_apply` started, while it runs.
+    """
+
+    def __init__(self):
+        self.address = None
+
+    @contextmanager
+    def terraform_apply(self, path, destroy_after=True, json_output=False, **kwargs):
+        """Stand-in for ``terraform_apply()`` of ``test_data/main``."""
+        with simulated_terraform_apply(path) as (address, outputs):
+            self.address = address
+            try:
+                yield outputs
+            finally:
+                self.address = None
+
+    def request(self, method, url, **kwargs):
+        """``requests.request()`` sent to the running edge simulator."""
+        if self.address is None:
+            raise RuntimeError("The edge simulator is not running")
+        parts = urlsplit(url)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.setdefault("Host", parts.netloc)
+        headers.setdefault("X-Forwarded-Proto", parts.scheme)
+        local_url = parts._replace(scheme="http", netloc=self.address).geturl()
+        return requests.request(method, local_url, headers=headers, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def edge_simulator(request):
+    """:class:`EdgeSimulator` with ``--edge-simulator``, else ``None``."""
+    if request.config.getoption("--edge-simulator"):
+        return EdgeSimulator()
+    return None
+
+
+@pytest.fixture(autouse=True)
+def use_edge_simulator(request, monkeypatch, edge_simulator):
+    """
+    With ``--edge-simulator``, point ``terraform_apply``, ``get`` and
+    ``request`` of the test module at the local edge simulator.
+    """
+    if edge_simulator is None:
+        return
+    for name in ("terraform_apply", "get", "request"):
+        if hasattr(request.module, name):
+            monkeypatch.setattr(request.module, name, getattr(edge_simulator, name))
+
+
+class RedirectStack:
+    """
+    ``test_data/main`` deployed once and reconfigured in place.
+
+    Each :meth:`apply` rewrites ``terraform.tfvars`` and applies it over the
+    existing deployment, so a variant only waits for the resources it
+    changes. A different AWS provider version destroys the deployment and
+    initializes the root again.
+
+    :param source: Terraform root; it is applied from this worker's copy
+        (see :func:`prepare_terraform_root`).
+    :param common_variables: Variables every configuration gets, e.g.
+        ``region`` and ``test_zone_id``.
+    """
+
+    deploy = staticmethod(terraform_apply)
+
+    def __init__(self, source, common_variables):
+        self.source = source
+        self.path = worker_dir(source)
+        self.common_variables = common_variables
+        self.aws_provider_version = None
+        self.deployed = False
+
+    @contextmanager
+    def apply(self, aws_provider_version, **variables):
+        """
+        Deploy the module with ``variables``.
+
+        :return: Context manager yielding the ``terraform output -json``
+            dictionary.
+        """
+        if aws_provider_version != self.aws_provider_version:
+            self.destroy()
+            self.path = self.prepare(aws_provider_version)
+            self.aws_provider_version = aws_provider_version
+        write_tfvars(
+            osp.join(self.path, "terraform.tfvars"),
+            dict(self.common_variables, **variables),
+        )
+        # Set before applying: an apply that fails partway still leaves
+        # resources for destroy() to clean up.
+        self.deployed = True
+        with self.deploy(self.path, destroy_after=False, json_output=True) as tf_output:
+            LOG.info("%s", json.dumps(tf_output, indent=4))
+            yield tf_output
+
+    def prepare(self, aws_provider_version):
+        return prepare_terraform_root(self.source, aws_provider_version)
+
+    def destroy(self):
+        """Destroy the deployment, if any."""
+        if self.deployed:
+            run_with_retries(
+                [
+                    "terraform",
+                    "destroy",
+                    "-var-file=terraform.tfvars",
+                    "-input=false",
+                    "-auto-approve",
+                    "-no-color",
+                ],
+                cwd=self.path,
+            )
+        self.deployed = False
+        self.aws_provider_version = None
+
+
+class SimulatedRedirectStack(RedirectStack):
+    """
+    :class:`RedirectStack` served by the edge simulator.
+
+    :param simulator: :class:`EdgeSimulator` the test module's requests go to.
+    """
+
+    def __init__(self, source, common_variables, simulator):
+        super().__init__(source, common_variables)
+        self.deploy = simulator.terraform_apply
+
+    def prepare(self, aws_provider_version):
+        return prepare_terraform_root(self.source, aws_provider_version, init=False)
+
+    def destroy(self):
+        self.deployed = False
+        self.aws_provider_version = None
+
+
+def write_tfvars(path, variables):
+    """Write ``variables`` as a ``.tfvars`` file; ``None`` values are left out."""
+    with open(path, "w", encoding="utf-8") as fp:
+        for name, value in variables.items():
+            if value is not None:
+                fp.write(f"{name} = {json.dumps(value)}\n")
+
+
+@pytest.fixture(scope="session")
+def redirect_stack(
+    request, subzone, test_role_arn, aws_region, keep_after, edge_simulator
+):
+    """
+    Session-wide :class:`RedirectStack` for ``test_data/main``.
+
+    Tests that only differ in module variables share one deployment; it is
+    destroyed at the end of the session unless ``--keep-after`` is given.
+    """
+    source = osp.join(TERRAFORM_ROOT_DIR, "main")
+    common_variables = {
+        "region": aws_region,
+        "test_zone_id": subzone["subzone_id"]["value"],
+        "role_arn": test_role_arn,
+    }
+    if edge_simulator is not None:
+        stack = SimulatedRedirectStack(source, common_variables, edge_simulator)
+    else:
+        stack = RedirectStack(source, common_variables)
+    yield stack
+    if not keep_after:
+        stack.destroy()
+
+
 @pytest.fixture(scope="function")
-def shared_certificate(subzone, test_role_arn, aws_region, keep_after):
+def shared_certificate(subzone, test_role_arn, aws_region, keep_after, redirect_stack):
     """
     Create external ACM certificate and DNS records to simulate another module.
 
@@ -29,12 +398,16 @@ def shared_certificate(subzone, test_role_arn, aws_region, keep_after):
     - Certificate validation CNAME record
 
     The http-redirect module test will then use create_certificate_dns_records=false
-    to avoid conflicts with these existing records.
+    to avoid conflicts with these existing records. The session stack owns
+    the same records and the ``test_data/main`` state, so it is destroyed
+    first.
     """
+    redirect_stack.destroy()
     zone_id = subzone["subzone_id"]["value"]
 
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "shared_certificate")
-    cleanup_dot_terraform(terraform_module_dir)
+    terraform_module_dir = prepare_terraform_root(
+        osp.join(TERRAFORM_ROOT_DIR, "shared_certificate")
+    )
 
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(
@@ -65,6 +438,88 @@ def shared_certificate(subzone, test_role_arn, aws_region, keep_after):
         yield tf_output
 
 
+def worker_id():
+    """Name of this pytest-xdist worker, or ``master`` without xdist."""
+    return os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+
+def worker_dir(source, name=None):
+    """This worker's directory for the Terraform root ``source``."""
+    return osp.join(TERRAFORM_WORK_DIR, worker_id(), name or osp.basename(source))
+
+
+def prepare_terraform_root(source, aws_provider_version=None, name=None, init=True):
+    """
+    Copy the Terraform root ``source`` into this worker's directory.
+
+    The copy keeps its state and ``terraform.tfvars`` from earlier runs, so
+    workers never share a file; relative module sources are rewritten to
+    point at the same modules. The root is then initialized afresh, see
+    :func:`init_terraform_root`.
+
+    :param aws_provider_version: Write ``terraform.tf`` with this AWS
+        provider constraint, see :func:`update_terraform_tf`.
+    :param name: Directory name of the copy; the name of ``source`` by
+        default.
+    :return: Path to the copy.
+    """
+    path = worker_dir(source, name)
+    shutil.copytree(
+        source,
+        path,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(
+            ".terraform*", "terraform.tfstate*", "terraform.tfvars", ".gitignore"
+        ),
+    )
+    for file_name in os.listdir(path):
+        if file_name.endswith(".tf"):
+            rewrite_module_sources(osp.join(path, file_name), source, path)
+    cleanup_dot_terraform(path)
+    if aws_provider_version:
+        update_terraform_tf(path, aws_provider_version)
+    if init:
+        init_terraform_root(path)
+    return path
+
+
+def rewrite_module_sources(tf_file, source, path):
+    """Point relative module sources of ``tf_file``, copied from ``source``, at
+    the same directories from ``path``."""
+
+    def relocate(match):
+        target = osp.normpath(osp.join(source, match.group(2)))
+        relative = osp.relpath(target, path)
+        if not relative.startswith(".."):
+            relative = f"./{relative}"
+        return f"{match.group(1)}{relative}{match.group(3)}"
+
+    with open(tf_file, encoding="utf-8") as fp:
+        content = fp.read()
+    updated = re.sub(r'(\bsource\s*=\s*")(\.\.?/[^"]*)(")', relocate, content)
+    if updated != content:
+        with open(tf_file, "w", encoding="utf-8") as fp:
+            fp.write(updated)
+
+
+def init_terraform_root(path):
+    """
+    Run ``terraform init`` in ``path``, one worker at a time.
+
+    The provider cache is not safe for concurrent writes, so workers take
+    turns filling it; the ``terraform init`` of ``terraform_apply`` then
+    finds every provider there and only reads it.
+    """
+    cache_dir = os.environ.get("TF_PLUGIN_CACHE_DIR", TF_PLUGIN_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(osp.join(cache_dir, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            run_with_retries(["terraform", "init", "-no-color"], cwd=path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
 def update_terraform_tf(terraform_module_dir, aws_provider_version):
     """Update terraform.tf with specified AWS provider version."""
     terraform_tf_path = osp.join(terraform_module_dir, "terraform.tf")
@@ -0,0 +1,33 @@
+import json
+from os import path as osp
+
+import pytest
+
+from tools.cloudfront_function import canonical_location
+from tools.edge_simulator import Instance
+
+VECTORS_PATH = osp.join(osp.dirname(__file__), "fixtures", "canonical_targets.json")
+ZONE = "example.com"
+
+with open(VECTORS_PATH, encoding="utf-8") as _fp:
+    VECTORS = json.load(_fp)
+
+
+@pytest.mark.parametrize("vector", VECTORS, ids=[vector["name"] for vector in VECTORS])
+def test_canonical_targets(vector):
+    variables = vector["variables"]
+    # Without target_canonicalization options the module uses S3 routing
+    # rules, which must agree with the function.
+    modes = ["function"]
+    if Instance(variables, ZONE).mode == "s3":
+        modes.insert(0, "s3")
+    canonicalization = variables.get("target_canonicalization")
+    host = ".".join(filter(None, [vector.get("host"), ZONE]))
+    for mode in modes:
+        instance = Instance(variables, ZONE, mode=mode)
+        for source, expected in vector["requests"].items():
+            status, headers = instance.handle("GET", host, source)
+            assert status == 301, (mode, source)
+            assert headers["location"] == expected, (mode, source)
+            # One hop: the target is already canonical
+            assert canonical_location(expected, canonicalization) == expected
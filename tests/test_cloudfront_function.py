@@ -0,0 +1,466 @@
+import json
+import random
+import re
+from collections import Counter
+from os import path as osp
+from urllib.parse import urlsplit
+
+import pytest
+
+from tools.benchmark import (
+    bench_events,
+    bench_rules,
+    compare,
+    make_corpus,
+    make_event,
+)
+from tools.cloudfront_function import (
+    COUNTRY_CONTINENTS_PATH,
+    MAX_CODE_SIZE,
+    MAX_ENTRIES,
+    CloudFrontFunction,
+    compile_geo_redirects,
+    fnv1a,
+    render_function,
+    template_variables,
+    weighted_target,
+)
+
+LOCALS_TF = osp.join(osp.dirname(__file__), "..", "locals.tf")
+
+
+@pytest.fixture(scope="module")
+def function():
+    return CloudFrontFunction(
+        render_function(
+            redirect_to="example.com/landing",
+            response_headers={"X-Robots-Tag": "noindex"},
+        )
+    )
+
+
+def _query(**params):
+    querystring = {}
+    for key, value in params.items():
+        if isinstance(value, list):
+            querystring[key] = {
+                "value": value[0],
+                "multiValue": [{"value": v} for v in value],
+            }
+        else:
+            querystring[key] = {"value": value}
+    return querystring
+
+
+@pytest.mark.parametrize(
+    "querystring,expected",
+    [
+        ({}, ""),
+        (_query(a="1", b="2"), "?a=1&b=2"),
+        (_query(flag=""), "?flag="),
+        (_query(tag=["x", "y"], page="2"), "?tag=x&tag=y&page=2"),
+        # already encoded: passed through, not double-encoded
+        (
+            _query(q="spring%20sale", next="%2Fhome%3Fx%3D1"),
+            "?q=spring%20sale&next=%2Fhome%3Fx%3D1",
+        ),
+        (
+            _query(token="abc==", path="a/b", plus="a+b"),
+            "?token=abc==&path=a/b&plus=a+b",
+        ),
+        # not valid in a URL: encoded
+        (_query(q="café"), "?q=caf%C3%A9"),
+        (_query(discount="100%", q="a%20b"), "?discount=100%25&q=a%20b"),
+        (_query(filter="size|color"), "?filter=size%7Ccolor"),
+        ({"ids[]": {"value": "1"}}, "?ids%5B%5D=1"),
+        (_query(q="a b#c"), "?q=a%20b%23c"),
+    ],
+)
+def test_query_string(function, querystring, expected):
+    response = function.invoke(make_event("/page", querystring))
+    assert (
+        response["headers"]["location"]["value"]
+        == "https://example.com/landing/page" + expected
+    )
+
+
+@pytest.mark.parametrize(
+    "permanent_redirect,method,status_code,description",
+    [
+        (True, "GET", 301, "Moved Permanently"),
+        (True, "HEAD", 301, "Moved Permanently"),
+        (True, "POST", 308, "Permanent Redirect"),
+        (False, "GET", 302, "Found"),
+        (False, "DELETE", 307, "Temporary Redirect"),
+    ],
+)
+def test_status(permanent_redirect, method, status_code, description):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.com", permanent_redirect=permanent_redirect
+        )
+    )
+    response = function.invoke(make_event("/", method=method))
+    assert response["statusCode"] == status_code
+    assert response["statusDescription"] == description
+
+
+@pytest.mark.parametrize(
+    "settings,expected",
+    [
+        ({}, "max-age=86400"),
+        ({"permanent_redirect_ttl": 600}, "max-age=600"),
+        ({"permanent_redirect_ttl": 0}, "no-store"),
+        (
+            {"permanent_redirect_cache_control": "public, max-age=31536000, immutable"},
+            "public, max-age=31536000, immutable",
+        ),
+        ({"permanent_redirect": False}, "no-cache"),
+        (
+            {"permanent_redirect": False, "temporary_redirect_cache_control": None},
+            "max-age=86400",
+        ),
+        (
+            {
+                "permanent_redirect": False,
+                "temporary_redirect_ttl": 60,
+                "temporary_redirect_cache_control": None,
+            },
+            "max-age=60",
+        ),
+    ],
+)
+def test_cache_control(settings, expected):
+    function = CloudFrontFunction(
+        render_function(redirect_to="example.com", **settings)
+    )
+    for method in ("GET", "POST"):
+        response = function.invoke(make_event("/", method=method))
+        assert response["headers"]["cache-control"] == {"value": expected}
+
+
+def test_response_headers(function):
+    first = function.invoke(make_event("/one"))
+    second = function.invoke(make_event("/two", method="PUT"))
+    for response, uri in ((first, "/one"), (second, "/two")):
+        assert response["headers"] == {
+            "cache-control": {"value": "max-age=86400"},
+            "x-robots-tag": {"value": "noindex"},
+            "location": {"value": "https://example.com/landing" + uri},
+        }
+
+
+def test_response_headers_not_shared(function):
+    # Each response gets its own headers; a returned response is not
+    # changed by the next request.
+    assert function.context.eval(
+        "var __first = handler(%s), __second = handler(%s);"
+        "__first.headers !== __second.headers"
+        " && __first.headers['cache-control'] !== __second.headers['cache-control']"
+        " && __first.headers.location.value.endsWith('/one')"
+        % (json.dumps(make_event("/one")), json.dumps(make_event("/two")))
+    )
+
+
+@pytest.mark.parametrize(
+    "host,uri,expected",
+    [
+        ("shop.example.com", "/cart?x=1", "https://store.example.net/cart?x=1"),
+        ("Docs.Example.com", "/a", "https://example.net/docs/a"),
+        ("example.com", "/", "https://example.net/apex/"),
+        # not in host_redirects: redirect_to
+        ("www.example.com", "/a", "https://default.example.net/a"),
+        # redirect_map takes precedence over the host target
+        ("shop.example.com", "/old", "https://default.example.net/new"),
+    ],
+)
+def test_host_redirects(host, uri, expected):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="default.example.net",
+            redirect_map={"/old": "/new"},
+            host_redirects={
+                "shop": "store.example.net",
+                "docs": "example.net/docs",
+                "": "example.net/apex",
+            },
+        )
+    )
+    path, _, query = uri.partition("?")
+    querystring = dict(
+        (key, {"value": value})
+        for key, value in (part.split("=") for part in query.split("&") if part)
+    )
+    response = function.invoke(make_event(path, querystring, host=host))
+    assert response["headers"]["location"]["value"] == expected
+
+
+GEO_REDIRECTS = {
+    "continents": {"EU": "eu.example.net", "NA": "us.example.net"},
+    "countries": {"MX": "us.example.net", "GB": "uk.example.net"},
+}
+
+
+@pytest.mark.parametrize(
+    "country,host,uri,expected",
+    [
+        ("DE", "example.com", "/a?x=1", "https://eu.example.net/landing/a?x=1"),
+        # a country entry takes precedence over its continent's
+        ("GB", "example.com", "/a", "https://uk.example.net/landing/a"),
+        ("MX", "example.com", "/a", "https://us.example.net/landing/a"),
+        # neither the country nor its continent has a host: redirect_to
+        ("BR", "example.com", "/a", "https://example.net/landing/a"),
+        (None, "example.com", "/a", "https://example.net/landing/a"),
+        # path targets go to the regional host, others are kept
+        ("DE", "example.com", "/old", "https://eu.example.net/new"),
+        ("DE", "example.com", "/moved", "https://example.org/moved"),
+        ("DE", "shop.example.com", "/a", "https://store.example.org/a"),
+    ],
+)
+def test_geo_redirects(country, host, uri, expected):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.net/landing",
+            redirect_map={"/old": "/new", "/moved": "example.org/moved"},
+            host_redirects={"shop": "store.example.org"},
+            geo_redirects=GEO_REDIRECTS,
+            diagnostics_headers=True,
+        )
+    )
+    path, _, query = uri.partition("?")
+    querystring = dict(
+        (key, {"value": value})
+        for key, value in (part.split("=") for part in query.split("&") if part)
+    )
+    event = make_event(path, querystring, host=host)
+    if country:
+        event["request"]["headers"]["cloudfront-viewer-country"] = {"value": country}
+    headers = function.invoke(event)["headers"]
+    assert headers["location"]["value"] == expected
+    geo = "geo;desc=" in headers["server-timing"]["value"]
+    assert geo == (country in ("DE", "GB", "MX"))
+
+
+def test_compile_geo_redirects():
+    hosts, countries = compile_geo_redirects(GEO_REDIRECTS)
+    assert hosts == ["uk.example.net", "us.example.net", "eu.example.net"]
+    assert countries["GB"] == 0
+    assert countries["FR"] == countries["DE"] == 2
+    assert countries["US"] == countries["MX"] == 1
+    assert "BR" not in countries
+    assert compile_geo_redirects({}) == ([], {})
+
+    with open(COUNTRY_CONTINENTS_PATH) as fp:
+        country_continents = json.load(fp)
+    assert set(country_continents.values()) == {
+        "AF",
+        "AN",
+        "AS",
+        "EU",
+        "NA",
+        "OC",
+        "SA",
+    }
+    assert all(re.fullmatch("[A-Z]{2}", country) for country in country_continents)
+
+
+WEIGHTED_TARGETS = [
+    {"host": "a.example.net", "weight": 60},
+    {"host": "b.example.net", "weight": 30},
+    {"host": "c.example.net", "weight": 10},
+    {"host": "drained.example.net", "weight": 0},
+]
+
+
+def _viewer_event(ip, cookies=None, method="GET"):
+    event = make_event("/launch", method=method)
+    event["viewer"]["ip"] = ip
+    event["request"]["cookies"] = cookies or {}
+    return event
+
+
+def test_weighted_targets_distribution():
+    function = CloudFrontFunction(
+        render_function(redirect_to="example.net", weighted_targets=WEIGHTED_TARGETS)
+    )
+    rng = random.Random(0)
+    viewers = 10000
+    counts = Counter()
+    for number in range(viewers):
+        if number % 4:
+            ip = ".".join(str(rng.randrange(256)) for _ in range(4))
+        else:
+            ip = ":".join(f"{rng.randrange(65536):x}" for _ in range(8))
+        location = function.invoke(_viewer_event(ip))["headers"]["location"]["value"]
+        host = urlsplit(location).hostname
+        assert host == weighted_target(WEIGHTED_TARGETS, ip)
+        counts[host] += 1
+
+    total = sum(target["weight"] for target in WEIGHTED_TARGETS)
+    for target in WEIGHTED_TARGETS:
+        share = counts[target["host"]] / viewers
+        assert abs(share - target["weight"] / total) < 0.02, (target, share)
+    assert counts["drained.example.net"] == 0
+
+
+@pytest.mark.parametrize(
+    "permanent_redirect,statuses", [(True, (301, 308)), (False, (302, 307))]
+)
+def test_weighted_targets(permanent_redirect, statuses):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.net/welcome",
+            permanent_redirect=permanent_redirect,
+            redirect_map={"/launch": "/landing"},
+            geo_redirects={"countries": {"JP": "jp.example.net"}},
+            weighted_targets=WEIGHTED_TARGETS,
+            weighted_target_cookie="visitor",
+        )
+    )
+
+    def invoke(event):
+        response = function.invoke(event)
+        return response["statusCode"], response["headers"]["location"]["value"]
+
+    # The same viewer keeps its host, with the permanent_redirect statuses
+    ip = "198.51.100.23"
+    host = weighted_target(WEIGHTED_TARGETS, ip)
+    for method, status in zip(("GET", "POST"), statuses):
+        for _ in range(3):
+            assert invoke(_viewer_event(ip, method=method)) == (
+                status,
+                f"https://{host}/landing",
+            )
+
+    # The cookie, when there is one, selects the host instead of the IP address
+    for visitor in ("v-1", "v-2", "v-3", "v-4"):
+        cookies = {"visitor": {"value": visitor}}
+        _, location = invoke(_viewer_event(ip, cookies))
+        assert location == (
+            f"https://{weighted_target(WEIGHTED_TARGETS, visitor)}/landing"
+        )
+
+    # A geo_redirects host takes precedence over the split
+    event = _viewer_event(ip)
+    event["request"]["headers"]["cloudfront-viewer-country"] = {"value": "JP"}
+    assert invoke(event)[1] == "https://jp.example.net/landing"
+
+
+def test_fnv1a():
+    # Reference values of 32-bit FNV-1a
+    assert fnv1a("") == 0x811C9DC5
+    assert fnv1a("a") == 0xE40C292C
+    assert fnv1a("foobar") == 0xBF9CF968
+
+
+@pytest.mark.parametrize(
+    "uri,host,matched",
+    [
+        ("/old", "example.com", "map"),
+        ("/kvs-old", "example.com", "kvs"),
+        ("/blog/a", "example.com", "rule"),
+        ("/a", "shop.example.com", "host"),
+        ("/a", "kvs.example.com", "kvs-host"),
+        ("/a", "example.com", "default"),
+    ],
+)
+def test_diagnostics_headers(uri, host, matched):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.net",
+            redirect_map={"/old": "/new"},
+            redirect_rules=[{"source": "/blog/*", "target": "/articles/*"}],
+            host_redirects={"shop": "store.example.net"},
+            create_key_value_store=True,
+            response_headers={"Server-Timing": "app;dur=1"},
+            diagnostics_headers=True,
+        ),
+        key_value_store={"/kvs-old": "/kvs-new", "kvs.example.com": "example.org"},
+    )
+    event = make_event(uri, host=host)
+    event["context"]["requestId"] = "abc-123=="
+    value = function.invoke(event)["headers"]["server-timing"]["value"]
+    assert re.fullmatch(
+        r"app;dur=1, edge;dur=\d+, redirect;desc=function, "
+        rf'match;desc={matched}, rid;desc="abc-123=="',
+        value,
+    )
+
+    # Without a request ID in the event, the rid metric is left out
+    value = function.invoke(make_event(uri, host=host))["headers"]["server-timing"]
+    assert value["value"].endswith(f"match;desc={matched}")
+
+
+@pytest.mark.parametrize(
+    "host,expected",
+    [
+        ("Shop.Example.com", "https://store.example.net/a"),
+        ("KVS.Example.com", "https://example.org/a"),
+    ],
+)
+def test_host_lookups_ignore_case(host, expected):
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.net",
+            host_redirects={"shop": "store.example.net"},
+            create_key_value_store=True,
+        ),
+        key_value_store={"kvs.example.com": "example.org"},
+    )
+    response = function.invoke(make_event("/a", host=host))
+    assert response["headers"]["location"]["value"] == expected
+
+
+def test_diagnostics_not_rendered_by_default():
+    code = render_function(redirect_to="example.com", redirect_map={"/a": "/b"})
+    assert "server-timing" not in code
+    assert "matched" not in code
+
+
+def test_unused_lookups_not_rendered():
+    code = render_function(redirect_to="example.com")
+    assert "REDIRECT_MAP" not in code
+    assert "matchRule" not in code
+    assert "HOST_REDIRECTS" not in code
+    assert "GEO_COUNTRIES" not in code
+    assert "weightedHost" not in code
+    code = render_function(
+        redirect_to="example.com",
+        redirect_map={"/a": "/b"},
+        redirect_rules=[{"source": "/c/*", "target": "/d/*"}],
+    )
+    assert "REDIRECT_MAP[uri]" in code
+    assert "matchRule(uri)" in code
+
+
+def test_bench_events():
+    corpus = make_corpus(size=3)
+    results = bench_events(
+        render_function(redirect_to="example.com"), corpus, iterations=60
+    )
+    assert [row["events"] for row in results] == list(corpus)
+    assert all(row["ops_per_sec"] > 0 for row in results)
+    assert all(row["alloc_bytes"] > 0 for row in results)
+
+    compared = compare(results, [dict(results[0], ops_per_sec=1)])
+    assert compared[0]["ops_per_sec_change"].startswith("+")
+    assert compared[1]["ops_per_sec_change"] is None
+
+
+def test_bench_rules_flags_module_limits():
+    results = bench_rules(counts=[10, 600], iterations=60, loads=1)
+    assert [row["module_limits"] for row in results] == ["ok", "code size, entries"]
+
+
+def test_limits_match_locals_tf():
+    with open(LOCALS_TF) as fp:
+        text = fp.read()
+    limits = dict(re.findall(r"cloudfront_function_max_(\w+)\s+= (\d+)", text))
+    assert limits == {"code_size": str(MAX_CODE_SIZE), "entries": str(MAX_ENTRIES)}
+
+
+def test_template_variables_match_locals_tf():
+    with open(LOCALS_TF) as fp:
+        block = re.search(r"templatefile\((.*?)\n  \}\)", fp.read(), re.S).group(1)
+    names = set(re.findall(r"^    (\w+)\s+=", block, re.M))
+    assert names == set(template_variables(redirect_to="example.com"))
@@ -0,0 +1,218 @@
+import re
+from os import path as osp
+
+import pytest
+import requests
+
+from tools.cloudfront_function import MODULE_DIR, weighted_target
+from tools.edge_simulator import (
+    DEFAULTS,
+    VIEWER_IP,
+    Instance,
+    parse_tfvars,
+    serve_in_thread,
+)
+
+ZONE = "example.com"
+
+
+def test_parse_tfvars():
+    text = """
+        region      = "us-west-2"  # comment
+        redirect_to = "infrahouse.com/some-path"
+        // another comment
+        permanent_redirect_ttl = 0
+        single_hop_http_redirect = true
+        permanent_redirect_cache_control = null
+        response_headers = {
+          "x-redirect-by" = "infrahouse"
+          "x-quoted"      = "a \\"b\\" $${c}"
+        }
+        redirect_rules = [
+          { source = "/blog/*", target = "/articles/*" },
+          { source: "/old", target: "/new" },
+        ]
+        redirect_hostnames = ["", "www"]
+    """
+    assert parse_tfvars(text) == {
+        "region": "us-west-2",
+        "redirect_to": "infrahouse.com/some-path",
+        "permanent_redirect_ttl": 0,
+        "single_hop_http_redirect": True,
+        "permanent_redirect_cache_control": None,
+        "response_headers": {"x-redirect-by": "infrahouse", "x-quoted": 'a "b" ${c}'},
+        "redirect_rules": [
+            {"source": "/blog/*", "target": "/articles/*"},
+            {"source": "/old", "target": "/new"},
+        ],
+        "redirect_hostnames": ["", "www"],
+    }
+
+
+@pytest.mark.parametrize(
+    "text", ['redirect_to = "${var.x}"', "redirect_to = var.x", "= 1"]
+)
+def test_parse_tfvars_rejects_expressions(text):
+    with pytest.raises(ValueError):
+        parse_tfvars(text)
+
+
+def test_defaults_match_variables_tf():
+    with open(osp.join(MODULE_DIR, "variables.tf")) as fp:
+        blocks = re.split(r'^variable "', fp.read(), flags=re.M)
+    defaults = {}
+    for block in blocks:
+        match = re.search(r"\n  default\s*=\s*(.*)\n", block)
+        if match:
+            name = block.split('"', 1)[0]
+            defaults[name] = parse_tfvars(f"value = {match.group(1)}")["value"]
+    assert {name: defaults[name] for name in DEFAULTS} == DEFAULTS
+
+
+@pytest.mark.parametrize(
+    "redirect_to,target,expected",
+    [
+        ("infrahouse.com", "/", "https://infrahouse.com/"),
+        ("infrahouse.com", "/a/b?x=1&y=2", "https://infrahouse.com/a/b?x=1&y=2"),
+        ("infrahouse.com/some-path", "/", "https://infrahouse.com/some-path/"),
+        (
+            "infrahouse.com/some-path",
+            "/a/b?x=1",
+            "https://infrahouse.com/some-path/a/b?x=1",
+        ),
+    ],
+)
+@pytest.mark.parametrize("mode", ["s3", "function"])
+def test_modes_agree(mode, redirect_to, target, expected):
+    instance = Instance({"redirect_to": redirect_to}, ZONE, mode=mode)
+    status, headers = instance.handle("GET", ZONE, target)
+    assert status == 301
+    assert headers["location"] == expected
+    assert headers["strict-transport-security"].startswith("max-age=31536000")
+    assert headers["cache-control"] == "max-age=86400"
+
+
+def test_mode_follows_variables_and_request_header():
+    s3 = Instance({"redirect_to": "infrahouse.com"}, ZONE)
+    function = Instance(
+        {"redirect_to": "infrahouse.com", "redirect_map": {"/old": "/new"}}, ZONE
+    )
+    assert (s3.mode, function.mode) == ("s3", "function")
+
+    _, headers = function.handle("GET", ZONE, "/old")
+    assert headers["location"] == "https://infrahouse.com/new"
+    assert headers["x-cache"] == "FunctionGeneratedResponse from cloudfront"
+    _, headers = function.handle("GET", ZONE, "/old", headers={"x-redirect-mode": "s3"})
+    assert headers["location"] == "https://infrahouse.com/old"
+    assert headers["x-cache"] == "Miss from cloudfront"
+
+
+def test_viewer_country():
+    instance = Instance(
+        {
+            "redirect_to": "infrahouse.com",
+            "geo_redirects": {"continents": {"EU": "eu.infrahouse.com"}},
+        },
+        ZONE,
+    )
+    assert instance.mode == "function"
+    country = "cloudfront-viewer-country"
+    for headers, expected in [
+        ({}, "https://infrahouse.com/a"),
+        ({country: "FR"}, "https://eu.infrahouse.com/a"),
+    ]:
+        _, response = instance.handle("GET", ZONE, "/a", headers=headers)
+        assert response["location"] == expected
+
+
+def test_viewer_ip_and_cookies():
+    targets = [
+        {"host": "a.infrahouse.com", "weight": 1},
+        {"host": "b.infrahouse.com", "weight": 1},
+    ]
+    instance = Instance(
+        {
+            "redirect_to": "infrahouse.com",
+            "weighted_targets": targets,
+            "weighted_target_cookie": "visitor",
+        },
+        ZONE,
+    )
+    for headers, key in [
+        ({}, VIEWER_IP),
+        ({"x-forwarded-for": "203.0.113.9, 10.0.0.1"}, "203.0.113.9"),
+        ({"cookie": "a=1; visitor=v-42", "x-forwarded-for": "203.0.113.9"}, "v-42"),
+    ]:
+        _, response = instance.handle("GET", ZONE, "/a", headers=headers)
+        host = weighted_target(targets, key)
+        assert response["location"] == f"https://{host}/a"
+
+
+def test_cloudfront_layer():
+    instance = Instance({"redirect_to": "infrahouse.com"}, ZONE)
+    status, headers = instance.handle("GET", f"www.{ZONE}", "/a?b=c", scheme="http")
+    assert (status, headers["location"]) == (301, f"https://www.{ZONE}/a?b=c")
+    assert instance.handle("GET", f"other.{ZONE}", "/")[0] == 403
+    assert instance.handle("POST", ZONE, "/")[0] == 403
+
+    single_hop = Instance(
+        {"redirect_to": "infrahouse.com", "single_hop_http_redirect": True}, ZONE
+    )
+    status, headers = single_hop.handle("GET", ZONE, "/a", scheme="http")
+    assert (status, headers["location"]) == (301, "https://infrahouse.com/a")
+
+
+def test_non_get_methods():
+    instance = Instance(
+        {"redirect_to": "infrahouse.com", "allow_non_get_methods": True}, ZONE
+    )
+    assert instance.mode == "function"
+    assert instance.handle("POST", ZONE, "/a")[0] == 308
+    assert (
+        instance.handle("POST", ZONE, "/a", headers={"x-redirect-mode": "s3"})[0] == 405
+    )
+
+
+def test_s3_cache():
+    instance = Instance({"redirect_to": "infrahouse.com"}, ZONE)
+    x_cache = [instance.handle("GET", ZONE, "/a?x=1")[1]["x-cache"] for _ in range(2)]
+    assert x_cache == ["Miss from cloudfront", "Hit from cloudfront"]
+    # The cache key holds the whole query string by default.
+    assert (
+        instance.handle("GET", ZONE, "/a?x=2")[1]["x-cache"] == "Miss from cloudfront"
+    )
+
+    temporary = Instance(
+        {
+            "redirect_to": "infrahouse.com",
+            "permanent_redirect": False,
+            "temporary_redirect_ttl": 0,
+        },
+        ZONE,
+        mode="s3",
+    )
+    for _ in range(2):
+        status, headers = temporary.handle("GET", ZONE, "/a")
+        assert (status, headers["x-cache"]) == (302, "Miss from cloudfront")
+        assert headers["cache-control"] == "no-cache"
+
+
+def test_serve_in_thread():
+    instance = Instance({"redirect_to": "infrahouse.com/some-path"}, ZONE)
+    with serve_in_thread(instance) as address:
+        with requests.Session() as session:
+            response = session.get(
+                f"http://{address}/test/path?foo=bar",
+                headers={"Host": ZONE},
+                allow_redirects=False,
+            )
+            assert response.status_code == 301
+            assert response.headers["Location"] == (
+                "https://infrahouse.com/some-path/test/path?foo=bar"
+            )
+            response = session.get(
+                f"http://{address}/",
+                headers={"Host": ZONE, "X-Forwarded-Proto": "http"},
+                allow_redirects=False,
+            )
+            assert response.headers["Location"] == f"https://{ZONE}/"
@@ -0,0 +1,73 @@
+import json
+from os import path as osp
+
+from tools.cloudfront_function import render_function
+from tools.function_harness import (
+    check_expected,
+    check_latency,
+    load_events,
+    main,
+    percentiles,
+    run,
+)
+
+CORPUS_DIR = osp.join(osp.dirname(__file__), "fixtures", "cloudfront_events")
+EVENTS_DIR = osp.join(CORPUS_DIR, "events")
+CONFIGURATION = osp.join(CORPUS_DIR, "configuration.json")
+EXPECTED = osp.join(CORPUS_DIR, "expected.json")
+
+# Generous per-invocation budget for the corpus; the handler takes a few
+# microseconds in QuickJS, so only a large regression trips it.
+LATENCY_BUDGET_US = 500
+
+
+def test_load_events():
+    events = load_events([EVENTS_DIR])
+    assert list(events)[:3] == ["get-path", "get-root", "head"]
+    assert [name for name in events if name.startswith("methods")] == [
+        f"methods[{i}]" for i in range(5)
+    ]
+    single = load_events([osp.join(EVENTS_DIR, "head.json")])
+    assert single["head"]["request"]["method"] == "HEAD"
+
+
+def test_percentiles():
+    assert percentiles([float(i) for i in range(1, 101)]) == {
+        "p50": 51.0,
+        "p99": 100.0,
+        "max": 100.0,
+    }
+
+
+def test_corpus_matches_expected_responses():
+    with open(CONFIGURATION) as fp:
+        code = render_function(**json.load(fp))
+    with open(EXPECTED) as fp:
+        expected = json.load(fp)
+
+    results = run(code, load_events([EVENTS_DIR]), iterations=50)
+
+    assert check_expected(results, expected) == []
+    assert sorted(r["event"] for r in results) == sorted(expected)
+    assert check_latency(results, LATENCY_BUDGET_US) == []
+    assert all(0 <= r["us"]["p50"] <= r["us"]["max"] for r in results)
+
+
+def test_check_expected_reports_changes():
+    code = render_function(redirect_to="example.org")
+    with open(EXPECTED) as fp:
+        expected = json.load(fp)
+    results = run(code, load_events([osp.join(EVENTS_DIR, "head.json")]), 5)
+    assert check_expected(results, expected) == ["head"]
+    assert check_expected(results, {}) == ["head"]
+
+
+def test_main(tmp_path, capsys):
+    saved = tmp_path / "expected.json"
+    argv = [EVENTS_DIR, "--config", CONFIGURATION, "--iterations", "5"]
+    assert main(argv + ["--save-expected", str(saved)]) == 0
+    assert json.loads(saved.read_text()) == json.loads(open(EXPECTED).read())
+    assert main(argv + ["--expected", str(saved), "--json"]) == 0
+    capsys.readouterr()
+    assert main(argv + ["--max-us", "0"]) == 1
+    assert "p50 us" in capsys.readouterr().out
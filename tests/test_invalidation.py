@@ -0,0 +1,173 @@
+import pytest
+
+from tools.invalidation import (
+    ROLE_SESSION_NAME,
+    cloudfront_client,
+    coalesce,
+    drop_covered,
+    invalidate,
+    main,
+    normalize,
+)
+
+
+class FakeCloudFrontClient:
+    """Records ``create_invalidation`` calls and waiter use."""
+
+    def __init__(self):
+        self.invalidations = []
+        self.waited = []
+
+    def create_invalidation(self, DistributionId, InvalidationBatch):
+        self.invalidations.append((DistributionId, InvalidationBatch))
+        return {"Invalidation": {"Id": f"I{len(self.invalidations)}"}}
+
+    def get_waiter(self, name):
+        assert name == "invalidation_completed"
+        client = self
+
+        class Waiter:
+            def wait(self, DistributionId, Id, WaiterConfig):
+                client.waited.append((DistributionId, Id))
+
+        return Waiter()
+
+
+class FakeSession:
+    """Records ``client()`` calls; STS ``assume_role`` returns fixed keys."""
+
+    def __init__(self):
+        self.clients = []
+        self.assumed = []
+
+    def client(self, name, **kwargs):
+        self.clients.append((name, kwargs))
+        session = self
+
+        class STS:
+            def assume_role(self, RoleArn, RoleSessionName):
+                session.assumed.append((RoleArn, RoleSessionName))
+                return {
+                    "Credentials": {
+                        "AccessKeyId": "AK",
+                        "SecretAccessKey": "SK",
+                        "SessionToken": "ST",
+                    }
+                }
+
+        return STS() if name == "sts" else name
+
+
+def test_cloudfront_client():
+    session = FakeSession()
+    assert cloudfront_client(session=session) == "cloudfront"
+    assert session.clients == [("cloudfront", {})]
+    assert session.assumed == []
+
+    role_arn = "arn:aws:iam::123456789012:role/tester"
+    session = FakeSession()
+    assert cloudfront_client(role_arn, session) == "cloudfront"
+    assert session.assumed == [(role_arn, ROLE_SESSION_NAME)]
+    assert session.clients[-1] == (
+        "cloudfront",
+        {
+            "aws_access_key_id": "AK",
+            "aws_secret_access_key": "SK",
+            "aws_session_token": "ST",
+        },
+    )
+
+
+def test_normalize():
+    assert normalize([" /a ", "b", "", "/a", "/c/*"]) == {"/a", "/b", "/c/*"}
+    with pytest.raises(ValueError):
+        normalize(["/a*/b"])
+
+
+def test_drop_covered():
+    assert drop_covered({"/blog/*", "/blog/a", "/blog/a/*", "/blog", "/b*"}) == {"/b*"}
+    assert drop_covered({"/blog/*", "/blog", "/docs/a"}) == {
+        "/blog/*",
+        "/blog",
+        "/docs/a",
+    }
+
+
+@pytest.mark.parametrize(
+    "paths,max_paths,max_wildcards,expected",
+    [
+        (["/a", "/b"], 10, 10, ["/a", "/b"]),
+        (["/*", "/a"], 10, 10, ["/*"]),
+        # deepest groups first, then larger groups
+        (
+            ["/blog/2024/a", "/blog/2024/b", "/blog/2023/a", "/docs/x", "/docs/y"],
+            4,
+            10,
+            ["/blog/2023/a", "/blog/2024/*", "/docs/x", "/docs/y"],
+        ),
+        (
+            ["/blog/2024/a", "/blog/2024/b", "/blog/2023/a", "/docs/x", "/docs/y"],
+            3,
+            10,
+            ["/blog/*", "/docs/x", "/docs/y"],
+        ),
+        # too many wildcards: wildcards are merged, single files stay
+        (["/a/*", "/a/b/*", "/c/d/*", "/c/e/*", "/f"], 10, 2, ["/a/*", "/c/*", "/f"]),
+        (["/a/*", "/c/*", "/f"], 10, 1, ["/*"]),
+    ],
+)
+def test_coalesce(paths, max_paths, max_wildcards, expected):
+    assert coalesce(paths, max_paths, max_wildcards) == expected
+
+
+def test_coalesce_stays_within_limits():
+    paths = [f"/{i % 40}/{i % 7}/page-{i}" for i in range(20000)]
+    result = coalesce(paths)
+    assert len(result) <= 3000
+    assert sum(1 for path in result if path.endswith("*")) <= 15
+    for path in paths:
+        assert any(
+            path == p or (p.endswith("*") and path.startswith(p[:-1])) for p in result
+        ), path
+
+
+def test_invalidate():
+    client = FakeCloudFrontClient()
+    assert invalidate(client, "E1", ["/a", "/b/*"], caller_reference="r") == "I1"
+    assert client.invalidations == [
+        (
+            "E1",
+            {"Paths": {"Quantity": 2, "Items": ["/a", "/b/*"]}, "CallerReference": "r"},
+        )
+    ]
+    assert client.waited == []
+
+    invalidate(client, "E1", ["/*"], wait=True)
+    assert client.waited == [("E1", "I2")]
+
+
+def test_main_dry_run(tmp_path, capsys):
+    paths_file = tmp_path / "paths.txt"
+    paths_file.write_text("/blog/a\n/blog/b\n\n/docs\n")
+    assert (
+        main(
+            [
+                "E1",
+                "--paths-file",
+                str(paths_file),
+                "--paths-json",
+                '["/other"]',
+                "--max-paths",
+                "3",
+                "--dry-run",
+            ]
+        )
+        == 0
+    )
+    assert capsys.readouterr().out.split() == [
+        "[",
+        '"/blog/*",',
+        '"/docs",',
+        '"/other"',
+        "]",
+    ]
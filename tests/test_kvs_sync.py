@@ -0,0 +1,190 @@
+from uuid import uuid4
+
+import pytest
+
+from tools.kvs_sync import (
+    MAX_BATCH_SIZE,
+    KeyValueStore,
+    batches,
+    diff,
+    load_mapping,
+    main,
+    normalize,
+    sync,
+    validate,
+)
+
+
+class FakeKeyValueStoreClient:
+    """
+    Local stand-in for the ``cloudfront-keyvaluestore`` boto3 client.
+
+    Mimics ETag optimistic locking, paginated ListKeys and the UpdateKeys
+    batch size limit, and records every UpdateKeys call.
+    """
+
+    page_size = 7
+
+    def __init__(self, items=None):
+        self.items = dict(items or {})
+        self.etag = uuid4().hex
+        self.updates = []
+
+    def describe_key_value_store(self, KvsARN):
+        return {"KvsARN": KvsARN, "ETag": self.etag, "ItemCount": len(self.items)}
+
+    def list_keys(self, KvsARN, NextToken=None):
+        keys = sorted(self.items)
+        start = int(NextToken or 0)
+        page = keys[start : start + self.page_size]
+        response = {"Items": [{"Key": key, "Value": self.items[key]} for key in page]}
+        if start + self.page_size < len(keys):
+            response["NextToken"] = str(start + self.page_size)
+        return response
+
+    def update_keys(self, KvsARN, IfMatch, Puts, Deletes):
+        if IfMatch != self.etag:
+            raise RuntimeError("ConflictException: ETag mismatch")
+        if len(Puts) + len(Deletes) > MAX_BATCH_SIZE:
+            raise RuntimeError("ValidationException: too many keys")
+        self.updates.append((Puts, Deletes))
+        for item in Puts:
+            self.items[item["Key"]] = item["Value"]
+        for item in Deletes:
+            del self.items[item["Key"]]
+        self.etag = uuid4().hex
+        return {"ETag": self.etag, "ItemCount": len(self.items)}
+
+
+def test_diff():
+    puts, deletes = diff(
+        {"/a": "/1", "/b": "/2", "/c": "/3"},
+        {"/a": "/1", "/b": "/old", "/d": "/4"},
+    )
+    assert puts == {"/b": "/2", "/c": "/3"}
+    assert deletes == ["/d"]
+
+
+def test_diff_no_prune():
+    assert diff({"/a": "/1"}, {"/d": "/4"}, prune=False) == ({"/a": "/1"}, [])
+
+
+def test_batches():
+    puts = {f"/p{i:03}": "/x" for i in range(120)}
+    deletes = [f"/d{i:03}" for i in range(5)]
+    result = list(batches(puts, deletes, batch_size=50))
+    assert [len(p) + len(d) for p, d in result] == [50, 50, 25]
+    assert result[-1][1] == deletes
+    merged = {}
+    for batch_puts, _ in result:
+        merged.update(batch_puts)
+    assert merged == puts
+
+
+@pytest.mark.parametrize("batch_size", [0, MAX_BATCH_SIZE + 1])
+def test_batches_rejects_size(batch_size):
+    with pytest.raises(ValueError):
+        list(batches({"/a": "/b"}, [], batch_size=batch_size))
+
+
+@pytest.mark.parametrize(
+    "mapping",
+    [{"/" + "a" * 600: "/b"}, {"/a": "x" * 1025}, {"/a": ""}],
+)
+def test_validate_rejects(mapping):
+    with pytest.raises(ValueError):
+        validate(mapping)
+
+
+def test_sync_pushes_only_changes():
+    remote = {f"/keep{i}": "/same" for i in range(30)}
+    remote.update({"/changed": "/old", "/gone": "/x"})
+    client = FakeKeyValueStoreClient(remote)
+    store = KeyValueStore(client, "arn:aws:cloudfront::123456789012:key-value-store/x")
+
+    local = {f"/keep{i}": "/same" for i in range(30)}
+    local.update({"/changed": "/new", "www.example.com": "docs.example.com"})
+    local.update({f"/new{i}": f"/target{i}" for i in range(60)})
+
+    result = sync(store, local)
+
+    assert client.items == local
+    assert result.puts == 62
+    assert result.deletes == 1
+    assert result.unchanged == 30
+    assert result.batches == 2
+    written = {item["Key"] for puts, _ in client.updates for item in puts}
+    assert not any(key.startswith("/keep") for key in written)
+
+    # A second run is a no-op
+    client.updates.clear()
+    result = sync(store, local)
+    assert result.puts == result.deletes == result.batches == 0
+    assert client.updates == []
+
+
+def test_sync_dry_run():
+    client = FakeKeyValueStoreClient({"/a": "/1"})
+    store = KeyValueStore(client, "arn")
+    result = sync(store, {"/b": "/2"}, dry_run=True)
+    assert (result.puts, result.deletes, result.batches) == (1, 1, 0)
+    assert client.items == {"/a": "/1"}
+
+
+def test_normalize():
+    assert normalize(
+        {
+            "/old": "https://example.com/new",
+            "Docs.Example.COM": "http://docs.example.net",
+            "www.example.com": "/landing/",
+        },
+        default_host="example.com",
+    ) == {
+        "/old": "/new",
+        "docs.example.com": "docs.example.net",
+        "www.example.com": "/landing",
+    }
+
+
+@pytest.mark.parametrize(
+    "mapping",
+    [
+        {"/a": 1},
+        {"/a": None},
+        {"/a": "https://example.com/new?x=1"},
+        {"/a": "ftp://example.com/"},
+        {"/a": "https://exa mple.com/new"},
+        {"/a": "https://example.com:8080/new"},
+        {"not a host": "/new"},
+        {"www.example.com": "/a", "WWW.example.com": "/b"},
+        {"www.example.com": "/"},
+    ],
+)
+def test_normalize_rejects(mapping):
+    with pytest.raises(ValueError):
+        normalize(mapping)
+
+
+def test_sync_lowercases_host_keys():
+    client = FakeKeyValueStoreClient()
+    sync(KeyValueStore(client, "arn"), {"WWW.Example.com": "example.net/"})
+    assert client.items == {"www.example.com": "example.net"}
+
+
+def test_load_mapping_json(tmp_path):
+    path = tmp_path / "mapping.json"
+    path.write_text('{"/old": "https://example.com/new", "WWW.example.com": "/x"}')
+    assert load_mapping(str(path), default_host="example.com") == {
+        "/old": "/new",
+        "www.example.com": "/x",
+    }
+
+    path.write_text('{"/old": "https://example.com/new?utm=1"}')
+    with pytest.raises(ValueError):
+        load_mapping(str(path))
+    # Rejected before any request to the store
+    assert main(["--kvs-arn", "arn", str(path)]) == 1
+
+    path.write_text('["/old", "/new"]')
+    with pytest.raises(ValueError):
+        load_mapping(str(path))
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from tools.load_benchmark import (
+    Workload,
+    expected_location,
+    main,
+    parse_weighted,
+    percentiles,
+    run,
+    same_location,
+    start_stand_in,
+)
+
+
+@pytest.fixture
+def closed_port():
+    """A local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run_against_stand_in(workload, stand_in_to="example.com", **kwargs):
+    async def scenario():
+        server = await start_stand_in(stand_in_to)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await run(f"http://127.0.0.1:{port}", workload, **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def test_parse_weighted():
+    assert parse_weighted(["/@8", "/blog/{n}@2", "/pricing", "@3", "a=b@c"]) == (
+        ["/", "/blog/{n}", "/pricing", "", "a=b@c"],
+        [8.0, 2.0, 1.0, 3.0, 1.0],
+    )
+    with pytest.raises(ValueError):
+        parse_weighted(["/@-1"])
+
+
+def test_workload_is_repeatable():
+    def requests(seed):
+        workload = Workload(
+            methods=["GET@9", "HEAD@1"],
+            paths=["/", "/blog/{n}"],
+            queries=["@1", "utm_source=mail@1"],
+            cache_bust=0.5,
+            seed=seed,
+        )
+        return [workload.next_request() for _ in range(1000)]
+
+    first = requests(0)
+    assert first == requests(0)
+    assert first != requests(1)
+    assert {method for method, _ in first} == {"GET", "HEAD"}
+    assert all("{n}" not in target for _, target in first)
+    busted = sum("cachebust=" in target for _, target in first)
+    assert 400 < busted < 600
+    assert len({t for _, t in first if "cachebust=" in t}) == busted
+
+
+@pytest.mark.parametrize(
+    "redirect_to,target,expected",
+    [
+        ("example.com", "/", "https://example.com/"),
+        ("example.com/landing", "/a?b=c", "https://example.com/landing/a?b=c"),
+        ("http://example.com/", "/a", "http://example.com/a"),
+    ],
+)
+def test_expected_location(redirect_to, target, expected):
+    assert expected_location(redirect_to, target) == expected
+
+
+def test_same_location():
+    assert same_location(
+        "https://EXAMPLE.com/a?x=1&y=2", "https://example.com/a?y=2&x=1"
+    )
+    assert same_location("https://example.com", "https://example.com/")
+    assert not same_location("https://example.com/a?x=1", "https://example.com/a")
+    assert not same_location("http://example.com/a", "https://example.com/a")
+    assert not same_location(None, "https://example.com/")
+
+
+def test_percentiles():
+    assert percentiles([i / 1000 for i in range(1, 101)]) == {
+        "p50": 50.0,
+        "p90": 90.0,
+        "p99": 99.0,
+    }
+    assert percentiles([]) == {"p50": None, "p90": None, "p99": None}
+
+
+def test_run_against_stand_in():
+    workload = Workload(
+        methods=["GET@3", "HEAD@1", "POST@1"],
+        paths=["/", "/pricing", "/blog/{n}"],
+        queries=["@1", "utm_source=mail&utm_medium=email@1"],
+        cache_bust=0.2,
+    )
+    results = _run_against_stand_in(
+        workload, requests=300, concurrency=8, redirect_to="example.com"
+    )
+    report = results.report()
+
+    assert not results.failed, report
+    assert report["requests"] == 300
+    assert report["statuses"] == {"301": 300}
+    assert report["connections"] == 8
+    assert report["tls_handshake_ms"]["p50"] is None
+    latency = report["latency_ms"]
+    assert latency["Hit"]["requests"] + latency["Miss"]["requests"] == 300
+    assert latency["Hit"]["requests"] > 0
+    assert latency["all"]["p99"] >= latency["all"]["p50"] > 0
+
+
+def test_run_records_responses():
+    results = _run_against_stand_in(
+        Workload(paths=["/a"]), requests=4, concurrency=1, record=True
+    )
+    assert len(results.records) == 4
+    assert results.records[0]["target"] == "/a"
+    assert results.records[0]["status"] == 301
+    assert [r["x_cache"] for r in results.records[:2]] == [
+        "Miss from cloudfront",
+        "Hit from cloudfront",
+    ]
+    assert all(r["latency_ms"] > 0 for r in results.records)
+    assert results.records[0]["server_timing"] is None
+
+
+def test_run_reports_mismatches():
+    results = _run_against_stand_in(
+        Workload(paths=["/a"]),
+        requests=20,
+        concurrency=2,
+        keep_alive=False,
+        redirect_to="example.org",
+    )
+    report = results.report()
+    assert results.failed
+    assert report["connections"] == 20
+    assert report["mismatches"] == {"location": 20}
+    assert report["mismatch_examples"][0] == {
+        "method": "GET",
+        "target": "/a",
+        "status": 301,
+        "location": "https://example.com/a",
+    }
+
+
+def test_run_counts_connection_errors(closed_port):
+    results = asyncio.run(
+        run(f"http://127.0.0.1:{closed_port}", Workload(), requests=5)
+    )
+    assert results.report()["errors"] == {"ConnectionRefusedError": 5}
+    assert results.failed
+
+
+def test_main_json(capsys, closed_port):
+    assert (
+        main(["run", f"http://127.0.0.1:{closed_port}", "--requests", "2", "--json"])
+        == 1
+    )
+    report = json.loads(capsys.readouterr().out)
+    assert report["requests"] == 0
+    assert sum(report["errors"].values()) == 2
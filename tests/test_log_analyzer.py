@@ -0,0 +1,109 @@
+import gzip
+import json
+import os
+import shutil
+from os import path as osp
+
+import pytest
+
+from tools.log_analyzer import (
+    LEGACY_FIELDS,
+    Summary,
+    TopCounter,
+    analyze,
+    list_sources,
+    main,
+    parse_records,
+    summarize_file,
+)
+
+FIXTURES_DIR = osp.join(osp.dirname(__file__), "fixtures", "cloudfront_logs")
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    """Fixture logs gzipped the way CloudFront delivers them, one per hour."""
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        hour_dir = tmp_path / name.split(".")[1]
+        hour_dir.mkdir()
+        with open(osp.join(FIXTURES_DIR, name), "rb") as src:
+            with gzip.open(hour_dir / f"{name}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+    return str(tmp_path)
+
+
+def test_parse_records_uses_fields_header():
+    lines = [
+        "#Version: 1.0",
+        "#Fields: date cs-uri-stem sc-status",
+        "2024-05-01\t/a\t301",
+        "",
+        "2024-05-01\t/b\t308",
+    ]
+    assert list(parse_records(lines)) == [
+        {"date": "2024-05-01", "cs-uri-stem": "/a", "sc-status": "301"},
+        {"date": "2024-05-01", "cs-uri-stem": "/b", "sc-status": "308"},
+    ]
+
+
+def test_parse_records_without_header():
+    line = "\t".join(str(i) for i in range(len(LEGACY_FIELDS)))
+    (record,) = parse_records([line])
+    assert record["time-taken"] == str(LEGACY_FIELDS.index("time-taken"))
+
+
+def test_summarize_file_gzip_and_plain(log_dir):
+    name = "E2EXAMPLE.2024-05-01-10.a1b2c3d4"
+    plain = summarize_file(osp.join(FIXTURES_DIR, name))
+    gzipped = summarize_file(osp.join(log_dir, "2024-05-01-10", name + ".gz"))
+    assert plain.report() == gzipped.report()
+    assert plain.requests == 10
+
+
+def test_analyze(log_dir):
+    sources = list(list_sources(log_dir))
+    assert len(sources) == 2
+
+    report = analyze(sources, workers=2).report(top=3)
+
+    assert report["files"] == 2
+    assert report["requests"] == 16
+    assert report["edge_hit_ratio"] == 0.6875
+    assert report["origin_share"] == 0.25
+    assert report["time_taken"] == {"p50": 0.002, "p95": 0.9, "p99": 0.9}
+    assert report["result_types"] == {
+        "Hit": 10,
+        "Miss": 3,
+        "RefreshHit": 1,
+        "FunctionGeneratedResponse": 1,
+        "Error": 1,
+    }
+    assert report["statuses"] == {"301": 14, "308": 1, "403": 1}
+    assert report["top_paths"] == [("/", 7), ("/pricing", 4), ("/blog/post 1", 2)]
+
+
+def test_merge_matches_single_pass(log_dir):
+    merged = Summary()
+    single = Summary()
+    for source in list_sources(log_dir):
+        merged.merge(summarize_file(source))
+        for record in parse_records(gzip.open(source, "rt").read().splitlines()):
+            single.add(record)
+    single.files = merged.files
+    assert merged.report() == single.report()
+
+
+def test_top_counter_is_bounded():
+    counter = TopCounter(capacity=10)
+    for i in range(1000):
+        counter.add(f"/unique/{i}")
+        if i % 5 == 0:
+            counter.add("/popular")
+    assert len(counter.counts) <= 20
+    assert counter.most_common(1) == [("/popular", 200)]
+
+
+def test_main_json(log_dir, capsys):
+    assert main([log_dir, "--workers", "1", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["requests"] == 16
@@ -0,0 +1,58 @@
+import re
+from os import path as osp
+
+import pyarrow.parquet
+
+from tools.log_analyzer import LEGACY_FIELDS, list_sources
+from tools.log_converter import column_name, convert, log_fields, main, partition
+
+FIXTURES_DIR = osp.join(osp.dirname(__file__), "fixtures", "cloudfront_logs")
+LOCALS_TF = osp.join(osp.dirname(__file__), "..", "locals.tf")
+
+
+def test_column_name():
+    assert column_name("cs(Host)") == "cs_host"
+    assert column_name("x-edge-result-type") == "x_edge_result_type"
+    assert column_name("date") == "date"
+
+
+def test_log_fields_match_locals_tf():
+    # The Glue table reads Parquet columns by position, so the fields the
+    # converter writes must be the fields CloudFront is asked to deliver.
+    with open(LOCALS_TF) as fp:
+        block = re.search(r"cloudfront_log_all_fields = \[(.*?)\]", fp.read(), re.S)
+    assert re.findall(r'"([^"]+)"', block.group(1)) == LEGACY_FIELDS
+    assert "cs(Cookie)" not in log_fields()
+    assert log_fields(include_cookies=True) == LEGACY_FIELDS
+
+
+def test_partition():
+    record = {"date": "2024-05-01", "time": "09:59:59"}
+    assert partition(record) == "year=2024/month=05/day=01/hour=09"
+
+
+def test_convert(tmp_path):
+    files, records = convert(list_sources(FIXTURES_DIR), str(tmp_path), workers=2)
+    assert (files, records) == (2, 16)
+
+    hour = tmp_path / "year=2024" / "month=05" / "day=01" / "hour=10"
+    table = pyarrow.parquet.read_table(
+        hour / "E2EXAMPLE.2024-05-01-10.a1b2c3d4.parquet"
+    )
+    assert table.num_rows == 10
+    assert table.column_names == [column_name(f) for f in log_fields()]
+    assert set(table.schema.types) == {pyarrow.string()}
+    row = table.slice(0, 1).to_pylist()[0]
+    assert row["cs_uri_stem"] == "/"
+    assert row["cs_uri_query"] == "utm_source=mail"
+    assert row["time_taken"] == "0.001"
+
+    dataset = pyarrow.parquet.read_table(tmp_path, partitioning="hive")
+    assert dataset.num_rows == 16
+
+
+def test_main_include_cookies(tmp_path):
+    source = osp.join(FIXTURES_DIR, "E2EXAMPLE.2024-05-01-11.e5f6a7b8")
+    assert main([source, str(tmp_path), "--workers", "1", "--include-cookies"]) == 0
+    (parquet,) = tmp_path.glob("year=2024/month=05/day=01/hour=11/*.parquet")
+    assert "cs_cookie" in pyarrow.parquet.read_schema(parquet).names
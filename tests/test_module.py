@@ -1,18 +1,16 @@
 import json
 from os import path as osp
 from textwrap import dedent
-from time import time
+from time import sleep, time
 
 import pytest
 from pytest_infrahouse import terraform_apply
 from requests import get, request
 
-from tests.conftest import (
-    LOG,
-    TERRAFORM_ROOT_DIR,
-    update_terraform_tf,
-    cleanup_dot_terraform,
-)
+from tests.conftest import LOG, TERRAFORM_ROOT_DIR, prepare_terraform_root
+from tools.cloudfront_function import weighted_target
+from tools.kvs_sync import KeyValueStore, sync
+from tools.server_timing import describe
 
 
 @pytest.mark.parametrize(
@@ -39,10 +37,7 @@ from tests.conftest import (
     ids=["hostname", "path"],
 )
 def test_module(
-    subzone,
-    test_role_arn,
-    keep_after,
-    aws_region,
+    redirect_stack,
     boto3_session,
     aws_provider_version,
     redirect_to,
@@ -50,38 +45,9 @@ def test_module(
     expected_path,
     expected_deep_path,
 ):
-    # Get zone ID from subzone fixture
-    zone_id = subzone["subzone_id"]["value"]
-
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "main")
-    cleanup_dot_terraform(terraform_module_dir)
-    update_terraform_tf(terraform_module_dir, aws_provider_version)
-
-    with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
-        fp.write(
-            dedent(
-                f"""
-                    region       = "{aws_region}"
-                    test_zone_id = "{zone_id}"
-                    redirect_to  = "{redirect_to}"
-                    """
-            )
-        )
-        if test_role_arn:
-            fp.write(
-                dedent(
-                    f"""
-                    role_arn = "{test_role_arn}"
-                    """
-                )
-            )
-
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=not keep_after,
-        json_output=True,
+    with redirect_stack.apply(
+        aws_provider_version, redirect_to=redirect_to
     ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
         zone_name = tf_output["zone_name"]["value"]
 
         LOG.info(f"Testing redirect_to={redirect_to}")
@@ -201,9 +167,9 @@ def test_shared_certificate_dns_records(
     zone_id = subzone["subzone_id"]["value"]
 
     # Use test_data/main with create_certificate_dns_records = false
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "main")
-    cleanup_dot_terraform(terraform_module_dir)
-    update_terraform_tf(terraform_module_dir, aws_provider_version)
+    terraform_module_dir = prepare_terraform_root(
+        osp.join(TERRAFORM_ROOT_DIR, "main"), aws_provider_version
+    )
 
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(
@@ -295,10 +261,7 @@ def test_shared_certificate_dns_records(
     ids=["hostname", "path"],
 )
 def test_non_get_methods(
-    subzone,
-    test_role_arn,
-    keep_after,
-    aws_region,
+    redirect_stack,
     boto3_session,
     aws_provider_version,
     redirect_to,
@@ -320,41 +283,12 @@ def test_non_get_methods(
     2. POST with query string preserves query parameters and custom header
     3. GET still returns 301 (not broken by the change) with custom header
     """
-    zone_id = subzone["subzone_id"]["value"]
-
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "main")
-    cleanup_dot_terraform(terraform_module_dir)
-    update_terraform_tf(terraform_module_dir, aws_provider_version)
-
-    with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
-        fp.write(
-            dedent(
-                f"""
-                region                = "{aws_region}"
-                test_zone_id          = "{zone_id}"
-                redirect_to           = "{redirect_to}"
-                allow_non_get_methods = true
-                response_headers      = {{
-                  "x-redirect-by" = "infrahouse"
-                }}
-                """
-            )
-        )
-        if test_role_arn:
-            fp.write(
-                dedent(
-                    f"""
-                role_arn = "{test_role_arn}"
-                """
-                )
-            )
-
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=not keep_after,
-        json_output=True,
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to=redirect_to,
+        allow_non_get_methods=True,
+        response_headers={"x-redirect-by": "infrahouse"},
     ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
         zone_name = tf_output["zone_name"]["value"]
 
         LOG.info(f"Testing non-GET methods with redirect_to={redirect_to}")
@@ -422,6 +356,11 @@ def test_non_get_methods(
 # Feature-specific tests run on v6 only to avoid doubling CI time
 # with no additional coverage value.
 @pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+@pytest.mark.parametrize(
+    "shared_policies, shared_logs_bucket",
+    [(False, False), (True, False), (False, True)],
+    ids=["own-policies", "shared-policies", "shared-logs-bucket"],
+)
 def test_multi_instance(
     subzone,
     test_role_arn,
@@ -429,6 +368,8 @@ def test_multi_instance(
     aws_region,
     boto3_session,
     aws_provider_version,
+    shared_policies,
+    shared_logs_bucket,
 ):
     """
     Test that two module instances can coexist in the same AWS account and zone.
@@ -436,12 +377,18 @@ def test_multi_instance(
     This verifies the fix for name collisions in CloudFront cache policy,
     response headers policy, and S3 logs bucket that occurred when multiple
     module instances shared the same Route53 zone.
+
+    With shared_policies, both instances use one policy set from the
+    redirect-policies submodule instead of creating their own.
+
+    With shared_logs_bucket, both instances log to one existing bucket,
+    each under its own prefix, instead of creating a bucket each.
     """
     zone_id = subzone["subzone_id"]["value"]
 
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "multi_instance")
-    cleanup_dot_terraform(terraform_module_dir)
-    update_terraform_tf(terraform_module_dir, aws_provider_version)
+    terraform_module_dir = prepare_terraform_root(
+        osp.join(TERRAFORM_ROOT_DIR, "multi_instance"), aws_provider_version
+    )
 
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(
@@ -453,6 +400,8 @@ def test_multi_instance(
                 redirect_hostnames_1 = ["multi1"]
                 redirect_to_2        = "infrahouse.com/docs"
                 redirect_hostnames_2 = ["multi2"]
+                shared_policies      = {str(shared_policies).lower()}
+                shared_logs_bucket   = {str(shared_logs_bucket).lower()}
                 """
             )
         )
@@ -488,9 +437,30 @@ def test_multi_instance(
             "E"
         ), f"Invalid CloudFront distribution ID for instance 2: {cf_id_2}"
         assert cf_id_1 != cf_id_2, "Distributions must be different"
+
+        policy_1 = tf_output["instance_1_cache_policy_id"]["value"]
+        policy_2 = tf_output["instance_2_cache_policy_id"]["value"]
+        assert (policy_1 == policy_2) == shared_policies, (policy_1, policy_2)
         LOG.info(f"Instance 1 CloudFront: {cf_id_1}")
         LOG.info(f"Instance 2 CloudFront: {cf_id_2}")
 
+        # Verify where each distribution writes its logs
+        bucket_1 = tf_output["instance_1_cloudfront_logs_bucket_name"]["value"]
+        bucket_2 = tf_output["instance_2_cloudfront_logs_bucket_name"]["value"]
+        assert (bucket_1 == bucket_2) == shared_logs_bucket, (bucket_1, bucket_2)
+        cloudfront = boto3_session.client("cloudfront")
+        for cf_id, bucket, prefix in (
+            (cf_id_1, bucket_1, "cloudfront-logs/instance-1/"),
+            (cf_id_2, bucket_2, "cloudfront-logs/instance-2/"),
+        ):
+            logging_config = cloudfront.get_distribution_config(Id=cf_id)[
+                "DistributionConfig"
+            ]["Logging"]
+            assert logging_config["Enabled"]
+            assert logging_config["Bucket"] == f"{bucket}.s3.amazonaws.com"
+            assert logging_config["Prefix"] == prefix
+            LOG.info(f"✓ {cf_id} logs to s3://{bucket}/{prefix}")
+
         # Verify instance 1 redirects to infrahouse.com
         source_url = f"https://multi1.{zone_name}/?{cache_bust}"
         response = get(source_url, allow_redirects=False)
@@ -519,3 +489,914 @@ def test_multi_instance(
 
         LOG.info("=" * 70)
         LOG.info("All multi-instance tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+@pytest.mark.parametrize(
+    "response_headers",
+    [{}, {"x-redirect-by": "infrahouse"}],
+    ids=["s3", "function"],
+)
+def test_single_hop_http_redirect(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+    response_headers,
+):
+    """
+    Test that plain-HTTP requests are redirected straight to the target
+    when single_hop_http_redirect is enabled.
+
+    Runs in both S3 routing-rule mode (no response_headers) and
+    CloudFront Function mode (response_headers set).
+
+    Verifies:
+    1. http://<zone>/path?query returns 301 to https://<target>/path?query
+       (no intermediate redirect to https://<zone>/...)
+    2. HTTPS requests still redirect to the same target
+    """
+    redirect_to = "infrahouse.com/some-path"
+    expected_path = "https://infrahouse.com/some-path/test/path"
+
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to=redirect_to,
+        single_hop_http_redirect=True,
+        response_headers=response_headers,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info(f"Testing single-hop HTTP redirect with redirect_to={redirect_to}")
+        LOG.info("=" * 70)
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        # Test 1: HTTP goes straight to the target
+        source_url = f"http://{zone_name}/test/path?foo=bar&{cache_bust}"
+        response = get(source_url, allow_redirects=False)
+        assert (
+            response.status_code == 301
+        ), f"Expected 301 for HTTP, got {response.status_code}"
+        location = response.headers["Location"]
+        location_path = location.split("?")[0]
+        assert (
+            location_path == expected_path
+        ), f"Expected {expected_path}, got {location_path}"
+        assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+        assert cache_bust in location, f"Cache-bust parameter not in {location}"
+        LOG.info(f"✓ {source_url} → {location}")
+
+        # Test 2: HTTPS behaves exactly as before
+        source_url = f"https://{zone_name}/test/path?{cache_bust}&scheme=https"
+        response = get(source_url, allow_redirects=False)
+        assert (
+            response.status_code == 301
+        ), f"Expected 301 for HTTPS, got {response.status_code}"
+        location_path = response.headers["Location"].split("?")[0]
+        assert (
+            location_path == expected_path
+        ), f"Expected {expected_path}, got {location_path}"
+        LOG.info(f"✓ {source_url} → {response.headers['Location']}")
+
+        LOG.info("=" * 70)
+        LOG.info("All single-hop HTTP redirect tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_redirect_map(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test exact-path redirects from redirect_map compiled into the
+    CloudFront Function.
+
+    Verifies:
+    1. A mapped path redirects to a path on the redirect_to hostname
+    2. A mapped path redirects to a different hostname
+    3. Query strings are preserved on mapped paths
+    4. Unmapped paths fall back to redirect_to
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com/some-path",
+        redirect_map={
+            "/old/page.html": "/new/page",
+            "/legacy": "docs.infrahouse.com/start",
+        },
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing redirect_map")
+        LOG.info("=" * 70)
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        for source_path, expected in [
+            ("/old/page.html", "https://infrahouse.com/new/page"),
+            ("/legacy", "https://docs.infrahouse.com/start"),
+            ("/unmapped", "https://infrahouse.com/some-path/unmapped"),
+        ]:
+            source_url = f"https://{zone_name}{source_path}?foo=bar&{cache_bust}"
+            response = get(source_url, allow_redirects=False)
+            assert (
+                response.status_code == 301
+            ), f"Expected 301 for {source_path}, got {response.status_code}"
+            location = response.headers["Location"]
+            location_path = location.split("?")[0]
+            assert (
+                location_path == expected
+            ), f"Expected {expected}, got {location_path}"
+            assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+            LOG.info(f"✓ {source_url} → {location}")
+
+        LOG.info("=" * 70)
+        LOG.info("All redirect_map tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_redirect_rules(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test wildcard redirect_rules matched by longest source prefix.
+
+    Matching semantics are covered offline in tests/test_redirect_rules.py;
+    this test checks the compiled rules on a deployed distribution.
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        redirect_rules=[
+            {"source": "/blog/*", "target": "docs.infrahouse.com/articles/*"},
+            {"source": "/blog/legacy/*", "target": "/archive"},
+        ],
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing redirect_rules")
+        LOG.info("=" * 70)
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        for source_path, expected in [
+            ("/blog/2024/post", "https://docs.infrahouse.com/articles/2024/post"),
+            ("/blog/legacy/old/post", "https://infrahouse.com/archive"),
+            ("/other", "https://infrahouse.com/other"),
+        ]:
+            source_url = f"https://{zone_name}{source_path}?foo=bar&{cache_bust}"
+            response = get(source_url, allow_redirects=False)
+            assert (
+                response.status_code == 301
+            ), f"Expected 301 for {source_path}, got {response.status_code}"
+            location = response.headers["Location"]
+            assert (
+                location.split("?")[0] == expected
+            ), f"Expected {expected}, got {location}"
+            assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+            LOG.info(f"✓ {source_url} → {location}")
+
+        LOG.info("=" * 70)
+        LOG.info("All redirect_rules tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_key_value_store(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test redirect entries served from a CloudFront KeyValueStore.
+
+    Verifies:
+    1. Before sync, requests fall back to redirect_to
+    2. tools.kvs_sync pushes path and host entries to the store
+    3. Path entries redirect to their exact target, with query strings
+    4. Host entries replace redirect_to for that host
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        redirect_hostnames=["", "kvs"],
+        create_key_value_store=True,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+        kvs_arn = tf_output["key_value_store_arn"]["value"]
+
+        LOG.info("Testing KeyValueStore redirects")
+        LOG.info("=" * 70)
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        # Test 1: empty store falls back to redirect_to
+        source_url = f"https://{zone_name}/old-page?{cache_bust}"
+        response = get(source_url, allow_redirects=False)
+        assert response.status_code == 301
+        location_path = response.headers["Location"].split("?")[0]
+        assert location_path == "https://infrahouse.com/old-page"
+        LOG.info(f"✓ {source_url} → {response.headers['Location']}")
+
+        # Test 2: push entries with the sync tool
+        store = KeyValueStore(
+            boto3_session.client("cloudfront-keyvaluestore", region_name="us-east-1"),
+            kvs_arn,
+        )
+        result = sync(
+            store,
+            {
+                "/old-page": "/new-page",
+                f"kvs.{zone_name}": "docs.infrahouse.com/kvs",
+            },
+        )
+        assert result.puts == 2
+
+        # Test 3 and 4: entries take effect without republishing the function.
+        # KeyValueStore changes propagate to edge locations within seconds.
+        expected = {
+            f"https://{zone_name}/old-page": "https://infrahouse.com/new-page",
+            f"https://kvs.{zone_name}/any/path": "https://docs.infrahouse.com/kvs/any/path",
+        }
+        for source, expected_path in expected.items():
+            source_url = f"{source}?foo=bar&{cache_bust}"
+            for _ in range(30):
+                response = get(source_url, allow_redirects=False)
+                location = response.headers["Location"]
+                if location.split("?")[0] == expected_path:
+                    break
+                sleep(10)
+            assert response.status_code == 301
+            assert (
+                location.split("?")[0] == expected_path
+            ), f"Expected {expected_path}, got {location}"
+            assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+            LOG.info(f"✓ {source_url} → {location}")
+
+        LOG.info("=" * 70)
+        LOG.info("All KeyValueStore tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+@pytest.mark.parametrize("behavior", ["all", "function"])
+def test_cache_key_query_string_behavior(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+    behavior,
+):
+    """
+    Test that tracking parameters are copied into the Location header and
+    never leak between viewers, with S3 redirects and with function-mode
+    query handling.
+
+    Two viewers request the same path with different tracking parameters,
+    alternately. If a redirect were served from a cache entry that ignores
+    them, the second viewer would get the first viewer's parameters.
+
+    Verifies:
+    1. Every response carries the requesting viewer's own parameters
+    2. No response carries another viewer's parameters
+    3. In function mode, no response is a cache hit
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        cache_key_query_string_behavior=behavior,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing query string handling (%s)", behavior)
+        LOG.info("=" * 70)
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+        viewers = {
+            "alice": "utm_source=newsletter&utm_campaign=alice&gclid=a1",
+            "bob": "utm_source=twitter&utm_campaign=bob&gclid=b2",
+        }
+
+        for _ in range(3):
+            for viewer, tracking in viewers.items():
+                source_url = (
+                    f"https://{zone_name}/campaign?page=2&{tracking}&{cache_bust}"
+                )
+                response = get(source_url, allow_redirects=False)
+                assert response.status_code == 301
+                location = response.headers["Location"]
+                assert location.startswith("https://infrahouse.com/campaign?")
+                for param in ["page=2", *tracking.split("&")]:
+                    assert param in location, f"{param} not in {location}"
+                for other in viewers:
+                    if other != viewer:
+                        assert (
+                            f"utm_campaign={other}" not in location
+                        ), f"{other}'s parameters leaked to {viewer}: {location}"
+                x_cache = response.headers.get("x-cache", "")
+                if behavior == "function":
+                    assert "Hit" not in x_cache, f"Unexpected cache hit: {x_cache}"
+                LOG.info(f"✓ {source_url} → {location} ({x_cache})")
+
+        LOG.info("=" * 70)
+        LOG.info("All query string handling tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_edge_only(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test edge-only mode: the CloudFront Function answers every request
+    and no S3 redirect bucket is created.
+
+    Verifies:
+    1. No S3 bucket is created (s3_bucket_name output is null)
+    2. The distribution has the viewer-request function associated
+    3. GET requests for the root and a path are redirected with the
+       query string preserved, by the function rather than the origin
+    """
+    with redirect_stack.apply(
+        aws_provider_version, redirect_to="infrahouse.com/some-path", edge_only=True
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing edge-only mode")
+        LOG.info("=" * 70)
+
+        assert tf_output["s3_bucket_name"]["value"] is None
+
+        cloudfront = boto3_session.client("cloudfront")
+        distribution_id = tf_output["cloudfront_distribution_id"]["value"]
+        config = cloudfront.get_distribution_config(Id=distribution_id)
+        behavior = config["DistributionConfig"]["DefaultCacheBehavior"]
+        associations = behavior["FunctionAssociations"]
+        assert associations["Quantity"] == 1
+        assert associations["Items"][0]["EventType"] == "viewer-request"
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        for source_path, expected in [
+            ("/", "https://infrahouse.com/some-path/"),
+            ("/test/path", "https://infrahouse.com/some-path/test/path"),
+        ]:
+            source_url = f"https://{zone_name}{source_path}?foo=bar&{cache_bust}"
+            response = get(source_url, allow_redirects=False)
+            assert (
+                response.status_code == 301
+            ), f"Expected 301 for {source_path}, got {response.status_code}"
+            location = response.headers["Location"]
+            assert (
+                location.split("?")[0] == expected
+            ), f"Expected {expected}, got {location}"
+            assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+            x_cache = response.headers.get("x-cache", "")
+            assert (
+                "FunctionGeneratedResponse" in x_cache
+            ), f"Expected a function-generated response, got {x_cache}"
+            LOG.info(f"✓ {source_url} → {location} ({x_cache})")
+
+        LOG.info("=" * 70)
+        LOG.info("All edge-only tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+@pytest.mark.parametrize(
+    "caching,response_headers,expected_status,expected_cache_control",
+    [
+        (
+            {"permanent_redirect_cache_control": "public, max-age=31536000, immutable"},
+            {},
+            301,
+            "public, max-age=31536000, immutable",
+        ),
+        (
+            {"permanent_redirect_cache_control": "public, max-age=31536000, immutable"},
+            {"X-Redirect-By": "infrahouse"},
+            301,
+            "public, max-age=31536000, immutable",
+        ),
+        (
+            {"permanent_redirect": False, "temporary_redirect_ttl": 0},
+            {},
+            302,
+            "no-cache",
+        ),
+    ],
+    ids=["s3-permanent", "function-permanent", "s3-temporary"],
+)
+def test_redirect_caching(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+    caching,
+    response_headers,
+    expected_status,
+    expected_cache_control,
+):
+    """
+    Test per-status-class caching settings in S3 and CloudFront Function mode.
+
+    Verifies:
+    1. The Cache-Control header matches the configured value in both modes
+       (added by the response headers policy in S3 mode, by the function
+       in function mode)
+    2. A zero temporary_redirect_ttl keeps S3 redirects out of the edge cache
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        response_headers=response_headers,
+        **caching,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing redirect caching: %s", caching)
+        LOG.info("=" * 70)
+
+        source_url = f"https://{zone_name}/page?cachebust={int(time() * 1000)}"
+        for _ in range(2):
+            response = get(source_url, allow_redirects=False)
+            assert response.status_code == expected_status
+            cache_control = response.headers.get("Cache-Control")
+            assert (
+                cache_control == expected_cache_control
+            ), f"Expected Cache-Control {expected_cache_control}, got {cache_control}"
+            x_cache = response.headers.get("x-cache", "")
+            if expected_status == 302:
+                assert "Hit" not in x_cache, f"Unexpected cache hit: {x_cache}"
+            LOG.info(f"✓ {source_url} → {cache_control} ({x_cache})")
+
+        LOG.info("=" * 70)
+        LOG.info("All redirect caching tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_parquet_logging(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test Parquet access logs (standard logging v2) with a Glue table.
+
+    Verifies:
+    1. The distribution has no legacy logging configuration
+    2. A log delivery writes Parquet to hour partitions in the logging bucket
+    3. The Glue table uses partition projection over the same location
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        cloudfront_logging_format="parquet",
+        create_log_table=True,
+    ) as tf_output:
+        bucket_name = tf_output["cloudfront_logs_bucket_name"]["value"]
+        distribution_id = tf_output["cloudfront_distribution_id"]["value"]
+
+        LOG.info("Testing Parquet logging")
+        LOG.info("=" * 70)
+
+        cloudfront = boto3_session.client("cloudfront")
+        config = cloudfront.get_distribution_config(Id=distribution_id)
+        assert not config["DistributionConfig"]["Logging"]["Enabled"]
+
+        logs = boto3_session.client("logs", region_name="us-east-1")
+        deliveries = [
+            delivery
+            for delivery in logs.describe_deliveries()["deliveries"]
+            if delivery["deliverySourceName"] == f"cf-{distribution_id}"
+        ]
+        assert len(deliveries) == 1, deliveries
+        s3_config = deliveries[0]["s3DeliveryConfiguration"]
+        assert (
+            s3_config["suffixPath"]
+            == "cloudfront-logs/year={yyyy}/month={MM}/day={dd}/hour={HH}"
+        )
+        destination = logs.get_delivery_destination(
+            name=deliveries[0]["deliveryDestinationArn"].split(":")[-1]
+        )["deliveryDestination"]
+        assert destination["outputFormat"] == "parquet"
+        LOG.info(f"✓ Delivery {deliveries[0]['id']} → {bucket_name} (parquet)")
+
+        database, table_name = tf_output["cloudfront_logs_table"]["value"].split(".")
+        table = boto3_session.client("glue").get_table(
+            DatabaseName=database, Name=table_name
+        )["Table"]
+        assert table["Parameters"]["projection.enabled"] == "true"
+        assert table["Parameters"]["storage.location.template"] == (
+            f"s3://{bucket_name}/cloudfront-logs/"
+            "year=${year}/month=${month}/day=${day}/hour=${hour}"
+        )
+        assert [key["Name"] for key in table["PartitionKeys"]] == [
+            "year",
+            "month",
+            "day",
+            "hour",
+        ]
+        LOG.info(f"✓ Glue table {database}.{table_name} with partition projection")
+
+        LOG.info("=" * 70)
+        LOG.info("All Parquet logging tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_host_redirects(
+    redirect_stack,
+    boto3_session,
+    aws_provider_version,
+):
+    """
+    Test per-host targets packed into several distributions.
+
+    Verifies:
+    1. Three hostnames with hosts_per_distribution = 2 are served by two
+       distributions, each with its own certificate
+    2. Hosts in host_redirects go to their own target, with path and query
+       string appended
+    3. Other hosts go to redirect_to
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        redirect_hostnames=["hosts"],
+        hosts_per_distribution=2,
+        host_redirects={
+            "multi1": "infrahouse.com/one",
+            "multi2": "infrahouse.com/docs",
+        },
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing host redirects")
+        LOG.info("=" * 70)
+
+        distributions = tf_output["cloudfront_distributions"]["value"]
+        assert sorted(distributions) == ["0", "1"]
+        assert distributions["0"]["aliases"] == [
+            f"hosts.{zone_name}",
+            f"multi1.{zone_name}",
+        ]
+        assert distributions["1"]["aliases"] == [f"multi2.{zone_name}"]
+
+        cloudfront = boto3_session.client("cloudfront")
+        certificates = {
+            cloudfront.get_distribution_config(Id=distribution["id"])[
+                "DistributionConfig"
+            ]["ViewerCertificate"]["ACMCertificateArn"]
+            for distribution in distributions.values()
+        }
+        assert len(certificates) == 2
+
+        cache_bust = f"cachebust={int(time() * 1000)}"
+
+        for hostname, expected in [
+            ("hosts", "https://infrahouse.com/page"),
+            ("multi1", "https://infrahouse.com/one/page"),
+            ("multi2", "https://infrahouse.com/docs/page"),
+        ]:
+            source_url = f"https://{hostname}.{zone_name}/page?foo=bar&{cache_bust}"
+            response = get(source_url, allow_redirects=False)
+            assert (
+                response.status_code == 301
+            ), f"Expected 301 for {source_url}, got {response.status_code}"
+            location = response.headers["Location"]
+            assert (
+                location.split("?")[0] == expected
+            ), f"Expected {expected}, got {location}"
+            assert "foo=bar" in location, f"Query parameter 'foo' not in {location}"
+            LOG.info(f"✓ {source_url} → {location}")
+
+        LOG.info("=" * 70)
+        LOG.info("All host redirect tests PASSED!")
+
+
+# AWS provider compatibility is covered by test_module (both v5 and v6).
+# Feature-specific tests run on v6 only to avoid doubling CI time
+# with no additional coverage value.
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_invalidate_on_change(redirect_stack, aws_provider_version):
+    """
+    Test that a new redirect_to replaces cached S3 redirects right away
+    with invalidate_on_change.
+
+    Verifies:
+    1. A redirect is served from the edge cache on the second request
+    2. After redirect_to changes, the same URL redirects to the new target
+       without waiting for the cached redirect to expire
+    """
+    source_path = f"/invalidation-{int(time() * 1000)}"
+    for target in ["infrahouse.com/one", "infrahouse.com/two"]:
+        with redirect_stack.apply(
+            aws_provider_version,
+            redirect_to=target,
+            invalidate_on_change=True,
+            wait_for_invalidation=True,
+        ) as tf_output:
+            zone_name = tf_output["zone_name"]["value"]
+            source_url = f"https://{zone_name}{source_path}"
+            expected = f"https://{target}{source_path}"
+
+            LOG.info(f"Testing {source_url} with redirect_to={target}")
+            for _ in range(2):
+                response = get(source_url, allow_redirects=False)
+                assert response.status_code == 301
+                location = response.headers["Location"]
+                assert location == expected, f"Expected {expected}, got {location}"
+                LOG.info(f"✓ {source_url} → {location}")
+            x_cache = response.headers.get("x-cache", "")
+            assert "Hit" in x_cache, f"Expected a cache hit, got {x_cache}"
+
+    LOG.info("=" * 70)
+    LOG.info("Invalidation on change test PASSED!")
+
+
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_monitoring(redirect_stack, boto3_session, aws_provider_version):
+    """
+    Test create_monitoring.
+
+    Verifies:
+    1. Additional metrics are enabled on the distribution
+    2. Distribution and function alarms exist in us-east-1, tagged like the
+       distribution
+    3. The dashboard exists in us-east-1
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        response_headers={"X-Redirect-By": "infrahouse"},
+        create_monitoring=True,
+    ) as tf_output:
+        distribution_id = tf_output["cloudfront_distribution_id"]["value"]
+        alarm_arns = tf_output["monitoring_alarm_arns"]["value"]
+        dashboard_name = tf_output["monitoring_dashboard_name"]["value"]
+
+        cloudfront = boto3_session.client("cloudfront")
+        subscription = cloudfront.get_monitoring_subscription(
+            DistributionId=distribution_id
+        )["MonitoringSubscription"]
+        assert (
+            subscription["RealtimeMetricsSubscriptionConfig"][
+                "RealtimeMetricsSubscriptionStatus"
+            ]
+            == "Enabled"
+        )
+        LOG.info(f"✓ Additional metrics enabled on {distribution_id}")
+
+        cloudwatch = boto3_session.client("cloudwatch", region_name="us-east-1")
+        alarms = cloudwatch.describe_alarms(AlarmNames=list(alarm_arns))["MetricAlarms"]
+        metrics = sorted(alarm["MetricName"] for alarm in alarms)
+        assert metrics == [
+            "5xxErrorRate",
+            "FunctionComputeUtilization",
+            "FunctionThrottles",
+            "OriginLatency",
+        ]
+        for alarm in alarms:
+            tags = {
+                tag["Key"]: tag["Value"]
+                for tag in cloudwatch.list_tags_for_resource(
+                    ResourceARN=alarm["AlarmArn"]
+                )["Tags"]
+            }
+            assert tags["created_by_module"] == "infrahouse/http-redirect/aws"
+            assert "module_version" in tags
+            LOG.info(f"✓ Alarm {alarm['AlarmName']} on {alarm['MetricName']}")
+
+        dashboard = cloudwatch.get_dashboard(DashboardName=dashboard_name)
+        widgets = json.loads(dashboard["DashboardBody"])["widgets"]
+        assert len(widgets) == 7
+        LOG.info(f"✓ Dashboard {dashboard_name} with {len(widgets)} widgets")
+
+    LOG.info("=" * 70)
+    LOG.info("Monitoring test PASSED!")
+
+
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_diagnostics_headers(redirect_stack, aws_provider_version):
+    """
+    Test the Server-Timing header of diagnostics_headers.
+
+    Verifies:
+    1. S3 website redirects carry CloudFront's Server-Timing: a cache miss,
+       then a hit, and a request ID
+    2. CloudFront Function redirects report the function mode, what matched
+       and a request ID, after a Server-Timing value from response_headers
+    """
+    source_path = f"/diagnostics-{int(time() * 1000)}"
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        diagnostics_headers=True,
+    ) as tf_output:
+        source_url = f"https://{tf_output['zone_name']['value']}{source_path}"
+        caches = []
+        for _ in range(2):
+            response = get(source_url, allow_redirects=False)
+            assert response.status_code == 301
+            described = describe(response.headers.get("Server-Timing"))
+            assert described["mode"] == "s3", response.headers
+            assert described["request_id"]
+            caches.append(described["cache"])
+            LOG.info(f"✓ {source_url}: {response.headers['Server-Timing']}")
+        assert caches == ["miss", "hit"]
+
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com",
+        redirect_map={source_path: "/mapped"},
+        response_headers={"Server-Timing": "app;desc=redirect"},
+        diagnostics_headers=True,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+        for path, matched in [(source_path, "map"), ("/other", "default")]:
+            response = get(f"https://{zone_name}{path}", allow_redirects=False)
+            assert response.status_code == 301
+            server_timing = response.headers["Server-Timing"]
+            assert server_timing.startswith("app;desc=redirect, edge;dur=")
+            described = describe(server_timing)
+            assert described["mode"] == "function"
+            assert described["match"] == matched
+            assert described["request_id"]
+            LOG.info(f"✓ {path}: {server_timing}")
+
+    LOG.info("=" * 70)
+    LOG.info("Diagnostics headers test PASSED!")
+
+
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_geo_redirects(redirect_stack, aws_provider_version):
+    """
+    Test regional targets chosen by the viewer's country.
+
+    Every continent maps to the regional host, so the test runner's own
+    location picks it wherever it runs.
+
+    Verifies:
+    1. Requests go to the regional host instead of the redirect_to hostname,
+       keeping the redirect_to path, request path and query string
+    2. redirect_map path targets go to the regional host too
+    3. Server-Timing reports the viewer country that picked the host
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com/landing",
+        redirect_map={"/geo-old": "/geo-new"},
+        geo_redirects={
+            "continents": {
+                continent: "www.infrahouse.com"
+                for continent in ["AF", "AN", "AS", "EU", "NA", "OC", "SA"]
+            }
+        },
+        diagnostics_headers=True,
+    ) as tf_output:
+        zone_name = tf_output["zone_name"]["value"]
+
+        LOG.info("Testing geo redirects")
+        LOG.info("=" * 70)
+
+        for path, expected in [
+            ("/page?foo=bar", "https://www.infrahouse.com/landing/page?foo=bar"),
+            ("/geo-old", "https://www.infrahouse.com/geo-new"),
+        ]:
+            source_url = f"https://{zone_name}{path}"
+            response = get(source_url, allow_redirects=False)
+            assert (
+                response.status_code == 301
+            ), f"Expected 301 for {source_url}, got {response.status_code}"
+            location = response.headers["Location"]
+            assert location == expected, f"Expected {expected}, got {location}"
+            described = describe(response.headers["Server-Timing"])
+            assert described["geo"], response.headers["Server-Timing"]
+            LOG.info(f"✓ {source_url} → {location} (viewer in {described['geo']})")
+
+    LOG.info("=" * 70)
+    LOG.info("Geo redirects test PASSED!")
+
+
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_weighted_targets(redirect_stack, aws_provider_version):
+    """
+    Test the weighted split of redirected traffic across target hosts.
+
+    Verifies:
+    1. A viewer keeps landing on the same host, with the permanent_redirect
+       status code
+    2. The weighted_target_cookie value selects the host, as
+       tools.cloudfront_function.weighted_target predicts
+    3. A host with weight 0 gets no viewers
+    """
+    targets = [
+        {"host": "www.infrahouse.com", "weight": 3},
+        {"host": "infrahouse.com", "weight": 1},
+        {"host": "drained.infrahouse.com", "weight": 0},
+    ]
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com/landing",
+        permanent_redirect=False,
+        weighted_targets=targets,
+        weighted_target_cookie="visitor",
+    ) as tf_output:
+        source_url = f"https://{tf_output['zone_name']['value']}/page"
+
+        LOG.info("Testing weighted targets")
+        LOG.info("=" * 70)
+
+        locations = set()
+        for _ in range(3):
+            response = get(source_url, allow_redirects=False)
+            assert response.status_code == 302
+            locations.add(response.headers["Location"])
+        assert len(locations) == 1, locations
+        LOG.info(f"✓ This viewer always goes to {locations.pop()}")
+
+        hosts = set()
+        for number in range(20):
+            visitor = f"visitor-{number}"
+            response = get(
+                source_url, cookies={"visitor": visitor}, allow_redirects=False
+            )
+            host = weighted_target(targets, visitor)
+            assert response.status_code == 302
+            assert response.headers["Location"] == f"https://{host}/landing/page"
+            hosts.add(host)
+        assert "drained.infrahouse.com" not in hosts
+        LOG.info(f"✓ Cookie-selected hosts: {sorted(hosts)}")
+
+    LOG.info("=" * 70)
+    LOG.info("Weighted targets test PASSED!")
+
+
+@pytest.mark.parametrize("aws_provider_version", ["~> 6.0"], ids=["aws-6"])
+def test_target_canonicalization(redirect_stack, aws_provider_version):
+    """
+    Test the canonicalization of redirect targets.
+
+    Verifies:
+    1. Trailing slashes of redirect_to do not double the slash before the
+       request path
+    2. Duplicate slashes are collapsed, the path is lowercased, index files
+       are dropped and a trailing slash is added, but not to file names
+    3. The query string is not changed
+    """
+    with redirect_stack.apply(
+        aws_provider_version,
+        redirect_to="infrahouse.com/landing/",
+        redirect_map={"/old": "/New/Index.html"},
+        target_canonicalization={
+            "trailing_slash": "add",
+            "collapse_slashes": True,
+            "lowercase": True,
+            "index_files": ["index.html"],
+        },
+    ) as tf_output:
+        source = f"https://{tf_output['zone_name']['value']}"
+
+        LOG.info("Testing target canonicalization")
+        LOG.info("=" * 70)
+
+        for path, expected in [
+            ("/", "https://infrahouse.com/landing/"),
+            ("//Docs///Guide", "https://infrahouse.com/landing/docs/guide/"),
+            ("/a/Index.html?Q=X", "https://infrahouse.com/landing/a/?Q=X"),
+            ("/files/report.pdf", "https://infrahouse.com/landing/files/report.pdf"),
+            ("/old", "https://infrahouse.com/new/"),
+        ]:
+            response = get(source + path, allow_redirects=False)
+            assert response.status_code == 301
+            assert response.headers["Location"] == expected
+            LOG.info(f"✓ {path} -> {expected}")
+
+    LOG.info("=" * 70)
+    LOG.info("Target canonicalization test PASSED!")
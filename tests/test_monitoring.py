@@ -0,0 +1,204 @@
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from os import path as osp
+
+import pytest
+
+from tools.cloudfront_function import MODULE_DIR
+from tools.monitoring import (
+    ALARMS,
+    DEFAULT_THRESHOLDS,
+    alarm_episodes,
+    dashboard_variables,
+    evaluate,
+    load_samples,
+    main,
+    metric_data_queries,
+    quiet_threshold,
+    render_dashboard,
+)
+
+SAMPLES = osp.join(
+    osp.dirname(__file__), "fixtures", "cloudwatch_metrics", "get-metric-data.json"
+)
+START = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def at(period):
+    return START + timedelta(minutes=5 * period)
+
+
+def samples(*values):
+    return [(at(i), value) for i, value in enumerate(values) if value is not None]
+
+
+def widget_titles(dashboard):
+    return [widget["properties"]["title"] for widget in dashboard["widgets"]]
+
+
+def test_thresholds_match_variables_tf():
+    with open(osp.join(MODULE_DIR, "variables.tf")) as fp:
+        block = fp.read().split('variable "monitoring_thresholds"', 1)[1]
+    block = block.split("\n}\n", 1)[0]
+    defaults = {
+        name: float(value)
+        for name, value in re.findall(
+            r"(\w+)\s*=\s*optional\(number,\s*([\d.]+)\)", block
+        )
+    }
+    assert defaults == DEFAULT_THRESHOLDS
+
+
+def test_alarms_match_locals_tf():
+    with open(osp.join(MODULE_DIR, "locals.tf")) as fp:
+        text = fp.read()
+    for name, alarm in ALARMS.items():
+        block = re.search(rf"\n\s+{name} = \{{\n(.*?)\n\s+\}}", text, re.S).group(1)
+        attributes = dict(re.findall(r"(\w+)\s*=\s*(.+)", block))
+        assert attributes["metric_name"] == f'"{alarm.metric_name}"'
+        assert attributes["statistic"] == f'"{alarm.statistic}"'
+        assert int(attributes["evaluation_periods"]) == alarm.evaluation_periods
+        assert int(attributes["datapoints_to_alarm"]) == alarm.datapoints_to_alarm
+        assert attributes["threshold"] == f"var.monitoring_thresholds.{alarm.threshold}"
+
+
+def test_dashboard():
+    dashboard = render_dashboard(["E1", "E2"], "redirect-all-methods-abc")
+    assert widget_titles(dashboard) == [
+        "Requests",
+        "Error rate (%)",
+        "Cache hit rate (%)",
+        "Origin latency p90 (ms)",
+        "Function compute utilization (%)",
+        "Function invocations",
+        "Bytes downloaded",
+    ]
+    properties = [widget["properties"] for widget in dashboard["widgets"]]
+    assert {p["region"] for p in properties} == {"us-east-1"}
+    assert properties[1]["metrics"] == [
+        ["AWS/CloudFront", metric, "DistributionId", id_, "Region", "Global"]
+        for metric in ["4xxErrorRate", "5xxErrorRate"]
+        for id_ in ["E1", "E2"]
+    ]
+    assert properties[3]["annotations"]["horizontal"][0]["value"] == 1000
+    assert properties[4]["metrics"] == [
+        [
+            "AWS/CloudFront",
+            "FunctionComputeUtilization",
+            "FunctionName",
+            "redirect-all-methods-abc",
+            "Region",
+            "Global",
+        ]
+    ]
+
+
+def test_dashboard_without_origin_or_function():
+    dashboard = render_dashboard(
+        ["E1"], edge_only=True, thresholds={"error_5xx_rate": 5}
+    )
+    assert widget_titles(dashboard) == [
+        "Requests",
+        "Error rate (%)",
+        "Bytes downloaded",
+    ]
+    assert dashboard["widgets"][1]["properties"]["annotations"]["horizontal"] == [
+        {"label": "5xx alarm", "value": 5}
+    ]
+    assert dashboard_variables(["E1"])["thresholds"]["origin_latency_ms"] == 1000
+
+
+def test_metric_data_queries():
+    queries = metric_data_queries("E1")
+    assert [query["Id"] for query in queries] == ["origin_latency", "error_5xx_rate"]
+    assert queries[0]["MetricStat"]["Stat"] == "p90"
+    assert queries[0]["MetricStat"]["Metric"]["Dimensions"] == [
+        {"Name": "DistributionId", "Value": "E1"},
+        {"Name": "Region", "Value": "Global"},
+    ]
+    assert len(metric_data_queries("E1", "redirect-all-methods-abc")) == len(ALARMS)
+
+
+def test_load_samples():
+    loaded = load_samples(SAMPLES)
+    assert set(loaded) == set(ALARMS)
+    latency = loaded["origin_latency"]
+    assert latency[0] == (START, 142.0)
+    assert [timestamp for timestamp, _ in latency] == sorted(
+        timestamp for timestamp, _ in latency
+    )
+    # One period has no datapoint
+    assert len(latency) == 23
+
+
+@pytest.mark.parametrize(
+    "values,expected",
+    [
+        # 2 of 3 periods above the threshold
+        ((1, 5, 5, 1, 1), ["OK", "OK", "ALARM", "ALARM", "OK"]),
+        ((5, 1, 5, 1, 5), ["OK", "OK", "ALARM", "OK", "ALARM"]),
+        # a single spike does not fire
+        ((1, 5, 1, 1, 5), ["OK"] * 5),
+        # missing periods are not breaching
+        ((5, None, None, 5, 1), ["OK"] * 5),
+        # the threshold itself is not breaching
+        ((3, 3, 3), ["OK"] * 3),
+    ],
+)
+def test_evaluate(values, expected):
+    evaluation = evaluate(ALARMS["origin_latency"], samples(*values), threshold=3)
+    assert [state for _, _, state in evaluation] == expected
+    assert [value for _, value, _ in evaluation] == list(values)
+
+
+def test_evaluate_single_datapoint_alarm():
+    evaluation = evaluate(ALARMS["function_throttles"], samples(0, 2, 0), threshold=0)
+    assert [state for _, _, state in evaluation] == ["OK", "ALARM", "OK"]
+
+
+def test_recorded_samples():
+    loaded = load_samples(SAMPLES)
+
+    latency = evaluate(ALARMS["origin_latency"], loaded["origin_latency"], 1000)
+    assert alarm_episodes(latency) == [(at(11), at(12), 1620.0)]
+    assert quiet_threshold(ALARMS["origin_latency"], loaded["origin_latency"]) == 1450.5
+    latency = evaluate(ALARMS["origin_latency"], loaded["origin_latency"], 1450.5)
+    assert alarm_episodes(latency) == []
+
+    utilization = evaluate(
+        ALARMS["function_compute_utilization"],
+        loaded["function_compute_utilization"],
+        70,
+    )
+    assert alarm_episodes(utilization) == [(at(22), at(22), 78.5)]
+
+    errors = evaluate(ALARMS["error_5xx_rate"], loaded["error_5xx_rate"], 1)
+    assert alarm_episodes(errors) == []
+
+
+def test_quiet_threshold_without_enough_datapoints():
+    assert quiet_threshold(ALARMS["origin_latency"], samples(5, None, None, 7)) is None
+    assert quiet_threshold(ALARMS["origin_latency"], []) is None
+
+
+def test_main_replay(capsys):
+    assert (
+        main(["replay", SAMPLES, "--threshold", "origin_latency_ms=1500", "--json"])
+        == 0
+    )
+    report = {entry["alarm"]: entry for entry in json.loads(capsys.readouterr().out)}
+    assert report["origin_latency"]["threshold"] == 1500
+    assert report["origin_latency"]["episodes"] == []
+    assert report["function_throttles"]["episodes"] == [
+        {
+            "start": at(22).isoformat(),
+            "end": at(22).isoformat(),
+            "peak": 3.0,
+        }
+    ]
+
+
+def test_main_rejects_unknown_threshold():
+    with pytest.raises(SystemExit):
+        main(["replay", SAMPLES, "--threshold", "latency=1"])
@@ -0,0 +1,95 @@
+from io import StringIO
+from textwrap import dedent
+
+import pytest
+
+from tools.redirect_map import compact_target, load_csv, load_nginx
+
+
+@pytest.mark.parametrize(
+    "target,default_host,expected",
+    [
+        ("/new", None, "/new"),
+        ("https://example.com/new", None, "example.com/new"),
+        ("https://example.com/new", "example.com", "/new"),
+        ("http://docs.example.com", "example.com", "docs.example.com/"),
+        ("docs.example.com/page", None, "docs.example.com/page"),
+        ("https://example.com//new//page/", None, "example.com/new/page/"),
+        ("//new/page", None, "/new/page"),
+    ],
+)
+def test_compact_target(target, default_host, expected):
+    assert compact_target(target, default_host) == expected
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        "https://example.com/new?a=1",
+        "/new#top",
+        "ftp://example.com/",
+        "https:///new",
+        "https://user@example.com/new",
+        "https://example.com:8443/new",
+        "exa_mple.com/new",
+    ],
+)
+def test_compact_target_rejects(target):
+    with pytest.raises(ValueError):
+        compact_target(target)
+
+
+def test_load_csv():
+    fp = StringIO(
+        dedent(
+            """\
+            source,target
+            /old/page.html,https://example.com/new/page
+            # comment
+            /about-us,https://docs.example.com/about
+
+            /dup,/first
+            /dup,/second
+            /bad,https://example.com/?q=1
+            """
+        )
+    )
+    assert load_csv(fp, default_host="example.com") == {
+        "/old/page.html": "/new/page",
+        "/about-us": "docs.example.com/about",
+        "/dup": "/first",
+    }
+
+
+def test_load_nginx():
+    fp = StringIO(
+        dedent(
+            """\
+            server {
+                rewrite ^/old/page\\.html$ https://example.com/new permanent;
+                rewrite ^/legacy.php$ /modern redirect;
+                rewrite ^/blog/(.*)$ https://blog.example.com/$1 permanent;
+                rewrite ^/internal$ /handler last;
+
+                location = /contact {
+                    return 301 https://support.example.com/contact;
+                }
+                location /prefix {
+                    return 301 https://example.com/ignored;
+                }
+            }
+            map $uri $new_uri {
+                default "";
+                /from-map   https://example.com/to-map;
+                "/quoted"   "/unquoted";
+            }
+            """
+        )
+    )
+    assert load_nginx(fp, default_host="example.com") == {
+        "/old/page.html": "/new",
+        "/legacy.php": "/modern",
+        "/contact": "support.example.com/contact",
+        "/from-map": "/to-map",
+        "/quoted": "/unquoted",
+    }
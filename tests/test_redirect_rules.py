@@ -0,0 +1,57 @@
+import pytest
+
+from tools.benchmark import make_event
+from tools.cloudfront_function import (
+    CloudFrontFunction,
+    compile_redirect_rules,
+    render_function,
+)
+
+RULES = [
+    {"source": "/blog/*", "target": "news.example.com/articles/*"},
+    {"source": "/blog/*", "target": "ignored.example.com"},
+    {"source": "/docs/v1/*", "target": "docs.example.com/legacy/*"},
+    {"source": "/docs/*", "target": "/documentation"},
+    {"source": "/shop/old/*", "target": "/store/*"},
+]
+
+
+@pytest.fixture(scope="module")
+def function():
+    return CloudFrontFunction(
+        render_function(
+            redirect_to="example.com/home",
+            redirect_map={"/blog/pinned": "/pinned"},
+            redirect_rules=RULES,
+        )
+    )
+
+
+def test_compile_redirect_rules_first_wins():
+    assert compile_redirect_rules(RULES) == {
+        "/blog/": "news.example.com/articles/*",
+        "/docs/v1/": "docs.example.com/legacy/*",
+        "/docs/": "/documentation",
+        "/shop/old/": "/store/*",
+    }
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("/blog/2024/post", "https://news.example.com/articles/2024/post"),
+        ("/blog/", "https://news.example.com/articles/"),
+        ("/docs/v1/api/index.html", "https://docs.example.com/legacy/api/index.html"),
+        ("/docs/v2/api", "https://example.com/documentation"),
+        ("/shop/old/item/42", "https://example.com/store/item/42"),
+        # exact redirect_map entries win over rules
+        ("/blog/pinned", "https://example.com/pinned"),
+        # no matching rule: fall back to redirect_to
+        ("/blog", "https://example.com/home/blog"),
+        ("/shop/new/item", "https://example.com/home/shop/new/item"),
+        ("/", "https://example.com/home/"),
+    ],
+)
+def test_longest_prefix_match(function, uri, expected):
+    response = function.invoke(make_event(uri, {"utm_source": {"value": "x"}}))
+    assert response["headers"]["location"]["value"] == expected + "?utm_source=x"
@@ -0,0 +1,205 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from tools.load_benchmark import start_stand_in
+from tools.redirect_verifier import (
+    expected_redirect,
+    generate,
+    load_rows,
+    main,
+    summarize,
+    verify,
+)
+from tools.cloudfront_function import CloudFrontFunction, render_function
+
+
+async def _start_destination():
+    """Local destination site: 200 for everything but /moved, which redirects."""
+
+    async def handle(reader, writer):
+        while True:
+            request = await reader.readline()
+            if not request:
+                break
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            if request.split()[1] == b"/moved":
+                writer.write(
+                    b"HTTP/1.1 301 Moved\r\nLocation: /final\r\n"
+                    b"Content-Length: 0\r\n\r\n"
+                )
+            else:
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def _port(server):
+    return server.sockets[0].getsockname()[1]
+
+
+def _verify(make_rows, **kwargs):
+    """Run ``verify()`` with a stand-in redirecting to a local destination."""
+
+    async def scenario():
+        destination = await _start_destination()
+        base = f"http://127.0.0.1:{_port(destination)}"
+        stand_in = await start_stand_in(base)
+        source = f"http://127.0.0.1:{_port(stand_in)}"
+        async with destination, stand_in:
+            return await verify(make_rows(source, base), **kwargs)
+
+    return asyncio.run(scenario())
+
+
+def test_load_rows():
+    rows = load_rows(
+        io.StringIO(
+            "source,expected_location,expected_status\n"
+            "# comment\n"
+            "https://old.example.com/a,https://example.com/a,308\n"
+            "\n"
+            "https://old.example.com/b,https://example.com/b\n"
+        )
+    )
+    assert rows == [
+        {
+            "source": "https://old.example.com/a",
+            "expected_location": "https://example.com/a",
+            "expected_status": 308,
+        },
+        {
+            "source": "https://old.example.com/b",
+            "expected_location": "https://example.com/b",
+            "expected_status": 301,
+        },
+    ]
+    with pytest.raises(ValueError, match="Line 1"):
+        load_rows(io.StringIO("https://old.example.com/a\n"))
+    with pytest.raises(ValueError, match="invalid status"):
+        load_rows(io.StringIO("/a,/b,moved\n"))
+
+
+def test_verify():
+    def rows(source, base):
+        return [
+            # Lands in one hop
+            {
+                "source": f"{source}/page?b=2&a=1",
+                "expected_location": f"{base}/page?a=1&b=2",
+                "expected_status": 301,
+            },
+            # Wrong expectation
+            {
+                "source": f"{source}/page",
+                "expected_location": f"{base}/other",
+                "expected_status": 302,
+            },
+            # Destination redirects again
+            {
+                "source": f"{source}/moved",
+                "expected_location": f"{base}/moved",
+                "expected_status": 301,
+            },
+        ]
+
+    passed, mismatched, chained = _verify(rows, concurrency=2, rate=100)
+
+    assert passed["problems"] == []
+    assert passed["hops"] == 1
+    assert mismatched["problems"] == ["status", "location"]
+    assert chained["problems"] == ["chain"]
+    assert chained["hops"] == 2
+    assert chained["chain"][1].endswith("/final")
+    assert summarize([passed, mismatched, chained]) == {
+        "rows": 3,
+        "passed": 1,
+        "status": 1,
+        "location": 1,
+        "chain": 1,
+    }
+
+
+def test_verify_no_follow():
+    def rows(source, base):
+        return [
+            {
+                "source": f"{source}/moved",
+                "expected_location": f"{base}/moved",
+                "expected_status": 301,
+            }
+        ]
+
+    (result,) = _verify(rows, follow=False)
+    assert result["problems"] == []
+    assert result["hops"] == 1
+
+
+def test_verify_reports_connection_errors():
+    rows = [
+        {
+            "source": "http://127.0.0.1:1/",
+            "expected_location": "https://example.com/",
+            "expected_status": 301,
+        }
+    ]
+    (result,) = asyncio.run(verify(rows))
+    assert result["problems"][0].startswith("error: ConnectionRefusedError")
+
+
+def test_expected_redirect_uses_module_function():
+    function = CloudFrontFunction(
+        render_function(
+            redirect_to="example.com/landing",
+            redirect_map={"/old": "/new"},
+            host_redirects={"shop": "store.example.net"},
+            zone_name="example.org",
+        )
+    )
+    assert expected_redirect(function, "https://old.example.org/a?x=1") == (
+        "https://example.com/landing/a?x=1",
+        301,
+    )
+    assert expected_redirect(function, "https://old.example.org/old?x=1") == (
+        "https://example.com/new?x=1",
+        301,
+    )
+    assert expected_redirect(function, "https://shop.example.org/cart", "POST") == (
+        "https://store.example.net/cart",
+        308,
+    )
+
+
+def test_generate_and_check(tmp_path, capsys):
+    rows = generate(
+        ["https://old.example.com/", "https://old.example.com/a?utm_source=mail"],
+        {"redirect_to": "example.com", "permanent_redirect": False},
+    )
+    assert rows[1] == {
+        "source": "https://old.example.com/a?utm_source=mail",
+        "expected_location": "https://example.com/a?utm_source=mail",
+        "expected_status": 302,
+    }
+
+    sources = tmp_path / "urls.txt"
+    sources.write_text("http://127.0.0.1:1/a\n")
+    config = tmp_path / "redirect.json"
+    config.write_text(json.dumps({"redirect_to": "example.com"}))
+    expected = tmp_path / "expected.csv"
+    assert (
+        main(["generate", str(sources), "--config", str(config), "-o", str(expected)])
+        == 0
+    )
+    assert expected.read_text() == (
+        "source,expected_location,expected_status\n"
+        "http://127.0.0.1:1/a,https://example.com/a,301\n"
+    )
+
+    assert main(["check", str(expected), "--timeout", "2"]) == 1
+    (line,) = capsys.readouterr().out.splitlines()
+    assert json.loads(line)["problems"][0].startswith("error:")
@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import pytest
+
+from tools.edge_simulator import Instance, serve_in_thread
+from tools.load_benchmark import Workload, run
+from tools.server_timing import Metric, aggregate, describe, main, parse
+
+CLOUDFRONT_MISS = (
+    'cdn-upstream-layer;desc="EDGE",cdn-upstream-dns;dur=0,'
+    "cdn-upstream-connect;dur=114,cdn-upstream-fbl;dur=177,cdn-cache-miss,"
+    'cdn-pop;desc="PHX50-C2",'
+    'cdn-rid;desc="yNPsyYn7skvTzwWkq3Wcc8Nj_foxUjQUe9H1ifslzWhb0w7aLbFvGg=="'
+)
+CLOUDFRONT_HIT = (
+    'cdn-cache-hit,cdn-pop;desc="SEA19-C1",cdn-rid;desc="rid-2",'
+    'cdn-hit-layer;desc="REC"'
+)
+FUNCTION = (
+    "app;dur=1, edge;dur=0, redirect;desc=function, match;desc=rule, geo;desc=DE, "
+    'rid;desc="rid-3"'
+)
+
+
+def test_parse():
+    assert parse('a;dur=1.5;desc="x, \\"y\\"", b ; desc = z ,c') == [
+        Metric("a", 1.5, 'x, "y"'),
+        Metric("b", None, "z"),
+        Metric("c", None, None),
+    ]
+    assert parse(CLOUDFRONT_MISS)[3] == Metric("cdn-upstream-fbl", 177.0, None)
+    # malformed parts are skipped
+    assert parse(' , ;x, ok;dur=abc, "q", last;dur=2') == [
+        Metric("ok", None, None),
+        Metric("last", 2.0, None),
+    ]
+    assert parse("") == []
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (
+            CLOUDFRONT_MISS,
+            {
+                "mode": "s3",
+                "match": None,
+                "geo": None,
+                "cache": "miss",
+                "edge_ms": None,
+                "origin_ms": 177.0,
+                "pop": "PHX50-C2",
+                "request_id": "yNPsyYn7skvTzwWkq3Wcc8Nj_foxUjQUe9H1ifslzWhb0w7aLbFvGg==",
+            },
+        ),
+        (
+            FUNCTION,
+            {
+                "mode": "function",
+                "match": "rule",
+                "geo": "DE",
+                "cache": None,
+                "edge_ms": 0.0,
+                "origin_ms": None,
+                "pop": None,
+                "request_id": "rid-3",
+            },
+        ),
+        (
+            None,
+            dict.fromkeys(
+                [
+                    "mode",
+                    "match",
+                    "geo",
+                    "cache",
+                    "edge_ms",
+                    "origin_ms",
+                    "pop",
+                    "request_id",
+                ]
+            ),
+        ),
+    ],
+)
+def test_describe(value, expected):
+    assert describe(value) == expected
+
+
+def test_aggregate():
+    records = [
+        {"server_timing": CLOUDFRONT_MISS, "latency_ms": 250},
+        {"server_timing": CLOUDFRONT_HIT, "latency_ms": 20},
+        {"server_timing": CLOUDFRONT_HIT, "latency_ms": 30},
+        {"server_timing": FUNCTION, "latency_ms": 15},
+        {"server_timing": FUNCTION},
+        {"status": 301},
+    ]
+    breakdown = {(e["mode"], e["match"]): e for e in aggregate(records)}
+    assert list(breakdown) == [("-", "-"), ("function", "rule"), ("s3", "-")]
+
+    s3 = breakdown[("s3", "-")]
+    assert s3["responses"] == 3
+    assert s3["cache_hit_ratio"] == 0.6667
+    assert s3["latency_ms"] == {"p50": 30.0, "p90": 250.0, "p99": 250.0}
+    assert s3["origin_ms"]["p50"] == 177.0
+    assert s3["edge_ms"] == {"p50": None, "p90": None, "p99": None}
+
+    function = breakdown[("function", "rule")]
+    assert function["responses"] == 2
+    assert function["cache_hit_ratio"] is None
+    assert function["latency_ms"]["p50"] == 15.0
+    assert function["edge_ms"]["p50"] == 0.0
+
+    by_cache = aggregate(records, group_by=["cache"])
+    assert [(e["cache"], e["responses"]) for e in by_cache] == [
+        ("-", 3),
+        ("hit", 2),
+        ("miss", 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    "variables,expected",
+    [
+        ({}, {("s3", "-")}),
+        (
+            {"redirect_map": {"/a": "/b"}},
+            {("function", "map"), ("function", "default")},
+        ),
+    ],
+)
+def test_breakdown_of_simulated_traffic(variables, expected):
+    instance = Instance(
+        dict({"redirect_to": "example.com", "diagnostics_headers": True}, **variables)
+    )
+    with serve_in_thread(instance) as address:
+        results = asyncio.run(
+            run(
+                f"http://{address}",
+                Workload(paths=["/a", "/c"]),
+                requests=20,
+                concurrency=2,
+                record=True,
+            )
+        )
+    breakdown = aggregate(results.records)
+    assert {(e["mode"], e["match"]) for e in breakdown} == expected
+    assert sum(e["responses"] for e in breakdown) == 20
+    for entry in breakdown:
+        assert entry["latency_ms"]["p50"] > 0
+        if entry["mode"] == "s3":
+            # the first request of each path is a miss
+            assert 0 < entry["cache_hit_ratio"] < 1
+
+
+def test_main(tmp_path, capsys):
+    records = tmp_path / "responses.jsonl"
+    records.write_text(
+        json.dumps({"server_timing": CLOUDFRONT_HIT, "latency_ms": 20})
+        + "\nnot json\n\n"
+        + json.dumps({"server_timing": FUNCTION, "latency_ms": 15})
+        + "\n"
+    )
+    assert main([str(records), "--by", "mode", "--json"]) == 0
+    breakdown = json.loads(capsys.readouterr().out)
+    assert [(e["mode"], e["responses"]) for e in breakdown] == [
+        ("function", 1),
+        ("s3", 1),
+    ]
+
+    assert main([str(records)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[:3] == ["mode", "match", "responses"]
+    assert lines[1].split()[:5] == ["function", "rule", "1", "-", "latency_ms"]
+
+    empty = tmp_path / "empty.jsonl"
+    empty.write_text("")
+    assert main([str(empty)]) == 1
@@ -0,0 +1,35 @@
+import pytest
+
+from tools.tftpl import TemplateError, render
+
+
+@pytest.mark.parametrize(
+    "template,variables,expected",
+    [
+        ("a ${x} b ${y.z}", {"x": 1, "y": {"z": True}}, "a 1 b true"),
+        ("%{ if x }yes%{ else }no%{ endif }", {"x": False}, "no"),
+        ("%{ if !x }yes%{ endif }", {"x": False}, "yes"),
+        (
+            "[%{ for k, v in m ~}\n  ${k}=${v}\n%{ endfor ~}]",
+            {"m": {"b": 2, "a": 1}},
+            "[a=1\nb=2\n]",
+        ),
+        ("x\n  %{~ for v in l }${v}%{~ endfor }\ny", {"l": ["a", "b"]}, "xab\ny"),
+    ],
+)
+def test_render(template, variables, expected):
+    assert render(template, variables) == expected
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "${missing}",
+        "${length(x)}",
+        "%{ if x }unterminated",
+        "%{ while x }%{ endwhile }",
+    ],
+)
+def test_render_errors(template):
+    with pytest.raises(TemplateError):
+        render(template, {"x": []})
@@ -0,0 +1,5 @@
+"""
+Helper tools for terraform-aws-http-redirect.
+
+Each module is runnable with ``python -m tools.<name> --help``.
+"""
@@ -0,0 +1,354 @@
+"""
+Benchmarks for the rendered CloudFront Function.
+
+Runs the function in QuickJS (see :mod:`tools.cloudfront_function`).
+Absolute numbers differ from the CloudFront runtime; use them to compare
+configurations and releases on the same machine.
+
+Scenarios:
+
+- ``rules``: per-request cost of wildcard ``redirect_rules`` matching at
+  different rule counts (10, 1k and 5k by default). Matching walks the
+  request path's segments, so the per-request cost should stay flat while
+  the one-off cost of loading the code grows with its size. The
+  ``module_limits`` column flags counts the module refuses at plan time:
+  over the 10 KB code size (about 140 of the generated rules) or 500
+  entries. The default 1k and 5k rules measure the matching cost only;
+  they cannot be deployed, and the KeyValueStore holds exact paths, not
+  wildcard rules.
+- ``events``: ops/sec and heap allocations per request over a synthetic
+  event corpus (no query string, tracking parameters, many parameters,
+  multi-value parameters, parameters that need encoding, non-GET). Save
+  the results of a release with ``--save`` and compare a later run
+  against them with ``--compare``.
+
+Usage::
+
+    python -m tools.benchmark rules
+    python -m tools.benchmark rules --counts 10 100 1000 --iterations 50000
+    python -m tools.benchmark events --save benchmark-2.0.0.json
+    python -m tools.benchmark events --compare benchmark-2.0.0.json
+"""
+
+import json
+import random
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+
+from tools.cloudfront_function import (
+    MAX_CODE_SIZE,
+    MAX_ENTRIES,
+    CloudFrontFunction,
+    render_function,
+)
+
+DEFAULT_RULE_COUNTS = (10, 1000, 5000)
+
+# Function configuration for the events scenario: the plain redirect_to
+# fallback with a couple of response headers, the most common setup.
+EVENTS_CONFIGURATION = {
+    "redirect_to": "example.com/landing",
+    "response_headers": {
+        "Strict-Transport-Security": "max-age=31536000",
+        "X-Robots-Tag": "noindex",
+    },
+}
+
+
+def make_rules(count, seed=0):
+    """
+    Generate ``count`` wildcard rules, half of them one level deeper
+    (``/section7/*`` and ``/section7/part3/*``).
+    """
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        section = i // 2
+        if i % 2:
+            source = f"/section{section}/part{rng.randrange(10)}/*"
+        else:
+            source = f"/section{section}/*"
+        rules.append({"source": source, "target": f"t{i}.example.com/moved/*"})
+    return rules
+
+
+def make_event(uri, querystring=None, method="GET", host="example.com"):
+    """Minimal CloudFront viewer-request event."""
+    return {
+        "version": "1.0",
+        "context": {"eventType": "viewer-request"},
+        "viewer": {"ip": "198.51.100.7"},
+        "request": {
+            "method": method,
+            "uri": uri,
+            "querystring": querystring or {},
+            "headers": {"host": {"value": host}},
+            "cookies": {},
+        },
+    }
+
+
+def rule_events(rules, count=200, seed=0):
+    """Request events hitting rules at various depths, plus misses."""
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        if i % 4 == 3:
+            uri = f"/unmatched/{rng.randrange(1000)}/page"
+        else:
+            prefix = rng.choice(rules)["source"].removesuffix("*")
+            uri = prefix + "/".join(f"d{rng.randrange(100)}" for _ in range(3))
+        events.append(make_event(uri))
+    return events
+
+
+def make_querystring(pairs):
+    """CloudFront ``querystring`` object from ``(key, value)`` pairs."""
+    querystring = {}
+    for key, value in pairs:
+        if key not in querystring:
+            querystring[key] = {"value": value}
+        else:
+            param = querystring[key]
+            param.setdefault("multiValue", [{"value": param["value"]}])
+            param["multiValue"].append({"value": value})
+    return querystring
+
+
+def make_corpus(size=50, seed=0):
+    """
+    Synthetic viewer-request events, grouped by query string shape.
+
+    Query string keys and values are passed to the function as the viewer
+    sent them: percent-encoded, except in the ``needs-encoding`` group
+    (raw non-ASCII, stray ``%`` and characters browsers leave unencoded).
+
+    :param size: Events per group.
+    :return: Dictionary group name -> list of events.
+    """
+    rng = random.Random(seed)
+
+    def uri():
+        depth = rng.randrange(1, 5)
+        return "/" + "/".join(f"p{rng.randrange(1000)}" for _ in range(depth))
+
+    corpus = {
+        "no-query": [],
+        "tracking": [],
+        "many-params": [],
+        "multi-value": [],
+        "needs-encoding": [],
+        "non-get": [],
+    }
+    for _ in range(size):
+        corpus["no-query"].append(make_event(uri()))
+        corpus["tracking"].append(
+            make_event(
+                uri(),
+                make_querystring(
+                    [
+                        ("utm_source", "newsletter"),
+                        ("utm_medium", "email"),
+                        ("utm_campaign", f"spring%20sale%20{rng.randrange(100)}"),
+                        ("gclid", f"{rng.getrandbits(64):x}"),
+                    ]
+                ),
+            )
+        )
+        corpus["many-params"].append(
+            make_event(
+                uri(),
+                make_querystring(
+                    [(f"k{i}", f"v{rng.randrange(10**6)}") for i in range(50)]
+                ),
+            )
+        )
+        corpus["multi-value"].append(
+            make_event(
+                uri(),
+                make_querystring(
+                    [(f"tag{i % 5}", f"t{rng.randrange(100)}") for i in range(25)]
+                ),
+            )
+        )
+        corpus["needs-encoding"].append(
+            make_event(
+                uri(),
+                make_querystring(
+                    [
+                        ("q", f"caf\u00e9-{rng.randrange(100)}"),
+                        ("discount", "100%"),
+                        ("filter", "size|color"),
+                        ("ids[]", str(rng.randrange(100))),
+                    ]
+                ),
+            )
+        )
+        corpus["non-get"].append(
+            make_event(
+                uri(),
+                make_querystring([("id", str(rng.randrange(10**6)))]),
+                method=rng.choice(["POST", "PUT", "DELETE"]),
+            )
+        )
+    return corpus
+
+
+def bench_events(code, corpus, iterations=20000):
+    """
+    Measure throughput and heap allocations per request for each corpus group.
+
+    Allocations are what a call leaves on the heap while its response is
+    kept (see :meth:`~tools.cloudfront_function.CloudFrontFunction.allocations`).
+
+    :param code: Rendered function code (synchronous handler).
+    :param corpus: Output of :func:`make_corpus`.
+    :return: List of result dictionaries.
+    """
+    results = []
+    for group, events in corpus.items():
+        function = CloudFrontFunction(code)
+        function.load_events(events)
+        function.time_handler(iterations // 10)  # warm up
+        elapsed_ms = function.time_handler(iterations)
+        allocations = function.allocations(len(events))
+        results.append(
+            {
+                "events": group,
+                "ops_per_sec": round(iterations * 1000.0 / max(elapsed_ms, 1)),
+                "alloc_bytes": round(allocations["bytes"]),
+                "alloc_objects": round(allocations["objects"], 1),
+            }
+        )
+    return results
+
+
+def compare(results, baseline):
+    """
+    Add the relative change against ``baseline`` results to each row.
+
+    :param results: Output of :func:`bench_events`.
+    :param baseline: Earlier results, as saved with ``--save``.
+    """
+    previous = {row["events"]: row for row in baseline}
+    for row in results:
+        before = previous.get(row["events"])
+        for column in ("ops_per_sec", "alloc_bytes"):
+            change = None
+            if before and before.get(column):
+                change = f"{(row[column] - before[column]) / before[column]:+.1%}"
+            row[f"{column}_change"] = change
+    return results
+
+
+def module_limits(code, entries):
+    """
+    Module preconditions (``cloudfront-function.tf``) ``code`` breaks.
+
+    :param entries: Number of compiled redirect entries.
+    :return: ``"ok"`` or the exceeded limits, e.g. ``"code size, entries"``.
+    """
+    exceeded = []
+    if len(code.encode("utf-8")) > MAX_CODE_SIZE:
+        exceeded.append("code size")
+    if entries > MAX_ENTRIES:
+        exceeded.append("entries")
+    return ", ".join(exceeded) or "ok"
+
+
+def bench_rules(counts=DEFAULT_RULE_COUNTS, iterations=20000, loads=20):
+    """
+    Measure load and per-request cost for each rule count.
+
+    :return: List of result dictionaries; ``module_limits`` is not ``"ok"``
+        for counts the module cannot deploy (see :func:`module_limits`).
+    """
+    results = []
+    for count in counts:
+        rules = make_rules(count)
+        code = render_function(redirect_to="example.com", redirect_rules=rules)
+
+        # Loading the code: the rule table literal is evaluated on load.
+        # Context creation is measured separately and subtracted.
+        start = perf_counter()
+        for _ in range(loads):
+            CloudFrontFunction("")
+        baseline = perf_counter() - start
+        start = perf_counter()
+        for _ in range(loads):
+            function = CloudFrontFunction(code)
+        load_us = (perf_counter() - start - baseline) / loads * 1e6
+
+        function.load_events(rule_events(rules))
+        function.time_handler(iterations // 10)  # warm up
+        elapsed_ms = function.time_handler(iterations)
+        request_us = elapsed_ms * 1000.0 / iterations
+        results.append(
+            {
+                "rules": count,
+                "code_bytes": len(code.encode("utf-8")),
+                "module_limits": module_limits(code, count),
+                "load_us": round(load_us, 1),
+                "request_us": round(request_us, 3),
+                "requests_per_sec": round(1e6 / request_us) if request_us else None,
+            }
+        )
+    return results
+
+
+def print_table(results):
+    columns = list(results[0])
+    widths = [max(len(col), *(len(str(r[col])) for r in results)) for col in columns]
+    print("  ".join(col.rjust(w) for col, w in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[col]).rjust(w) for col, w in zip(columns, widths)))
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.benchmark",
+        description="Benchmark the rendered CloudFront Function.",
+    )
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    rules = subparsers.add_parser("rules", help="redirect_rules matching cost")
+    rules.add_argument(
+        "--counts", type=int, nargs="+", default=list(DEFAULT_RULE_COUNTS)
+    )
+    rules.add_argument("--iterations", type=int, default=20000)
+    rules.add_argument("--json", action="store_true", help="Print JSON results")
+
+    events = subparsers.add_parser("events", help="throughput over an event corpus")
+    events.add_argument("--iterations", type=int, default=20000)
+    events.add_argument("--corpus-size", type=int, default=50, help="events per group")
+    events.add_argument("--save", metavar="PATH", help="Write the results as JSON")
+    events.add_argument(
+        "--compare", metavar="PATH", help="Compare with results saved earlier"
+    )
+    events.add_argument("--json", action="store_true", help="Print JSON results")
+
+    args = parser.parse_args(argv)
+    if args.scenario == "rules":
+        results = bench_rules(counts=args.counts, iterations=args.iterations)
+    else:
+        results = bench_events(
+            render_function(**EVENTS_CONFIGURATION),
+            make_corpus(size=args.corpus_size),
+            iterations=args.iterations,
+        )
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as fp:
+                json.dump(results, fp, indent=2)
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as fp:
+                results = compare(results, json.load(fp))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""
+Render and run the module's CloudFront Function locally.
+
+:func:`template_variables` mirrors the ``templatefile()`` arguments built in
+``locals.tf``, so the rendered code matches what Terraform deploys.
+:class:`CloudFrontFunction` evaluates that code in QuickJS, an embedded
+JavaScript engine, which is close enough to the ``cloudfront-js-2.0``
+runtime to check behavior and compare relative costs.
+"""
+
+import json
+import re
+from os import path as osp
+from time import perf_counter_ns
+
+import quickjs
+
+from tools.tftpl import render
+
+MODULE_DIR = osp.dirname(osp.dirname(osp.abspath(__file__)))
+TEMPLATE_PATH = osp.join(MODULE_DIR, "templates", "redirect-all-methods.js.tftpl")
+COUNTRY_CONTINENTS_PATH = osp.join(MODULE_DIR, "templates", "country-continents.json")
+
+# CloudFront Functions limits the module checks at plan time, same as
+# local.cloudfront_function_max_code_size and _max_entries in locals.tf
+MAX_CODE_SIZE = 10240
+MAX_ENTRIES = 500
+
+# Same pattern as local.redirect_parts in locals.tf
+REDIRECT_TO_PATTERN = re.compile(
+    r"^(?P<hostname>[^/?]+)(?P<path>/[^?]*)?(?P<query>\?.*)?$"
+)
+
+_IMPORT = re.compile(r'^import cf from "cloudfront";$', re.M)
+
+
+def jsonencode(value):
+    """Encode ``value`` the way Terraform's ``jsonencode()`` does."""
+    encoded = json.dumps(value, separators=(",", ":"), sort_keys=True)
+    return (
+        encoded.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+    )
+
+
+def canonical_target(target, base=False):
+    """
+    Canonicalize a configured target like ``locals.tf`` does: runs of ``/``
+    are collapsed.
+
+    :param target: ``host/path`` or ``/path``.
+    :param base: The request path is appended to the target
+        (``redirect_to``, ``host_redirects``), so trailing slashes are
+        dropped as well.
+    """
+    target = re.sub(r"/{2,}", "/", target)
+    return target.rstrip("/") if base else target
+
+
+def compile_redirect_rules(redirect_rules):
+    """
+    Compile ``redirect_rules`` into the prefix table, like
+    ``local.redirect_rules_table``.
+
+    :param redirect_rules: List of ``{"source": ..., "target": ...}``.
+    :return: Dictionary source prefix -> target; the first rule per
+        source wins.
+    """
+    table = {}
+    for rule in redirect_rules:
+        table.setdefault(
+            rule["source"].removesuffix("*"), canonical_target(rule["target"])
+        )
+    return table
+
+
+def compile_geo_redirects(geo_redirects):
+    """
+    Compile ``geo_redirects`` like ``local.geo_hosts`` and
+    ``local.geo_countries``.
+
+    :param geo_redirects: Dictionary with optional ``countries`` and
+        ``continents`` maps of code -> hostname.
+    :return: ``(hosts, countries)``: the distinct hosts (country entries,
+        then continent entries, in key order) and country code -> index in
+        ``hosts``; a country entry takes precedence over its continent's.
+    """
+    countries = (geo_redirects or {}).get("countries") or {}
+    continents = (geo_redirects or {}).get("continents") or {}
+    hosts = []
+    for entries in (countries, continents):
+        for code in sorted(entries):
+            if entries[code] not in hosts:
+                hosts.append(entries[code])
+    with open(COUNTRY_CONTINENTS_PATH, encoding="utf-8") as fp:
+        country_continents = json.load(fp)
+    table = {
+        country: hosts.index(continents[continent])
+        for country, continent in country_continents.items()
+        if continent in continents
+    }
+    table.update(
+        (country, hosts.index(hostname)) for country, hostname in countries.items()
+    )
+    return hosts, table
+
+
+def compile_weighted_targets(weighted_targets):
+    """
+    Compile ``weighted_targets`` like ``local.weighted_hosts`` and
+    ``local.weighted_bounds``.
+
+    :param weighted_targets: List of ``{"host": ..., "weight": ...}``.
+    :return: ``(hosts, bounds)``: the hosts and the running total of their
+        weights.
+    """
+    hosts, bounds, total = [], [], 0
+    for target in weighted_targets or []:
+        total += int(target["weight"])
+        hosts.append(target["host"])
+        bounds.append(total)
+    return hosts, bounds
+
+
+def fnv1a(key):
+    """32-bit FNV-1a hash of ``key`` by UTF-16 code unit, like ``charCodeAt()``."""
+    data = key.encode("utf-16-le")
+    value = 0x811C9DC5
+    for index in range(0, len(data), 2):
+        unit = int.from_bytes(data[index : index + 2], "little")
+        value = ((value ^ unit) * 16777619) & 0xFFFFFFFF
+    return value
+
+
+def weighted_target(weighted_targets, key):
+    """
+    Host of ``weighted_targets`` the function picks for a viewer.
+
+    :param key: Value of the ``weighted_target_cookie`` cookie or, without
+        one, the viewer's IP address.
+    """
+    hosts, bounds = compile_weighted_targets(weighted_targets)
+    bucket = fnv1a(key) % bounds[-1]
+    return next(host for host, bound in zip(hosts, bounds) if bucket < bound)
+
+
+def canonicalization_options(target_canonicalization):
+    """
+    ``target_canonicalization`` with the defaults of its optional attributes,
+    as Terraform sees it.
+    """
+    options = {
+        "trailing_slash": "keep",
+        "collapse_slashes": False,
+        "lowercase": False,
+        "index_files": [],
+    }
+    options.update(target_canonicalization or {})
+    return options
+
+
+def canonical_path(path, target_canonicalization):
+    """
+    Rewrite a target path like ``canonicalLocation()`` in the function code.
+
+    :param path: Path of the redirect target, starting with ``/``, without
+        the query string.
+    :param target_canonicalization: The module input, see
+        :func:`canonicalization_options`.
+    """
+    options = canonicalization_options(target_canonicalization)
+    if options["collapse_slashes"]:
+        path = re.sub(r"/{2,}", "/", path)
+    if options["lowercase"]:
+        path = path.lower()
+    head, _, last = path.rpartition("/")
+    if last in options["index_files"]:
+        path = head + "/"
+    if options["trailing_slash"] == "add":
+        if not path.endswith("/") and "." not in path.rpartition("/")[2]:
+            path += "/"
+    elif options["trailing_slash"] == "remove":
+        path = path.rstrip("/") or "/"
+    return path
+
+
+def canonical_location(location, target_canonicalization):
+    """Apply :func:`canonical_path` to the path of an absolute ``https://`` URL."""
+    end = location.find("?")
+    if end < 0:
+        end = len(location)
+    start = location.find("/", len("https://"))
+    if start < 0 or start > end:
+        return location
+    return (
+        location[:start]
+        + canonical_path(location[start:end], target_canonicalization)
+        + location[end:]
+    )
+
+
+def template_variables(
+    redirect_to,
+    permanent_redirect=True,
+    response_headers=None,
+    redirect_map=None,
+    redirect_rules=None,
+    create_key_value_store=False,
+    permanent_redirect_ttl=86400,
+    permanent_redirect_cache_control=None,
+    temporary_redirect_ttl=86400,
+    temporary_redirect_cache_control="no-cache",
+    host_redirects=None,
+    geo_redirects=None,
+    weighted_targets=None,
+    weighted_target_cookie=None,
+    target_canonicalization=None,
+    diagnostics_headers=False,
+    zone_name="example.com",
+):
+    """
+    Build the template variables ``locals.tf`` passes to ``templatefile()``.
+
+    Arguments have the same names, meaning and defaults as the module inputs;
+    ``zone_name`` is the name of the hosted zone the module looks up from
+    ``zone_id``.
+    """
+    parts = REDIRECT_TO_PATTERN.match(redirect_to)
+    if not parts:
+        raise ValueError(f"Invalid redirect_to: {redirect_to!r}")
+    if permanent_redirect:
+        ttl, cache_control = permanent_redirect_ttl, permanent_redirect_cache_control
+    else:
+        ttl, cache_control = temporary_redirect_ttl, temporary_redirect_cache_control
+    if not cache_control:
+        cache_control = f"max-age={ttl}" if ttl > 0 else "no-store"
+    rules_table = compile_redirect_rules(redirect_rules or [])
+    geo_hosts, geo_countries = compile_geo_redirects(geo_redirects)
+    weighted_hosts, weighted_bounds = compile_weighted_targets(weighted_targets)
+    canonicalization = canonicalization_options(target_canonicalization)
+    host_targets = {
+        f"{record}.{zone_name}".lstrip("."): canonical_target(target, base=True)
+        for record, target in (host_redirects or {}).items()
+    }
+    redirect_map = {
+        source: canonical_target(target)
+        for source, target in (redirect_map or {}).items()
+    }
+    return {
+        "redirect_hostname": parts.group("hostname"),
+        "redirect_path": canonical_target(parts.group("path") or "", base=True),
+        "get_head_status_code": 301 if permanent_redirect else 302,
+        "get_head_status_description": (
+            "Moved Permanently" if permanent_redirect else "Found"
+        ),
+        "other_status_code": 308 if permanent_redirect else 307,
+        "other_status_description": (
+            "Permanent Redirect" if permanent_redirect else "Temporary Redirect"
+        ),
+        "has_redirect_map": bool(redirect_map),
+        "redirect_map": jsonencode(redirect_map),
+        "has_redirect_rules": bool(rules_table),
+        "redirect_rules": jsonencode(rules_table),
+        "has_host_redirects": bool(host_targets),
+        "host_redirects": jsonencode(host_targets),
+        "has_geo_redirects": bool(geo_countries),
+        "geo_hosts": jsonencode(geo_hosts),
+        "geo_countries": jsonencode(geo_countries),
+        "has_weighted_targets": bool(weighted_hosts),
+        "weighted_hosts": jsonencode(weighted_hosts),
+        "weighted_bounds": jsonencode(weighted_bounds),
+        "weighted_target_cookie": jsonencode(weighted_target_cookie),
+        "per_viewer_host": bool(geo_countries or weighted_hosts),
+        "canonicalize": (
+            canonicalization["trailing_slash"] != "keep"
+            or canonicalization["collapse_slashes"]
+            or canonicalization["lowercase"]
+            or bool(canonicalization["index_files"])
+        ),
+        "add_trailing_slash": canonicalization["trailing_slash"] == "add",
+        "remove_trailing_slash": canonicalization["trailing_slash"] == "remove",
+        "collapse_slashes": canonicalization["collapse_slashes"],
+        "lowercase_path": canonicalization["lowercase"],
+        "has_index_files": bool(canonicalization["index_files"]),
+        "index_files": jsonencode(canonicalization["index_files"]),
+        "use_key_value_store": create_key_value_store,
+        "cache_control": jsonencode(cache_control),
+        "response_headers": {
+            name.lower(): jsonencode(value)
+            for name, value in (response_headers or {}).items()
+        },
+        "diagnostics": diagnostics_headers,
+    }
+
+
+def render_function(**kwargs):
+    """Render the function code; keyword arguments as :func:`template_variables`."""
+    with open(TEMPLATE_PATH, encoding="utf-8") as fp:
+        return render(fp.read(), template_variables(**kwargs))
+
+
+class CloudFrontFunction:
+    """
+    Rendered CloudFront Function loaded into a QuickJS context.
+
+    :param code: Function source, e.g. from :func:`render_function`.
+    :param key_value_store: Dictionary standing in for the associated
+        KeyValueStore; used when the code imports the ``cloudfront`` module.
+    """
+
+    def __init__(self, code, key_value_store=None):
+        self.code = code
+        self.context = quickjs.Context()
+        # ES module imports are not available in script mode; provide the
+        # cloudfront module as a global with the same kvs().get() contract.
+        self.context.eval(
+            "var __kvs = %s;"
+            "var cf = {kvs: function () { return {get: function (key) {"
+            "  return Object.prototype.hasOwnProperty.call(__kvs, key)"
+            "    ? Promise.resolve(__kvs[key])"
+            "    : Promise.reject(new Error('Key not found: ' + key));"
+            "}}; }};" % json.dumps(key_value_store or {})
+        )
+        self.context.eval(_IMPORT.sub("", code))
+
+    def invoke(self, event):
+        """
+        Run ``handler(event)`` and return the result as a dictionary.
+
+        Async handlers (KeyValueStore mode) are awaited.
+        """
+        self.context.eval(
+            "var __result = undefined, __error = undefined;"
+            "Promise.resolve(handler(%s)).then("
+            "  function (r) { __result = JSON.stringify(r); },"
+            "  function (e) { __error = String(e); });" % json.dumps(event)
+        )
+        while self.context.execute_pending_job():
+            pass
+        error = self.context.eval("__error")
+        if error is not None:
+            raise RuntimeError(error)
+        return json.loads(self.context.eval("__result"))
+
+    def load_events(self, events):
+        """Store ``events`` in the context as the global ``__events`` array."""
+        self.context.eval("var __events = %s;" % json.dumps(events))
+
+    def time_handler(self, iterations):
+        """
+        Call ``handler()`` ``iterations`` times over ``__events`` in JS.
+
+        Synchronous handlers only. Timing inside the engine keeps Python
+        call overhead out of the measurement.
+
+        :return: Total elapsed milliseconds.
+        """
+        return self.context.eval(
+            "(function () {"
+            "  var n = __events.length, start = Date.now();"
+            "  for (var i = 0; i < %d; i++) { handler(__events[i %% n]); }"
+            "  return Date.now() - start;"
+            "})()" % iterations
+        )
+
+    def time_invocations(self, index, iterations):
+        """
+        Time ``iterations`` calls of ``handler(__events[index])`` one by one.
+
+        Each call is timed from Python, so the durations include the cost of
+        crossing into the engine; it is measured with a no-op function and
+        subtracted. Synchronous handlers only.
+
+        :return: List of per-call durations in microseconds.
+        """
+        self.context.eval(
+            "var __invoke = function (i) { handler(__events[i]); };"
+            "var __noop = function (i) { __events[i]; };"
+        )
+        invoke, noop = self.context.get("__invoke"), self.context.get("__noop")
+        overhead = []
+        for _ in range(min(iterations, 1000)):
+            start = perf_counter_ns()
+            noop(index)
+            overhead.append(perf_counter_ns() - start)
+        overhead = sorted(overhead)[len(overhead) // 2]
+        durations = []
+        for _ in range(iterations):
+            start = perf_counter_ns()
+            invoke(index)
+            durations.append(max(perf_counter_ns() - start - overhead, 0) / 1000.0)
+        return durations
+
+    def allocations(self, iterations=100):
+        """
+        Heap retained per ``handler()`` call while its results are kept.
+
+        QuickJS frees garbage as soon as the last reference goes away, so
+        only what a call returns (and caches) shows up; temporaries freed
+        before it returns do not. Synchronous handlers only.
+
+        :param iterations: Calls over ``__events``, each result kept alive.
+        :return: Dictionary with ``bytes`` and ``objects`` per call.
+        """
+        self.context.gc()
+        before = self.context.memory()
+        self.context.eval(
+            "var __kept = [];"
+            "for (var i = 0; i < %d; i++) {"
+            "  __kept.push(handler(__events[i %% __events.length]));"
+            "}" % iterations
+        )
+        after = self.context.memory()
+        self.context.eval("__kept = undefined;")
+        return {
+            name: (after[counter] - before[counter]) / iterations
+            for name, counter in (
+                ("bytes", "memory_used_size"),
+                ("objects", "obj_count"),
+            )
+        }
@@ -0,0 +1,538 @@
+"""
+Local stand-in for a deployed module instance.
+
+Answers HTTP requests the way the module's CloudFront distribution does,
+configured from the module's input variables (e.g. a ``.tfvars`` file):
+
+- CloudFront: ``redirect-to-https`` for plain HTTP (``allow-all`` with
+  ``single_hop_http_redirect``), the allowed methods, the response headers
+  policy (security headers, ``Cache-Control`` unless the function set
+  one, and ``Server-Timing`` on S3 redirects with
+  ``diagnostics_headers``), and the edge cache of S3 redirects (cache policy TTL and query
+  string cache key), reported in ``x-cache``
+- S3 mode: the website routing rule of ``s3.tf`` (``HostName``, ``https``,
+  ``HttpRedirectCode`` from ``permanent_redirect`` and
+  ``ReplaceKeyPrefixWith`` from the ``redirect_to`` path)
+- function mode: the module's rendered CloudFront Function, run in QuickJS
+  (see :mod:`tools.cloudfront_function`). With ``geo_redirects``, the
+  function sees the viewer's ``CloudFront-Viewer-Country`` request header,
+  or :data:`VIEWER_COUNTRY` without one, as if CloudFront had located the
+  viewer. The viewer's IP address (``weighted_targets``) is the first
+  ``X-Forwarded-For`` address, or :data:`VIEWER_IP`
+
+The mode follows the variables as in ``locals.tf``
+(``use_cloudfront_function``); a request can pick one with an
+``X-Redirect-Mode: s3`` or ``X-Redirect-Mode: function`` header. The server
+speaks plain HTTP; the scheme the viewer used is taken from
+``X-Forwarded-Proto`` (default ``https``).
+
+Usage::
+
+    python -m tools.edge_simulator --var-file redirect.tfvars --zone-name example.com
+    python -m tools.load_benchmark run http://127.0.0.1:8080 --redirect-to example.com
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from http import HTTPStatus
+
+from tools.benchmark import make_querystring
+from tools.cloudfront_function import (
+    REDIRECT_TO_PATTERN,
+    CloudFrontFunction,
+    canonical_target,
+    canonicalization_options,
+    compile_geo_redirects,
+    render_function,
+)
+from tools.load_benchmark import read_body, read_head
+
+LOG = logging.getLogger(__name__)
+
+# Module input defaults (variables.tf) the simulator uses.
+DEFAULTS = {
+    "redirect_hostnames": ["", "www"],
+    "host_redirects": {},
+    "geo_redirects": {},
+    "weighted_targets": [],
+    "weighted_target_cookie": None,
+    "target_canonicalization": {},
+    "allow_non_get_methods": False,
+    "permanent_redirect": True,
+    "permanent_redirect_ttl": 86400,
+    "permanent_redirect_cache_control": None,
+    "temporary_redirect_ttl": 86400,
+    "temporary_redirect_cache_control": "no-cache",
+    "response_headers": {},
+    "redirect_map": {},
+    "redirect_rules": [],
+    "create_key_value_store": False,
+    "single_hop_http_redirect": False,
+    "edge_only": False,
+    "cache_key_query_string_behavior": "all",
+    "diagnostics_headers": False,
+}
+
+# Response headers policy of modules/redirect-policies (override = true).
+SECURITY_HEADERS = {
+    "strict-transport-security": "max-age=31536000; includeSubDomains; preload",
+    "x-content-type-options": "nosniff",
+    "x-frame-options": "DENY",
+    "referrer-policy": "strict-origin-when-cross-origin",
+    "x-xss-protection": "1; mode=block",
+}
+
+# cdn-pop of simulated Server-Timing headers
+EDGE_LOCATION = "SIM50-C1"
+
+# CloudFront-Viewer-Country of viewers that do not send one
+VIEWER_COUNTRY = "US"
+VIEWER_COUNTRY_HEADER = "cloudfront-viewer-country"
+
+# Viewer IP address of requests without X-Forwarded-For
+VIEWER_IP = "127.0.0.1"
+
+MODE_HEADER = "x-redirect-mode"
+MODES = ("s3", "function")
+
+_TFVARS_TOKEN = re.compile(
+    r'\s+|#[^\n]*|//[^\n]*|(?P<string>"(?:[^"\\]|\\.)*")'
+    r"|(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+    r"|(?P<ident>[A-Za-z_][A-Za-z0-9_-]*)|(?P<punct>[\[\]{}=:,])"
+)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+
+def _tfvars_tokens(text):
+    position = 0
+    while position < len(text):
+        match = _TFVARS_TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Unexpected {text[position:position + 20]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        if kind:
+            yield kind, match.group(kind)
+
+
+def _tfvars_string(token):
+    body = token[1:-1]
+    if "${" in body.replace("$${", "") or "%{" in body.replace("%%{", ""):
+        raise ValueError(f"Template expressions are not supported: {token}")
+    body = re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(0)), body)
+    return body.replace("$${", "${").replace("%%{", "%{")
+
+
+def _tfvars_value(tokens, token):
+    kind, text = token
+    if kind == "string":
+        return _tfvars_string(text)
+    if kind == "number":
+        return float(text) if re.search(r"[.eE]", text) else int(text)
+    if kind == "ident" and text in ("true", "false", "null"):
+        return {"true": True, "false": False, "null": None}[text]
+    if text == "[":
+        items = []
+        for token in tokens:
+            if token[1] == "]":
+                return items
+            if token[1] != ",":
+                items.append(_tfvars_value(tokens, token))
+    if text == "{":
+        items = {}
+        for token in tokens:
+            if token[1] == "}":
+                return items
+            if token[1] == ",":
+                continue
+            key = _tfvars_string(token[1]) if token[0] == "string" else token[1]
+            if next(tokens)[1] not in ("=", ":"):
+                raise ValueError(f"Expected '=' after {key!r}")
+            items[key] = _tfvars_value(tokens, next(tokens))
+    raise ValueError(f"Unexpected {text!r}")
+
+
+def parse_tfvars(text):
+    """
+    Parse a ``.tfvars`` file of literal values.
+
+    Strings, numbers, booleans, ``null``, lists and maps/objects are
+    supported; expressions and string templates are not.
+
+    :return: Dictionary variable name -> value.
+    """
+    tokens = _tfvars_tokens(text)
+    variables = {}
+    for kind, name in tokens:
+        if kind != "ident" or next(tokens, (None, None))[1] != "=":
+            raise ValueError(f"Expected 'name = value', got {name!r}")
+        variables[name] = _tfvars_value(tokens, next(tokens))
+    return variables
+
+
+def request_id():
+    """Random request ID in the format of CloudFront's ``x-amz-cf-id``."""
+    return base64.urlsafe_b64encode(os.urandom(42)).decode()
+
+
+class Instance:
+    """
+    One simulated module instance.
+
+    :param variables: Module input variables; missing ones take the
+        module defaults (:data:`DEFAULTS`). ``redirect_to`` is required.
+    :param zone_name: Name of the hosted zone. Requests for hosts that are
+        not aliases of the instance get a 403, like from CloudFront. With
+        ``None``, every host is served.
+    :param key_value_store: Dictionary standing in for the KeyValueStore
+        (``create_key_value_store``).
+    :param mode: ``"s3"`` or ``"function"`` to override the mode the
+        variables select.
+    """
+
+    def __init__(self, variables, zone_name=None, key_value_store=None, mode=None):
+        self.variables = dict(DEFAULTS, **variables)
+        self.zone_name = zone_name
+        self.key_value_store = key_value_store if key_value_store is not None else {}
+        parts = REDIRECT_TO_PATTERN.match(self.variables["redirect_to"])
+        if not parts:
+            raise ValueError(f"Invalid redirect_to: {self.variables['redirect_to']!r}")
+        self.redirect_hostname = parts.group("hostname")
+        self.redirect_path = canonical_target(parts.group("path") or "", base=True)
+        _, self.geo_countries = compile_geo_redirects(self.variables["geo_redirects"])
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode or ("function" if self.use_cloudfront_function else "s3")
+        self.cache = {}
+        self._function = None
+
+        v = self.variables
+        self.ttl = (
+            v["permanent_redirect_ttl"]
+            if v["permanent_redirect"]
+            else v["temporary_redirect_ttl"]
+        )
+        cache_control = (
+            v["permanent_redirect_cache_control"]
+            if v["permanent_redirect"]
+            else v["temporary_redirect_cache_control"]
+        )
+        self.cache_control = cache_control or (
+            f"max-age={self.ttl}" if self.ttl > 0 else "no-store"
+        )
+
+    @property
+    def use_cloudfront_function(self):
+        """Whether the module deploys the function, as in ``locals.tf``."""
+        v = self.variables
+        return bool(
+            v["edge_only"]
+            or v["allow_non_get_methods"]
+            or v["response_headers"]
+            or v["redirect_map"]
+            or v["redirect_rules"]
+            or v["create_key_value_store"]
+            or v["host_redirects"]
+            or self.geo_countries
+            or v["weighted_targets"]
+            or canonicalization_options(v["target_canonicalization"])
+            != canonicalization_options(None)
+            or v["cache_key_query_string_behavior"] == "function"
+        )
+
+    @property
+    def hostnames(self):
+        """Aliases of the instance; ``None`` when every host is served."""
+        if self.zone_name is None:
+            return None
+        records = self.variables["redirect_hostnames"] + list(
+            self.variables["host_redirects"]
+        )
+        return {f"{record}.{self.zone_name}".lstrip(".") for record in records}
+
+    @property
+    def function(self):
+        # Rendered on first use, in the thread that serves requests.
+        if self._function is None:
+            v = self.variables
+            code = render_function(
+                redirect_to=v["redirect_to"],
+                permanent_redirect=v["permanent_redirect"],
+                response_headers=v["response_headers"],
+                redirect_map=v["redirect_map"],
+                redirect_rules=v["redirect_rules"],
+                create_key_value_store=v["create_key_value_store"],
+                permanent_redirect_ttl=v["permanent_redirect_ttl"],
+                permanent_redirect_cache_control=v["permanent_redirect_cache_control"],
+                temporary_redirect_ttl=v["temporary_redirect_ttl"],
+                temporary_redirect_cache_control=v["temporary_redirect_cache_control"],
+                host_redirects=v["host_redirects"],
+                geo_redirects=v["geo_redirects"],
+                weighted_targets=v["weighted_targets"],
+                weighted_target_cookie=v["weighted_target_cookie"],
+                target_canonicalization=v["target_canonicalization"],
+                diagnostics_headers=v["diagnostics_headers"],
+                zone_name=self.zone_name or "example.com",
+            )
+            self._function = CloudFrontFunction(code, self.key_value_store)
+        return self._function
+
+    def handle(self, method, host, target, scheme="https", headers=None):
+        """
+        Answer one viewer request.
+
+        :param target: Request path with the query string, as sent.
+        :param headers: Request headers, names in lower case.
+        :return: ``(status, headers)``; header names in lower case.
+        """
+        headers = headers or {}
+        path, _, query = target.partition("?")
+        hostnames = self.hostnames
+        if hostnames is not None and host.lower() not in hostnames:
+            return 403, {"x-cache": "Error from cloudfront"}
+        if scheme == "http" and not self.variables["single_hop_http_redirect"]:
+            return 301, {
+                "location": f"https://{host}{target}",
+                "x-cache": "Redirect from cloudfront",
+            }
+        allowed = ("GET", "HEAD")
+        if self.variables["allow_non_get_methods"]:
+            allowed += ("OPTIONS", "PUT", "POST", "PATCH", "DELETE")
+        if method not in allowed:
+            return 403, {"x-cache": "Error from cloudfront"}
+
+        mode = headers.get(MODE_HEADER, self.mode)
+        if mode == "function":
+            status, response = self._function_response(
+                method, host, path, query, headers
+            )
+            response["x-cache"] = "FunctionGeneratedResponse from cloudfront"
+        elif self.variables["edge_only"]:
+            return 502, {"x-cache": "Error from cloudfront"}
+        else:
+            status, response = self._cached_s3_response(method, host, path, query)
+            if self.variables["diagnostics_headers"]:
+                response["server-timing"] = self._server_timing(response)
+        response.update(SECURITY_HEADERS)
+        response.setdefault("cache-control", self.cache_control)
+        return status, response
+
+    @staticmethod
+    def _server_timing(response):
+        """CloudFront's Server-Timing (response headers policy) of an S3 redirect."""
+        if response["x-cache"].startswith("Hit"):
+            metrics = ["cdn-cache-hit"]
+            layer = 'cdn-hit-layer;desc="EDGE"'
+        else:
+            metrics = [
+                'cdn-upstream-layer;desc="EDGE"',
+                "cdn-upstream-dns;dur=0",
+                "cdn-upstream-connect;dur=0",
+                "cdn-upstream-fbl;dur=0",
+                "cdn-cache-miss",
+            ]
+            layer = None
+        metrics += [f'cdn-pop;desc="{EDGE_LOCATION}"', f'cdn-rid;desc="{request_id()}"']
+        if layer:
+            metrics.append(layer)
+        return ",".join(metrics)
+
+    def _function_response(self, method, host, path, query, headers):
+        pairs = [p.partition("=")[::2] for p in query.split("&") if p]
+        # CloudFront adds the header only when the cache policy has it
+        # (local.cache_key_headers), replacing any the viewer sent.
+        headers = dict(headers)
+        country = headers.pop(VIEWER_COUNTRY_HEADER, VIEWER_COUNTRY)
+        if self.geo_countries:
+            headers[VIEWER_COUNTRY_HEADER] = country
+        forwarded_for = headers.get("x-forwarded-for", "").split(",")[0].strip()
+        # Viewer-request events carry cookies parsed, not as a header.
+        cookies = {}
+        for cookie in headers.pop("cookie", "").split(";"):
+            name, separator, value = cookie.strip().partition("=")
+            if separator:
+                cookies.setdefault(name, {"value": value})
+        event = {
+            "version": "1.0",
+            "context": {"eventType": "viewer-request", "requestId": request_id()},
+            "viewer": {"ip": forwarded_for or VIEWER_IP},
+            "request": {
+                "method": method,
+                "uri": path or "/",
+                "querystring": make_querystring(pairs),
+                "headers": dict(
+                    {name: {"value": value} for name, value in headers.items()},
+                    host={"value": host},
+                ),
+                "cookies": cookies,
+            },
+        }
+        result = self.function.invoke(event)
+        response = {
+            name: header["value"] for name, header in result.get("headers", {}).items()
+        }
+        return result["statusCode"], response
+
+    def _cache_key(self, host, path, query):
+        # The cache policy keys on every query string parameter
+        params = [p for p in query.split("&") if p]
+        return host.lower(), path, "&".join(sorted(params))
+
+    def _cached_s3_response(self, method, host, path, query):
+        key = self._cache_key(host, path, query)
+        now = time.monotonic()
+        cached = self.cache.get(key)
+        if cached and cached[2] > now:
+            status, response, _ = cached
+            return status, dict(response, **{"x-cache": "Hit from cloudfront"})
+        status, response = self.s3_response(method, path, query)
+        # S3 website redirects carry no Cache-Control, so the cache
+        # policy's default TTL applies.
+        if self.ttl > 0:
+            self.cache[key] = (status, response, now + self.ttl)
+        return status, dict(response, **{"x-cache": "Miss from cloudfront"})
+
+    def s3_response(self, method, path, query):
+        """Response of the S3 website endpoint with the ``s3.tf`` routing rule."""
+        if method not in ("GET", "HEAD"):
+            return 405, {}
+        prefix = ""
+        if self.redirect_path:
+            prefix = self.redirect_path[1:] + "/"
+        location = f"https://{self.redirect_hostname}/{prefix}{path.lstrip('/')}"
+        if query:
+            location += f"?{query}"
+        status = 301 if self.variables["permanent_redirect"] else 302
+        return status, {"location": location}
+
+
+async def start(instance, host="127.0.0.1", port=0):
+    """
+    Serve ``instance`` over HTTP/1.1 with keep-alive.
+
+    :return: Running :class:`asyncio.Server`.
+    """
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await read_head(reader)
+                if head is None:
+                    break
+                start_line, headers = head
+                method, target = start_line.split()[:2]
+                await read_body(reader, headers)
+                status, response = instance.handle(
+                    method,
+                    headers.get("host", ""),
+                    target,
+                    scheme=headers.get("x-forwarded-proto", "https"),
+                    headers=headers,
+                )
+                lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+                lines += [f"{name}: {value}" for name, value in response.items()]
+                lines.append("content-length: 0")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+                await writer.drain()
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+@contextmanager
+def serve_in_thread(instance, host="127.0.0.1", port=0):
+    """
+    Run the simulator in a background thread.
+
+    :return: Context manager yielding the ``host:port`` it listens on.
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    async def run():
+        server = await start(instance, host, port)
+        state["address"] = "%s:%d" % server.sockets[0].getsockname()[:2]
+        state["stop"] = asyncio.Event()
+        started.set()
+        async with server:
+            await state["stop"].wait()
+        # Close kept-alive client connections too.
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(run(),))
+    thread.start()
+    started.wait()
+    try:
+        yield state["address"]
+    finally:
+        loop.call_soon_threadsafe(state["stop"].set)
+        thread.join()
+        loop.close()
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.edge_simulator",
+        description="Serve redirects locally like a deployed module instance.",
+    )
+    parser.add_argument("--var-file", help=".tfvars file with the module variables")
+    parser.add_argument(
+        "--config", help="JSON file with the module variables (instead of --var-file)"
+    )
+    parser.add_argument(
+        "--zone-name", help="Hosted zone name; only its redirect hostnames are served"
+    )
+    parser.add_argument(
+        "--key-value-store", help="JSON file with KeyValueStore entries"
+    )
+    parser.add_argument("--mode", choices=MODES, help="Override the selected mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if args.var_file:
+        with open(args.var_file, encoding="utf-8") as fp:
+            variables = parse_tfvars(fp.read())
+    elif args.config:
+        with open(args.config, encoding="utf-8") as fp:
+            variables = json.load(fp)
+    else:
+        parser.error("one of --var-file or --config is required")
+    key_value_store = None
+    if args.key_value_store:
+        with open(args.key_value_store, encoding="utf-8") as fp:
+            key_value_store = json.load(fp)
+    instance = Instance(variables, args.zone_name, key_value_store, args.mode)
+
+    async def serve():
+        server = await start(instance, args.host, args.port)
+        LOG.info("Serving %s mode on http://%s:%d", instance.mode, args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Run the module's CloudFront Function offline over an event corpus.
+
+Renders ``templates/redirect-all-methods.js.tftpl`` with the variables
+``locals.tf`` passes to ``templatefile()`` (see
+:func:`tools.cloudfront_function.template_variables`), runs it in QuickJS
+for every event and reports the response and the per-invocation
+execution time (p50, p99 and max over ``--iterations`` calls).
+
+Events are CloudFront viewer-request event objects, the same JSON the
+CloudFront console and ``aws cloudfront test-function`` take; a file holds
+one event or a list of events. The module configuration is a JSON object
+with the arguments of ``template_variables``, e.g.
+``{"redirect_to": "example.com", "response_headers": {...}}``.
+
+Two gates make it usable as a regression check:
+
+- ``--expected FILE`` compares every response with the responses saved
+  earlier with ``--save-expected FILE``
+- ``--max-us N`` fails if any event's p50 execution time exceeds ``N``
+  microseconds
+
+Times come from an embedded engine, not the CloudFront runtime; compare
+them on the same machine.
+
+Usage::
+
+    python -m tools.function_harness tests/fixtures/cloudfront_events/events \\
+        --config tests/fixtures/cloudfront_events/configuration.json
+    python -m tools.function_harness events/ --config redirect.json \\
+        --expected expected.json --max-us 50
+    python -m tools.function_harness events/ --config redirect.json \\
+        --save-expected expected.json
+"""
+
+import json
+import logging
+import os
+import sys
+from argparse import ArgumentParser
+from os import path as osp
+
+from tools.cloudfront_function import CloudFrontFunction, render_function
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_ITERATIONS = 1000
+
+
+def load_events(paths):
+    """
+    Read events from JSON files and directories of JSON files.
+
+    :param paths: Files or directories; directories are read in name order.
+    :return: Dictionary event name -> event. A file with one event gives
+        its name without ``.json``; a file with a list gives ``name[i]``.
+    """
+    events = {}
+    for path in paths:
+        if osp.isdir(path):
+            files = [
+                osp.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(".json")
+            ]
+        else:
+            files = [path]
+        for file in files:
+            name = osp.splitext(osp.basename(file))[0]
+            with open(file, encoding="utf-8") as fp:
+                content = json.load(fp)
+            if isinstance(content, list):
+                for i, event in enumerate(content):
+                    events[f"{name}[{i}]"] = event
+            else:
+                events[name] = content
+    return events
+
+
+def percentiles(durations):
+    """p50, p99 and max of per-call durations, rounded to 0.01 µs."""
+    ordered = sorted(durations)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p99": round(ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def run(code, events, iterations=DEFAULT_ITERATIONS):
+    """
+    Invoke the function for every event.
+
+    :param code: Rendered function code (synchronous handler).
+    :param events: Dictionary event name -> event, see :func:`load_events`.
+    :param iterations: Timed calls per event, after a warm-up.
+    :return: List of ``{"event", "response", "us"}`` dictionaries; ``us``
+        holds the :func:`percentiles` of the execution time.
+    """
+    function = CloudFrontFunction(code)
+    names = list(events)
+    function.load_events([events[name] for name in names])
+    results = []
+    for index, name in enumerate(names):
+        response = function.invoke(events[name])
+        function.time_invocations(index, max(iterations // 10, 1))  # warm up
+        durations = function.time_invocations(index, iterations)
+        results.append(
+            {"event": name, "response": response, "us": percentiles(durations)}
+        )
+    return results
+
+
+def check_expected(results, expected):
+    """
+    Compare responses with saved ones.
+
+    :param expected: Dictionary event name -> response.
+    :return: List of names of events whose response differs or was not
+        saved.
+    """
+    return [r["event"] for r in results if expected.get(r["event"]) != r["response"]]
+
+
+def check_latency(results, max_us):
+    """Names of events whose p50 execution time exceeds ``max_us``."""
+    return [r["event"] for r in results if r["us"]["p50"] > max_us]
+
+
+def print_results(results):
+    width = max(len(r["event"]) for r in results)
+    print(f"{'event':<{width}}  {'p50 us':>8}  {'p99 us':>8}  {'max us':>8}  response")
+    for result in results:
+        response = result["response"]
+        location = response.get("headers", {}).get("location", {}).get("value", "")
+        us = result["us"]
+        print(
+            f"{result['event']:<{width}}  {us['p50']:>8}  {us['p99']:>8}  "
+            f"{us['max']:>8}  {response.get('statusCode')} {location}"
+        )
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.function_harness",
+        description="Run the CloudFront Function offline over an event corpus.",
+    )
+    parser.add_argument(
+        "events", nargs="+", help="Event JSON files or directories of them"
+    )
+    parser.add_argument(
+        "--config",
+        help="JSON file with the module configuration (template_variables arguments)",
+    )
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument(
+        "--expected", metavar="PATH", help="Fail if responses differ from these"
+    )
+    parser.add_argument(
+        "--save-expected", metavar="PATH", help="Write the responses as JSON"
+    )
+    parser.add_argument(
+        "--max-us", type=float, help="Fail if an event's p50 time exceeds this"
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON results")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    config = {"redirect_to": "example.com"}
+    if args.config:
+        with open(args.config, encoding="utf-8") as fp:
+            config = json.load(fp)
+    results = run(render_function(**config), load_events(args.events), args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_results(results)
+
+    if args.save_expected:
+        with open(args.save_expected, "w", encoding="utf-8") as fp:
+            responses = {r["event"]: r["response"] for r in results}
+            json.dump(responses, fp, indent=2, sort_keys=True, ensure_ascii=False)
+            fp.write("\n")
+
+    failed = False
+    if args.expected:
+        with open(args.expected, encoding="utf-8") as fp:
+            changed = check_expected(results, json.load(fp))
+        for name in changed:
+            LOG.error("%s: response differs from %s", name, args.expected)
+        failed = failed or bool(changed)
+    if args.max_us is not None:
+        slow = check_latency(results, args.max_us)
+        for name in slow:
+            LOG.error("%s: p50 execution time over %s us", name, args.max_us)
+        failed = failed or bool(slow)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Invalidate cached redirects on the module's CloudFront distribution.
+
+Paths are coalesced into wildcards until they fit the CloudFront
+invalidation limits (:data:`MAX_PATHS` paths and :data:`MAX_WILDCARDS`
+wildcard paths in progress per distribution), most specific groups first:
+``/blog/a`` and ``/blog/b`` become ``/blog/*`` before ``/*``. Paths already
+covered by a wildcard are dropped, so the whole set goes out in one
+``CreateInvalidation`` request.
+
+The module runs this tool when ``invalidate_on_change`` is enabled and the
+redirect configuration changes.
+
+Usage::
+
+    python -m tools.invalidation E2EXAMPLE '/*' --wait
+    python -m tools.invalidation E2EXAMPLE --paths-file changed.txt --max-paths 100
+    python -m tools.invalidation E2EXAMPLE --paths-file changed.txt --dry-run
+    python -m tools.invalidation E2EXAMPLE '/*' --role-arn arn:aws:iam::123456789012:role/deploy
+"""
+
+import json
+import logging
+import sys
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+LOG = logging.getLogger(__name__)
+
+# CloudFront invalidation quotas, per distribution and in progress at a time
+MAX_PATHS = 3000
+MAX_WILDCARDS = 15
+
+# STS session name when assuming --role-arn
+ROLE_SESSION_NAME = "http-redirect-invalidation"
+
+# Wait for completion: poll every WAIT_DELAY seconds, up to WAIT_ATTEMPTS times
+WAIT_DELAY = 20
+WAIT_ATTEMPTS = 90
+
+
+def normalize(paths):
+    """
+    Clean up invalidation paths.
+
+    :return: Set of paths, each starting with ``/``.
+    :raises ValueError: On a ``*`` that is not the last character.
+    """
+    result = set()
+    for path in paths:
+        path = path.strip()
+        if not path:
+            continue
+        if not path.startswith("/"):
+            path = f"/{path}"
+        if "*" in path[:-1]:
+            raise ValueError(f"{path}: '*' is only allowed at the end of a path")
+        result.add(path)
+    return result
+
+
+def _is_wildcard(path):
+    return path.endswith("*")
+
+
+def _prefixes(path):
+    """Directory prefixes whose wildcard would cover ``path``, shortest first."""
+    base = path[:-1] if _is_wildcard(path) else path
+    for index, char in enumerate(base):
+        if char == "/":
+            prefix = base[: index + 1]
+            if not (_is_wildcard(path) and prefix == base):
+                yield prefix
+
+
+def drop_covered(paths):
+    """Remove paths that a wildcard in ``paths`` already covers."""
+    bases = {path[:-1] for path in paths if _is_wildcard(path)}
+    result = set()
+    for path in paths:
+        own = path[:-1] if _is_wildcard(path) else None
+        prefixes = (path[:i] for i in range(1, len(path) + 1))
+        if not any(prefix in bases and prefix != own for prefix in prefixes):
+            result.add(path)
+    return result
+
+
+def coalesce(paths, max_paths=MAX_PATHS, max_wildcards=MAX_WILDCARDS):
+    """
+    Fit ``paths`` into one invalidation within the given limits.
+
+    While there are more than ``max_paths`` paths or ``max_wildcards``
+    wildcards, paths sharing the deepest directory prefix are replaced by
+    that prefix's wildcard, largest groups first; when only the wildcards
+    are over the limit, only wildcards are grouped.
+
+    :return: Sorted list of paths.
+    """
+    if max_paths < 1 or max_wildcards < 1:
+        raise ValueError("max_paths and max_wildcards must be at least 1")
+    items = drop_covered(normalize(paths))
+
+    def over_limits(paths, wildcards):
+        return paths > max_paths or wildcards > max_wildcards
+
+    wildcards = sum(1 for item in items if _is_wildcard(item))
+    while over_limits(len(items), wildcards):
+        only_wildcards = len(items) <= max_paths
+        groups = defaultdict(set)
+        covered = defaultdict(set)
+        for item in items:
+            for prefix in _prefixes(item):
+                covered[prefix].add(item)
+                if _is_wildcard(item) or not only_wildcards:
+                    groups[prefix].add(item)
+        candidates = [prefix for prefix, group in groups.items() if len(group) > 1]
+        if not candidates:
+            break
+        # Prefixes of the same depth do not overlap.
+        depth = max(prefix.count("/") for prefix in candidates)
+        deepest = [prefix for prefix in candidates if prefix.count("/") == depth]
+        count = len(items)
+        for prefix in sorted(deepest, key=lambda p: (-len(groups[p]), p)):
+            items.difference_update(covered[prefix])
+            items.add(f"{prefix}*")
+            count -= len(covered[prefix]) - 1
+            wildcards -= sum(1 for item in covered[prefix] if _is_wildcard(item)) - 1
+            if not over_limits(count, wildcards):
+                break
+        items = drop_covered(items)
+        wildcards = sum(1 for item in items if _is_wildcard(item))
+    return sorted(items)
+
+
+def cloudfront_client(role_arn=None, session=None):
+    """
+    CloudFront client with the credentials of the environment or, with
+    ``role_arn``, of that role assumed through STS, like the provider's
+    ``assume_role``.
+
+    :param session: ``boto3`` (default) or a ``boto3.Session``.
+    """
+    if session is None:
+        import boto3
+
+        session = boto3
+    if not role_arn:
+        return session.client("cloudfront")
+    credentials = session.client("sts").assume_role(
+        RoleArn=role_arn, RoleSessionName=ROLE_SESSION_NAME
+    )["Credentials"]
+    LOG.info("Assumed %s", role_arn)
+    return session.client(
+        "cloudfront",
+        aws_access_key_id=credentials["AccessKeyId"],
+        aws_secret_access_key=credentials["SecretAccessKey"],
+        aws_session_token=credentials["SessionToken"],
+    )
+
+
+def invalidate(client, distribution_id, paths, wait=False, caller_reference=None):
+    """
+    Create one invalidation for ``paths``.
+
+    :param client: ``boto3.client("cloudfront")`` or any object with the
+        same ``create_invalidation`` and ``get_waiter`` methods.
+    :param paths: Paths as returned by :func:`coalesce`.
+    :param wait: Return only once the invalidation is completed.
+    :param caller_reference: Unique request reference; a timestamp by
+        default.
+    :return: ID of the invalidation.
+    """
+    response = client.create_invalidation(
+        DistributionId=distribution_id,
+        InvalidationBatch={
+            "Paths": {"Quantity": len(paths), "Items": list(paths)},
+            "CallerReference": caller_reference or str(time.time_ns()),
+        },
+    )
+    invalidation_id = response["Invalidation"]["Id"]
+    LOG.info(
+        "Created invalidation %s of %d paths on %s",
+        invalidation_id,
+        len(paths),
+        distribution_id,
+    )
+    if wait:
+        client.get_waiter("invalidation_completed").wait(
+            DistributionId=distribution_id,
+            Id=invalidation_id,
+            WaiterConfig={"Delay": WAIT_DELAY, "MaxAttempts": WAIT_ATTEMPTS},
+        )
+        LOG.info("Invalidation %s completed", invalidation_id)
+    return invalidation_id
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.invalidation",
+        description="Invalidate paths on a CloudFront distribution, coalesced "
+        "into wildcards to fit the invalidation limits.",
+    )
+    parser.add_argument("distribution_id", help="CloudFront distribution ID")
+    parser.add_argument("paths", nargs="*", help="Paths to invalidate, e.g. '/*'")
+    parser.add_argument("--paths-file", help="File with one path per line")
+    parser.add_argument("--paths-json", help="JSON list of paths")
+    parser.add_argument("--max-paths", type=int, default=MAX_PATHS)
+    parser.add_argument("--max-wildcards", type=int, default=MAX_WILDCARDS)
+    parser.add_argument(
+        "--wait", action="store_true", help="Wait until the invalidation completes"
+    )
+    parser.add_argument(
+        "--role-arn", help="IAM role to assume before creating the invalidation"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the paths; do not invalidate"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    paths = list(args.paths)
+    if args.paths_file:
+        with open(args.paths_file, encoding="utf-8") as fp:
+            paths.extend(fp)
+    if args.paths_json:
+        paths.extend(json.loads(args.paths_json))
+    if not paths:
+        parser.error("no paths given")
+    paths = coalesce(paths, args.max_paths, args.max_wildcards)
+
+    if args.dry_run:
+        print(json.dumps(paths, indent=2))
+        return 0
+
+    invalidate(cloudfront_client(args.role_arn), args.distribution_id, paths, args.wait)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
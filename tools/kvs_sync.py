@@ -0,0 +1,288 @@
+"""
+Synchronize a local redirect mapping with the module's CloudFront KeyValueStore.
+
+The mapping is a JSON object (the output of ``tools.redirect_map``) or a
+``source,target`` CSV file. Keys are request paths (``/old/page``) or
+hostnames (``www.example.com``); values use the ``redirect_map`` target
+format (``/path`` or ``hostname/path``). Every entry is checked and
+normalized before anything is written (:func:`normalize`): targets are
+compacted like CSV rows, and hostname keys are lowercased, as the function
+looks them up.
+
+Only keys whose value differs from the store are written, in batches of at
+most :data:`MAX_BATCH_SIZE` changes per ``UpdateKeys`` call. Keys that exist
+in the store but not in the mapping are deleted unless ``--no-prune`` is given.
+
+Usage::
+
+    python -m tools.kvs_sync \\
+        --kvs-arn "$(terraform output -raw key_value_store_arn)" \\
+        redirect_map.json
+
+The KeyValueStore API uses SigV4A signing, which needs ``botocore[crt]``.
+"""
+
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from collections import namedtuple
+
+from tools.redirect_map import HOSTNAME_PATTERN, compact_target, load_csv
+
+LOG = logging.getLogger(__name__)
+
+# CloudFront KeyValueStore quotas
+MAX_BATCH_SIZE = 50
+MAX_KEY_BYTES = 512
+MAX_VALUE_BYTES = 1024
+
+SyncResult = namedtuple("SyncResult", ["puts", "deletes", "unchanged", "batches"])
+
+
+class KeyValueStore:
+    """
+    Thin wrapper around the ``cloudfront-keyvaluestore`` boto3 client.
+
+    :param client: ``boto3.client("cloudfront-keyvaluestore")`` or any object
+        with the same ``describe_key_value_store``, ``list_keys`` and
+        ``update_keys`` methods.
+    :param kvs_arn: ARN of the KeyValueStore.
+    """
+
+    def __init__(self, client, kvs_arn):
+        self._client = client
+        self._kvs_arn = kvs_arn
+
+    @property
+    def etag(self):
+        """Current ETag, required for optimistic locking on updates."""
+        return self._client.describe_key_value_store(KvsARN=self._kvs_arn)["ETag"]
+
+    def items(self):
+        """Return all keys in the store as a dictionary."""
+        result = {}
+        kwargs = {"KvsARN": self._kvs_arn}
+        while True:
+            response = self._client.list_keys(**kwargs)
+            for item in response.get("Items", []):
+                result[item["Key"]] = item["Value"]
+            if not response.get("NextToken"):
+                return result
+            kwargs["NextToken"] = response["NextToken"]
+
+    def update(self, etag, puts, deletes):
+        """
+        Apply one batch of changes.
+
+        :param etag: ETag returned by :attr:`etag` or a previous update.
+        :param puts: Dictionary key -> value to write.
+        :param deletes: Keys to remove.
+        :return: The new ETag.
+        """
+        response = self._client.update_keys(
+            KvsARN=self._kvs_arn,
+            IfMatch=etag,
+            Puts=[{"Key": key, "Value": value} for key, value in puts.items()],
+            Deletes=[{"Key": key} for key in deletes],
+        )
+        return response["ETag"]
+
+
+def normalize_key(key):
+    """
+    Path keys as they are, hostname keys lowercased.
+
+    :raises ValueError: If the key is neither a path nor a hostname.
+    """
+    if key.startswith("/"):
+        return key
+    host = key.lower()
+    if not HOSTNAME_PATTERN.match(host):
+        raise ValueError(f"Key must be a path or a hostname: {key!r}")
+    return host
+
+
+def normalize(mapping, default_host=None):
+    """
+    Check a mapping and bring it into the form the function expects.
+
+    Keys go through :func:`normalize_key` and targets through
+    :func:`~tools.redirect_map.compact_target`, as CSV rows do. The request
+    path is appended to the targets of hostname keys, so their trailing
+    slashes are dropped (``docs.example.com``, not ``docs.example.com/``).
+
+    :param default_host: See :func:`~tools.redirect_map.compact_target`.
+    :return: New dictionary key -> target.
+    :raises ValueError: On the first key or target that is not a string,
+        not valid, or a duplicate of another key once normalized.
+    """
+    result = {}
+    for key, value in mapping.items():
+        if not isinstance(key, str) or not isinstance(value, str):
+            raise ValueError(f"Keys and targets must be strings: {key!r}: {value!r}")
+        normalized = normalize_key(key)
+        if normalized in result:
+            raise ValueError(f"Duplicate key {normalized!r}")
+        try:
+            target = compact_target(value, default_host)
+        except ValueError as err:
+            raise ValueError(f"Invalid target for {key!r}: {err}") from err
+        if not normalized.startswith("/"):
+            target = target.rstrip("/")
+            if not target:
+                raise ValueError(
+                    f"Target for {key!r} must be a hostname or a path below /"
+                )
+        result[normalized] = target
+    return result
+
+
+def validate(mapping):
+    """
+    Check a mapping against KeyValueStore key and value size limits.
+
+    :raises ValueError: On the first entry that does not fit.
+    """
+    for key, value in mapping.items():
+        if not key or len(key.encode("utf-8")) > MAX_KEY_BYTES:
+            raise ValueError(f"Key must be 1-{MAX_KEY_BYTES} bytes: {key!r}")
+        if not value or len(value.encode("utf-8")) > MAX_VALUE_BYTES:
+            raise ValueError(
+                f"Value for {key!r} must be 1-{MAX_VALUE_BYTES} bytes: {value!r}"
+            )
+
+
+def diff(local, remote, prune=True):
+    """
+    Compute the changes needed to make ``remote`` match ``local``.
+
+    :return: ``(puts, deletes)`` where ``puts`` is a dictionary of new or
+        changed keys and ``deletes`` a sorted list of keys missing locally.
+    """
+    puts = {key: value for key, value in local.items() if remote.get(key) != value}
+    deletes = sorted(set(remote) - set(local)) if prune else []
+    return puts, deletes
+
+
+def batches(puts, deletes, batch_size=MAX_BATCH_SIZE):
+    """
+    Split changes into ``UpdateKeys`` batches.
+
+    Each batch holds at most ``batch_size`` puts and deletes combined.
+
+    :return: Generator of ``(puts, deletes)`` tuples.
+    """
+    if not 0 < batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    changes = [("put", key) for key in sorted(puts)]
+    changes += [("delete", key) for key in deletes]
+    for start in range(0, len(changes), batch_size):
+        chunk = changes[start : start + batch_size]
+        yield (
+            {key: puts[key] for op, key in chunk if op == "put"},
+            [key for op, key in chunk if op == "delete"],
+        )
+
+
+def sync(store, mapping, batch_size=MAX_BATCH_SIZE, prune=True, dry_run=False):
+    """
+    Push the difference between ``mapping`` and ``store``.
+
+    :param store: :class:`KeyValueStore` (or a compatible object).
+    :param mapping: Dictionary key -> target; see :func:`normalize`.
+    :param batch_size: Maximum changes per ``UpdateKeys`` call.
+    :param prune: Delete keys that are not in ``mapping``.
+    :param dry_run: Compute and log the changes without writing them.
+    :return: :class:`SyncResult`.
+    """
+    mapping = normalize(mapping)
+    validate(mapping)
+    remote = store.items()
+    puts, deletes = diff(mapping, remote, prune=prune)
+    unchanged = len(mapping) - len(puts)
+    LOG.info(
+        "%d to put, %d to delete, %d unchanged", len(puts), len(deletes), unchanged
+    )
+    count = 0
+    if not dry_run and (puts or deletes):
+        etag = store.etag
+        for batch_puts, batch_deletes in batches(puts, deletes, batch_size):
+            etag = store.update(etag, batch_puts, batch_deletes)
+            count += 1
+            LOG.debug(
+                "Batch %d: %d puts, %d deletes",
+                count,
+                len(batch_puts),
+                len(batch_deletes),
+            )
+    return SyncResult(
+        puts=len(puts), deletes=len(deletes), unchanged=unchanged, batches=count
+    )
+
+
+def load_mapping(path, default_host=None):
+    """
+    Load a JSON object or a ``source,target`` CSV file.
+
+    :raises ValueError: If the JSON is not an object or has an invalid
+        entry (see :func:`normalize`).
+    """
+    with open(path, encoding="utf-8", newline="") as fp:
+        if path.endswith(".csv"):
+            return load_csv(fp, default_host=default_host)
+        mapping = json.load(fp)
+    if not isinstance(mapping, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return normalize(mapping, default_host)
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.kvs_sync",
+        description="Push redirect entries to a CloudFront KeyValueStore.",
+    )
+    parser.add_argument("mapping", help="JSON object or source,target CSV file")
+    parser.add_argument("--kvs-arn", required=True, help="KeyValueStore ARN")
+    parser.add_argument(
+        "--default-host",
+        help="redirect_to hostname; targets on it are stored as bare paths",
+    )
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument(
+        "--no-prune",
+        dest="prune",
+        action="store_false",
+        help="Keep keys that are in the store but not in the mapping",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    try:
+        mapping = load_mapping(args.mapping, default_host=args.default_host)
+        validate(mapping)
+    except ValueError as err:
+        LOG.error("%s", err)
+        return 1
+
+    # Imported here so the diff/batch logic stays usable without boto3.
+    import boto3
+
+    store = KeyValueStore(
+        boto3.client("cloudfront-keyvaluestore", region_name="us-east-1"),
+        args.kvs_arn,
+    )
+    result = sync(
+        store,
+        mapping,
+        batch_size=args.batch_size,
+        prune=args.prune,
+        dry_run=args.dry_run,
+    )
+    LOG.info("Done in %d batch(es)", result.batches)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
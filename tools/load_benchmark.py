@@ -0,0 +1,609 @@
+"""
+Load and latency benchmark for deployed redirects.
+
+Sends concurrent HTTP/1.1 requests to a redirect endpoint from asyncio
+workers, each holding a keep-alive connection, and reports:
+
+- throughput (requests per second)
+- latency p50, p90 and p99, overall and per ``x-cache`` result
+  (``Hit``, ``Miss``, ``FunctionGeneratedResponse``, ...)
+- TCP connect and TLS handshake times of new connections
+- status codes, and whether the ``Location`` header is where the
+  request should have been redirected to
+
+``--record`` also writes every response as JSON Lines (latency, ``x-cache``
+and ``Server-Timing``), for :mod:`tools.server_timing`.
+
+The traffic is a weighted mix of methods, paths and query strings. A
+``{n}`` in a path or query string is replaced by a random number, to
+spread requests over many cache keys, and ``--cache-bust`` adds a unique
+``cachebust`` parameter to that share of requests so they miss the cache.
+Weights follow an ``@``: ``--path /@8 --path "/blog/{n}@2"``.
+
+Run the same workload against an S3 mode and a function mode deployment
+to compare them. The ``serve`` scenario starts a local stand-in for a
+redirect distribution (plain HTTP, ``Miss`` on the first request of a
+URL and ``Hit`` after), so the tool itself can be exercised without AWS.
+
+Usage::
+
+    python -m tools.load_benchmark run https://old.example.com \\
+        --redirect-to example.com --requests 5000 --concurrency 50 \\
+        --method GET@95 --method HEAD@5 \\
+        --path /@5 --path /pricing@3 --path "/blog/{n}@2" \\
+        --query @6 --query "utm_source=mail&utm_medium=email@4" \\
+        --cache-bust 0.1
+    python -m tools.load_benchmark run https://old.example.com --record responses.jsonl
+    python -m tools.load_benchmark serve --redirect-to example.com --port 8080
+    python -m tools.load_benchmark run http://127.0.0.1:8080 --redirect-to example.com
+"""
+
+import asyncio
+import json
+import logging
+import random
+import ssl
+import sys
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from time import perf_counter
+from urllib.parse import parse_qsl, urlsplit
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_STATUSES = (301,)
+DEFAULT_TIMEOUT = 10.0
+
+# Mismatched responses kept in the report, to show what went wrong.
+MAX_EXAMPLES = 5
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_weighted(specs):
+    """
+    Parse ``VALUE@WEIGHT`` specs into ``(values, weights)``.
+
+    The weight is optional (default 1); ``@3`` alone is an empty value.
+    """
+    values, weights = [], []
+    for spec in specs:
+        value, sep, weight = spec.rpartition("@")
+        if not sep:
+            value, weight = spec, "1"
+        try:
+            weight = float(weight)
+        except ValueError:
+            value, weight = spec, 1.0
+        if weight < 0:
+            raise ValueError(f"Negative weight in {spec!r}")
+        values.append(value)
+        weights.append(weight)
+    return values, weights
+
+
+class Workload:
+    """
+    Random request generator.
+
+    :param methods: ``VALUE@WEIGHT`` specs of HTTP methods.
+    :param paths: Specs of request paths.
+    :param queries: Specs of query strings, without ``?``; empty for none.
+    :param cache_bust: Share of requests (0 to 1) that get a unique
+        ``cachebust`` parameter.
+    :param seed: Random seed, for a repeatable request sequence.
+    """
+
+    def __init__(
+        self, methods=("GET",), paths=("/",), queries=("",), cache_bust=0.0, seed=0
+    ):
+        if not 0 <= cache_bust <= 1:
+            raise ValueError(f"cache_bust must be between 0 and 1, got {cache_bust}")
+        self.methods = parse_weighted(methods)
+        self.paths = parse_weighted(paths)
+        self.queries = parse_weighted(queries)
+        self.cache_bust = cache_bust
+        self.rng = random.Random(seed)
+        self.count = 0
+
+    def _choose(self, choices):
+        value = self.rng.choices(*choices)[0]
+        while "{n}" in value:
+            value = value.replace("{n}", str(self.rng.randrange(1000000)), 1)
+        return value
+
+    def next_request(self):
+        """Return the next ``(method, target)``, e.g. ``("GET", "/a?b=c")``."""
+        self.count += 1
+        method = self._choose(self.methods)
+        path = self._choose(self.paths)
+        params = [p for p in self._choose(self.queries).split("&") if p]
+        if self.rng.random() < self.cache_bust:
+            params.append(f"cachebust={self.count}-{self.rng.randrange(1 << 30)}")
+        return method, path + ("?" + "&".join(params) if params else "")
+
+
+def expected_location(redirect_to, target):
+    """
+    ``Location`` a redirect to ``redirect_to`` should return for ``target``.
+
+    The request path and query string are appended to ``redirect_to``, as
+    the module does when ``redirect_map`` and ``redirect_rules`` do not
+    match. ``redirect_to`` without a scheme is redirected to over HTTPS.
+    """
+    if "://" not in redirect_to:
+        redirect_to = f"https://{redirect_to}"
+    return redirect_to.rstrip("/") + target
+
+
+def same_location(actual, expected):
+    """
+    Whether two URLs are the same redirect.
+
+    Query parameters are compared in any order; the function may rebuild
+    the query string.
+    """
+    if actual is None:
+        return False
+    actual, expected = urlsplit(actual), urlsplit(expected)
+    return (
+        actual.scheme == expected.scheme
+        and actual.netloc.lower() == expected.netloc.lower()
+        and (actual.path or "/") == (expected.path or "/")
+        and sorted(parse_qsl(actual.query, keep_blank_values=True))
+        == sorted(parse_qsl(expected.query, keep_blank_values=True))
+    )
+
+
+def cache_result(headers):
+    """First word of ``x-cache`` (``Hit``, ``Miss``, ...), or ``-``."""
+    value = headers.get("x-cache", "").split()
+    return value[0] if value else "-"
+
+
+def percentiles(values):
+    """Nearest-rank p50, p90 and p99 of ``values`` in milliseconds."""
+    ordered = sorted(values)
+    result = {}
+    for p in PERCENTILES:
+        if ordered:
+            rank = max(1, -(-p * len(ordered) // 100))
+            result[f"p{p}"] = round(ordered[rank - 1] * 1000, 2)
+        else:
+            result[f"p{p}"] = None
+    return result
+
+
+class Results:
+    """
+    Measurements of a benchmark run.
+
+    :param redirect_to: Expected redirect destination, see
+        :func:`expected_location`; ``None`` to skip the ``Location`` check.
+    :param statuses: Expected status codes.
+    :param record: Keep every response in :attr:`records`.
+    """
+
+    def __init__(self, redirect_to=None, statuses=DEFAULT_STATUSES, record=False):
+        self.redirect_to = redirect_to
+        self.statuses = frozenset(statuses)
+        self.latencies = defaultdict(list)
+        self.connect_times = []
+        self.tls_times = []
+        self.status_counts = Counter()
+        self.errors = Counter()
+        self.mismatches = Counter()
+        self.examples = []
+        self.elapsed = 0.0
+        self.records = [] if record else None
+
+    def add_connection(self, connect_time, tls_time):
+        self.connect_times.append(connect_time)
+        if tls_time is not None:
+            self.tls_times.append(tls_time)
+
+    def add_error(self, error):
+        self.errors[type(error).__name__] += 1
+
+    def add(self, method, target, status, headers, latency):
+        """Record one response and check its status and ``Location``."""
+        self.latencies[cache_result(headers)].append(latency)
+        self.status_counts[status] += 1
+        if self.records is not None:
+            self.records.append(
+                {
+                    "method": method,
+                    "target": target,
+                    "status": status,
+                    "latency_ms": round(latency * 1000, 3),
+                    "x_cache": headers.get("x-cache"),
+                    "server_timing": headers.get("server-timing"),
+                }
+            )
+        location = headers.get("location")
+        problem = None
+        if status not in self.statuses:
+            problem = "status"
+        elif self.redirect_to is not None:
+            expected = expected_location(self.redirect_to, target)
+            if not same_location(location, expected):
+                problem = "location"
+        if problem:
+            self.mismatches[problem] += 1
+            if len(self.examples) < MAX_EXAMPLES:
+                self.examples.append(
+                    {
+                        "method": method,
+                        "target": target,
+                        "status": status,
+                        "location": location,
+                    }
+                )
+
+    @property
+    def requests(self):
+        return sum(self.status_counts.values())
+
+    @property
+    def failed(self):
+        return bool(self.errors or self.mismatches)
+
+    def report(self):
+        """Return the results as a JSON-serializable dictionary."""
+        latency = {"all": percentiles(sum(self.latencies.values(), []))}
+        for result, values in sorted(self.latencies.items()):
+            latency[result] = dict(percentiles(values), requests=len(values))
+        return {
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "elapsed_s": round(self.elapsed, 3),
+            "requests_per_sec": (
+                round(self.requests / self.elapsed, 1) if self.elapsed else None
+            ),
+            "latency_ms": latency,
+            "connections": len(self.connect_times),
+            "connect_ms": percentiles(self.connect_times),
+            "tls_handshake_ms": percentiles(self.tls_times),
+            "statuses": {str(s): c for s, c in sorted(self.status_counts.items())},
+            "mismatches": dict(self.mismatches),
+            "mismatch_examples": self.examples,
+        }
+
+
+async def read_head(reader):
+    """Read a start line and headers; ``None`` at end of stream."""
+    start = await reader.readline()
+    if not start:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return start.decode("latin-1").rstrip("\r\n"), headers
+
+
+async def read_body(reader, headers):
+    """Read and discard a message body, see RFC 9112 section 6."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                return
+    await reader.readexactly(int(headers.get("content-length", 0)))
+
+
+class Connection:
+    """HTTP/1.1 client connection, reused for requests while kept alive."""
+
+    def __init__(self, reader, writer, host, connect_time, tls_time):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.connect_time = connect_time
+        self.tls_time = tls_time
+
+    @classmethod
+    async def open(cls, url, ssl_context=None):
+        """
+        Connect to ``url``; for ``https`` the TLS handshake is timed
+        separately from the TCP connect.
+        """
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        started = perf_counter()
+        reader, writer = await asyncio.open_connection(parts.hostname, port)
+        connected = perf_counter()
+        tls_time = None
+        if https:
+            await writer.start_tls(
+                ssl_context or ssl.create_default_context(),
+                server_hostname=parts.hostname,
+            )
+            tls_time = perf_counter() - connected
+        return cls(reader, writer, parts.netloc, connected - started, tls_time)
+
+    async def request(self, method, target):
+        """Send a request and return ``(status, headers)``."""
+        body_header = "Content-Length: 0\r\n" if method in ("POST", "PUT") else ""
+        self.writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"User-Agent: load-benchmark\r\n{body_header}\r\n".encode("latin-1")
+        )
+        await self.writer.drain()
+        head = await read_head(self.reader)
+        if head is None:
+            raise ConnectionResetError("Connection closed by server")
+        start, headers = head
+        status = int(start.split()[1])
+        if method != "HEAD" and status not in (204, 304) and status >= 200:
+            await read_body(self.reader, headers)
+        return status, headers
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+async def run(
+    url,
+    workload,
+    requests=1000,
+    concurrency=10,
+    keep_alive=True,
+    redirect_to=None,
+    statuses=DEFAULT_STATUSES,
+    timeout=DEFAULT_TIMEOUT,
+    ssl_context=None,
+    record=False,
+):
+    """
+    Send ``requests`` requests from ``concurrency`` workers.
+
+    :param url: Endpoint, e.g. ``https://old.example.com``.
+    :param workload: :class:`Workload` generating the requests.
+    :param keep_alive: Reuse connections; ``False`` opens (and for HTTPS
+        handshakes) a connection per request.
+    :param redirect_to: Expected redirect destination, or ``None``.
+    :param statuses: Expected status codes.
+    :param timeout: Seconds per connect or request.
+    :param record: Keep every response, see :class:`Results`.
+    :return: :class:`Results`.
+    """
+    results = Results(redirect_to=redirect_to, statuses=statuses, record=record)
+    pending = iter(range(requests))
+
+    async def worker():
+        connection = None
+        for _ in pending:
+            method, target = workload.next_request()
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        Connection.open(url, ssl_context), timeout
+                    )
+                    results.add_connection(connection.connect_time, connection.tls_time)
+                started = perf_counter()
+                status, headers = await asyncio.wait_for(
+                    connection.request(method, target), timeout
+                )
+                latency = perf_counter() - started
+            except (
+                OSError,
+                ValueError,
+                IndexError,
+                asyncio.IncompleteReadError,
+                asyncio.TimeoutError,
+            ) as error:
+                LOG.debug("%s %s failed: %r", method, target, error)
+                results.add_error(error)
+                if connection is not None:
+                    await connection.close()
+                connection = None
+                continue
+            results.add(method, target, status, headers, latency)
+            if not keep_alive or headers.get("connection", "").lower() == "close":
+                await connection.close()
+                connection = None
+        if connection is not None:
+            await connection.close()
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    results.elapsed = perf_counter() - started
+    return results
+
+
+async def start_stand_in(redirect_to, status=301, host="127.0.0.1", port=0):
+    """
+    Start a local stand-in for a redirect distribution.
+
+    Redirects every request to ``redirect_to`` with the path and query
+    string appended, and answers ``x-cache: Miss from cloudfront`` for
+    the first request of a method and URL and ``Hit from cloudfront``
+    after.
+
+    :return: Running :class:`asyncio.Server`; the port is in
+        ``server.sockets[0].getsockname()[1]``.
+    """
+    seen = set()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await read_head(reader)
+                if head is None:
+                    break
+                start, headers = head
+                method, target = start.split()[:2]
+                await read_body(reader, headers)
+                result = "Hit" if (method, target) in seen else "Miss"
+                seen.add((method, target))
+                writer.write(
+                    f"HTTP/1.1 {status} Moved\r\n"
+                    f"Location: {expected_location(redirect_to, target)}\r\n"
+                    f"X-Cache: {result} from cloudfront\r\n"
+                    "Content-Length: 0\r\n\r\n".encode("latin-1")
+                )
+                await writer.drain()
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def serve(redirect_to, status=301, host="127.0.0.1", port=8080):
+    server = await start_stand_in(redirect_to, status=status, host=host, port=port)
+    LOG.info("Redirecting http://%s:%d to %s", host, port, redirect_to)
+    async with server:
+        await server.serve_forever()
+
+
+def print_report(report):
+    print(f"Requests:        {report['requests']}")
+    print(f"Elapsed:         {report['elapsed_s']:.3f}s")
+    print(f"Throughput:      {report['requests_per_sec']} requests/s")
+    print(f"Connections:     {report['connections']}")
+    for title, values in (
+        ("Connect", report["connect_ms"]),
+        ("TLS handshake", report["tls_handshake_ms"]),
+    ):
+        print(f"{title + ':':<16} {_format_percentiles(values)}")
+    print("\nLatency:")
+    for result, values in report["latency_ms"].items():
+        requests = values.get("requests", report["requests"])
+        print(f"  {result:<28} {requests:>8}  {_format_percentiles(values)}")
+    for title, counts in (
+        ("Statuses", report["statuses"]),
+        ("Errors", report["errors"]),
+        ("Mismatches", report["mismatches"]),
+    ):
+        if counts:
+            print(f"\n{title}:")
+            for key, count in counts.items():
+                print(f"  {count:>10}  {key}")
+    for example in report["mismatch_examples"]:
+        print(
+            f"  {example['method']} {example['target']} -> "
+            f"{example['status']} {example['location']}"
+        )
+
+
+def _format_percentiles(values):
+    return ", ".join(
+        f"p{p} {values[f'p{p}']}ms" if values[f"p{p}"] is not None else f"p{p} -"
+        for p in PERCENTILES
+    )
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.load_benchmark",
+        description="Load and latency benchmark for deployed redirects.",
+    )
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    run_parser = subparsers.add_parser("run", help="send traffic to an endpoint")
+    run_parser.add_argument("url", help="Endpoint, e.g. https://old.example.com")
+    run_parser.add_argument(
+        "--redirect-to",
+        help="Expected redirect_to; checks each Location (path and query appended)",
+    )
+    run_parser.add_argument(
+        "--status",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_STATUSES),
+        help="Expected status codes",
+    )
+    run_parser.add_argument("--requests", type=int, default=1000)
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument(
+        "--method", action="append", help="METHOD[@WEIGHT], repeatable (GET)"
+    )
+    run_parser.add_argument(
+        "--path", action="append", help="PATH[@WEIGHT], repeatable (/)"
+    )
+    run_parser.add_argument(
+        "--query",
+        action="append",
+        help="QUERY[@WEIGHT] without '?', repeatable; '@3' is no query (none)",
+    )
+    run_parser.add_argument(
+        "--cache-bust",
+        type=float,
+        default=0.0,
+        help="Share of requests with a unique cachebust parameter, 0 to 1",
+    )
+    run_parser.add_argument(
+        "--no-keep-alive",
+        dest="keep_alive",
+        action="store_false",
+        help="New connection (and TLS handshake) per request",
+    )
+    run_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--json", action="store_true", help="Print JSON report")
+    run_parser.add_argument(
+        "--record", metavar="PATH", help="Write every response as JSON Lines"
+    )
+
+    serve_parser = subparsers.add_parser("serve", help="run a local stand-in")
+    serve_parser.add_argument("--redirect-to", required=True)
+    serve_parser.add_argument("--status", type=int, default=301)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if args.scenario == "serve":
+        try:
+            asyncio.run(serve(args.redirect_to, args.status, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    workload = Workload(
+        methods=args.method or ["GET"],
+        paths=args.path or ["/"],
+        queries=args.query or [""],
+        cache_bust=args.cache_bust,
+        seed=args.seed,
+    )
+    results = asyncio.run(
+        run(
+            args.url,
+            workload,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            keep_alive=args.keep_alive,
+            redirect_to=args.redirect_to,
+            statuses=args.status,
+            timeout=args.timeout,
+            record=args.record is not None,
+        )
+    )
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as out:
+            for record in results.records:
+                out.write(json.dumps(record) + "\n")
+    report = results.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if results.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Summarize CloudFront standard (legacy) access logs.
+
+Reads the gzipped log files CloudFront writes to the logging bucket, either
+from a local directory or from S3 (or an S3-compatible store), and reports:
+
+- edge hit ratio and the mix of ``x-edge-result-type`` values
+- share of requests that went to the origin (``Miss`` and ``RefreshHit``)
+- ``time-taken`` p50, p95 and p99
+- HTTP status mix
+- top request paths (``cs-uri-stem``)
+
+Files are parsed by a generator pipeline (file -> lines -> records), one
+file per worker process, and every file is reduced to a :class:`Summary`
+of bounded size that is merged into the total. Memory does not grow with
+the number of requests or files, so months of logs can be processed.
+
+Usage::
+
+    python -m tools.log_analyzer ./logs/
+    python -m tools.log_analyzer s3://example-com-cf-logs-abcd1234/ --workers 8
+    python -m tools.log_analyzer s3://bucket/prefix/ --endpoint-url http://localhost:9000
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from urllib.parse import unquote
+
+LOG = logging.getLogger(__name__)
+
+# Fields of the legacy format, used when a file has no #Fields header.
+LEGACY_FIELDS = (
+    "date time x-edge-location sc-bytes c-ip cs-method cs(Host) cs-uri-stem "
+    "sc-status cs(Referer) cs(User-Agent) cs-uri-query cs(Cookie) "
+    "x-edge-result-type x-edge-request-id x-host-header cs-protocol cs-bytes "
+    "time-taken x-forwarded-for ssl-protocol ssl-cipher "
+    "x-edge-response-result-type cs-protocol-version fle-status "
+    "fle-encrypted-fields c-port time-to-first-byte "
+    "x-edge-detailed-result-type sc-content-type sc-content-len "
+    "sc-range-start sc-range-end"
+).split()
+
+HIT_RESULT_TYPES = frozenset(["Hit", "RefreshHit"])
+ORIGIN_RESULT_TYPES = frozenset(["Miss", "RefreshHit"])
+
+# time-taken has millisecond resolution; slower requests share the last bucket.
+MAX_TIME_MS = 60000
+
+# Distinct paths kept per summary before pruning to the most frequent.
+DEFAULT_TOP_CAPACITY = 1000
+
+
+class TopCounter:
+    """
+    Approximate heavy-hitter counter with bounded memory.
+
+    Keeps at most ``2 * capacity`` keys; when full, only the ``capacity``
+    most frequent survive. Keys more frequent than ``1 / capacity`` of the
+    total are kept with exact or near-exact counts, which is what a top-N
+    report (N much smaller than ``capacity``) needs.
+    """
+
+    def __init__(self, capacity=DEFAULT_TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = Counter()
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+        if len(self.counts) > 2 * self.capacity:
+            self._prune()
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.add(key, count)
+
+    def most_common(self, n):
+        return self.counts.most_common(n)
+
+    def _prune(self):
+        self.counts = Counter(dict(self.counts.most_common(self.capacity)))
+
+
+class Summary:
+    """
+    Mergeable aggregate of log records.
+
+    :param top_capacity: See :class:`TopCounter`.
+    """
+
+    def __init__(self, top_capacity=DEFAULT_TOP_CAPACITY):
+        self.requests = 0
+        self.files = 0
+        self.result_types = Counter()
+        self.statuses = Counter()
+        self.time_ms = Counter()
+        self.paths = TopCounter(top_capacity)
+
+    def add(self, record):
+        """Add one parsed log record (dictionary field -> value)."""
+        self.requests += 1
+        self.result_types[record.get("x-edge-result-type", "-")] += 1
+        self.statuses[record.get("sc-status", "-")] += 1
+        try:
+            time_ms = round(float(record["time-taken"]) * 1000)
+        except (KeyError, ValueError):
+            pass
+        else:
+            self.time_ms[min(time_ms, MAX_TIME_MS)] += 1
+        self.paths.add(unquote(record.get("cs-uri-stem", "-")))
+
+    def merge(self, other):
+        """Add the counts of ``other`` to this summary."""
+        self.requests += other.requests
+        self.files += other.files
+        self.result_types.update(other.result_types)
+        self.statuses.update(other.statuses)
+        self.time_ms.update(other.time_ms)
+        self.paths.merge(other.paths)
+        return self
+
+    def percentile(self, p):
+        """``time-taken`` percentile in seconds, or None without data."""
+        total = sum(self.time_ms.values())
+        if not total:
+            return None
+        rank = p / 100.0 * total
+        seen = 0
+        for time_ms in sorted(self.time_ms):
+            seen += self.time_ms[time_ms]
+            if seen >= rank:
+                return time_ms / 1000.0
+        return max(self.time_ms) / 1000.0
+
+    def report(self, top=10):
+        """Return the summary as a JSON-serializable dictionary."""
+        requests = self.requests or 1
+        hits = sum(self.result_types[t] for t in HIT_RESULT_TYPES)
+        origin = sum(self.result_types[t] for t in ORIGIN_RESULT_TYPES)
+        return {
+            "files": self.files,
+            "requests": self.requests,
+            "edge_hit_ratio": round(hits / requests, 4),
+            "origin_share": round(origin / requests, 4),
+            "time_taken": {f"p{p}": self.percentile(p) for p in (50, 95, 99)},
+            "result_types": dict(self.result_types.most_common()),
+            "statuses": dict(sorted(self.statuses.items())),
+            "top_paths": self.paths.most_common(top),
+        }
+
+
+def read_lines(fp):
+    """Decode the lines of a binary log stream."""
+    for line in io.TextIOWrapper(fp, encoding="utf-8", errors="replace"):
+        yield line.rstrip("\n")
+
+
+def parse_records(lines):
+    """
+    Parse log lines into dictionaries keyed by field name.
+
+    Field names come from the ``#Fields:`` header, so files with extra or
+    fewer fields are read correctly. Other comment lines are skipped.
+    """
+    fields = LEGACY_FIELDS
+    for line in lines:
+        if line.startswith("#"):
+            if line.startswith("#Fields:"):
+                fields = line[len("#Fields:") :].split()
+            continue
+        if line:
+            yield dict(zip(fields, line.split("\t")))
+
+
+def open_source(source, endpoint_url=None):
+    """
+    Open a log file for streaming reads of its decompressed bytes.
+
+    Files ending in ``.gz`` (as CloudFront writes them) are decompressed on
+    the fly; S3 objects are streamed, not downloaded first.
+
+    :param source: Local path or ``s3://bucket/key``.
+    :param endpoint_url: Endpoint of an S3-compatible store.
+    """
+    if source.startswith("s3://"):
+        bucket, _, key = source[len("s3://") :].partition("/")
+        body = _s3_client(endpoint_url).get_object(Bucket=bucket, Key=key)["Body"]
+        if source.endswith(".gz"):
+            return gzip.GzipFile(fileobj=body)
+        return io.BytesIO(body.read())
+    if source.endswith(".gz"):
+        return gzip.open(source, "rb")
+    return open(source, "rb")
+
+
+def summarize_file(source, endpoint_url=None, top_capacity=DEFAULT_TOP_CAPACITY):
+    """Summarize one log file. Runs in a worker process."""
+    summary = Summary(top_capacity)
+    with open_source(source, endpoint_url) as fp:
+        for record in parse_records(read_lines(fp)):
+            summary.add(record)
+    summary.files = 1
+    return summary
+
+
+def list_sources(location, endpoint_url=None):
+    """
+    Yield log files under a local directory or an ``s3://bucket/prefix``.
+
+    Both are listed lazily, so the listing is not held in memory.
+    """
+    if location.startswith("s3://"):
+        bucket, _, prefix = location[len("s3://") :].partition("/")
+        paginator = _s3_client(endpoint_url).get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield f"s3://{bucket}/{item['Key']}"
+    elif os.path.isfile(location):
+        yield location
+    else:
+        for root, dirs, files in os.walk(location):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield os.path.join(root, name)
+
+
+def map_bounded(executor, fn, items, window):
+    """
+    Yield ``fn(item)`` results from ``executor`` in completion order.
+
+    Unlike :meth:`Executor.map`, at most ``window`` items are submitted
+    ahead of the results consumed, so ``items`` can be a lazy listing of
+    any length.
+    """
+    items = iter(items)
+    pending = set()
+    while True:
+        for item in items:
+            pending.add(executor.submit(fn, item))
+            if len(pending) >= window:
+                break
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def analyze(
+    sources, workers=None, endpoint_url=None, top_capacity=DEFAULT_TOP_CAPACITY
+):
+    """
+    Summarize many log files in a process pool.
+
+    At most ``4 * workers`` files are in flight, and each finished file is
+    merged into the total right away.
+
+    :param sources: Iterable of paths or ``s3://`` URLs.
+    :param workers: Worker processes; defaults to the CPU count.
+    :return: Merged :class:`Summary`.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = Summary(top_capacity)
+    summarize = partial(
+        summarize_file, endpoint_url=endpoint_url, top_capacity=top_capacity
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for summary in map_bounded(executor, summarize, sources, 4 * workers):
+            total.merge(summary)
+            LOG.debug("%d files summarized", total.files)
+    return total
+
+
+_S3_CLIENTS = {}
+
+
+def _s3_client(endpoint_url):
+    # One client per process and endpoint; imported here so local files
+    # can be analyzed without boto3.
+    if endpoint_url not in _S3_CLIENTS:
+        import boto3
+
+        _S3_CLIENTS[endpoint_url] = boto3.client("s3", endpoint_url=endpoint_url)
+    return _S3_CLIENTS[endpoint_url]
+
+
+def print_report(report):
+    print(f"Files:           {report['files']}")
+    print(f"Requests:        {report['requests']}")
+    print(f"Edge hit ratio:  {report['edge_hit_ratio']:.2%}")
+    print(f"Origin share:    {report['origin_share']:.2%}")
+    print(
+        "Time taken:      "
+        + ", ".join(
+            f"{name} {value:.3f}s" if value is not None else f"{name} -"
+            for name, value in report["time_taken"].items()
+        )
+    )
+    for title, counts in (
+        ("Result types", report["result_types"].items()),
+        ("Statuses", report["statuses"].items()),
+        ("Top paths", report["top_paths"]),
+    ):
+        print(f"\n{title}:")
+        for key, count in counts:
+            print(f"  {count:>10}  {key}")
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.log_analyzer",
+        description="Summarize CloudFront standard access logs.",
+    )
+    parser.add_argument(
+        "location", help="Log file, directory, or s3://bucket/prefix to read"
+    )
+    parser.add_argument("--endpoint-url", help="S3-compatible endpoint URL")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument("--top", type=int, default=10, help="Top paths to report")
+    parser.add_argument("--json", action="store_true", help="Print JSON report")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    summary = analyze(
+        list_sources(args.location, args.endpoint_url),
+        workers=args.workers,
+        endpoint_url=args.endpoint_url,
+    )
+    report = summary.report(top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Convert CloudFront standard (legacy) access logs to partitioned Parquet.
+
+Rewrites the gzipped tab-separated files of ``cloudfront_logging_format =
+"legacy"`` into the layout the module delivers with ``cloudfront_logging_format
+= "parquet"``, so one Glue table (``create_log_table``) covers old and new
+logs::
+
+    <destination>/year=2024/month=05/day=01/hour=10/<log file name>.parquet
+
+Records are partitioned by their own ``date`` and ``time`` (UTC), not by the
+file name. Columns have the names of the Glue table (``cs(Host)`` becomes
+``cs_host``) and are all strings, in the order CloudFront delivers them.
+Re-running the conversion overwrites the same objects, so it can be resumed.
+
+Usage::
+
+    python -m tools.log_converter s3://example-com-cf-logs-abcd1234/cloudfront-logs/ \\
+        s3://example-com-cf-logs-abcd1234/cloudfront-logs-parquet/
+    python -m tools.log_converter ./logs/ ./parquet/ --workers 8
+"""
+
+import logging
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pyarrow
+import pyarrow.parquet
+
+from tools.log_analyzer import (
+    LEGACY_FIELDS,
+    _s3_client,
+    list_sources,
+    map_bounded,
+    open_source,
+    parse_records,
+    read_lines,
+)
+
+LOG = logging.getLogger(__name__)
+
+COOKIE_FIELD = "cs(Cookie)"
+
+
+def column_name(field):
+    """
+    Glue/Athena column name of a CloudFront log field.
+
+    Must match ``cloudfront_log_columns`` in ``locals.tf``.
+    """
+    return re.sub(r"[^0-9a-z]+", "_", field.lower()).strip("_")
+
+
+def log_fields(include_cookies=False):
+    """
+    Fields of Parquet access logs, in delivery order.
+
+    Must match ``cloudfront_log_fields`` in ``locals.tf``; the Glue table
+    reads columns by position.
+    """
+    return [f for f in LEGACY_FIELDS if include_cookies or f != COOKIE_FIELD]
+
+
+def partition(record):
+    """Hive-style hour partition of a record, e.g. ``year=2024/month=05/...``."""
+    date, time = record["date"], record["time"]
+    return f"year={date[:4]}/month={date[5:7]}/day={date[8:10]}/hour={time[:2]}"
+
+
+def convert_file(source, destination, fields, endpoint_url=None):
+    """
+    Convert one log file. Runs in a worker process.
+
+    :param source: Local path or ``s3://bucket/key`` of a legacy log file.
+    :param destination: Local directory or ``s3://bucket/prefix``.
+    :param fields: Fields to write, see :func:`log_fields`.
+    :return: Number of records converted.
+    """
+    # Column-wise buffers per partition; a log file holds roughly an hour
+    # of one edge location's requests, so it fits in memory.
+    partitions = defaultdict(lambda: [[] for _ in fields])
+    count = 0
+    with open_source(source, endpoint_url) as fp:
+        for record in parse_records(read_lines(fp)):
+            columns = partitions[partition(record)]
+            for column, field in zip(columns, fields):
+                column.append(record.get(field))
+            count += 1
+
+    name = re.sub(r"\.gz$", "", source.rsplit("/", 1)[-1]) + ".parquet"
+    schema = pyarrow.schema([(column_name(f), pyarrow.string()) for f in fields])
+    for key, columns in partitions.items():
+        table = pyarrow.Table.from_arrays(columns, schema=schema)
+        write_table(table, f"{destination.rstrip('/')}/{key}/{name}", endpoint_url)
+    return count
+
+
+def write_table(table, target, endpoint_url=None):
+    """Write a Parquet file to a local path or ``s3://bucket/key``."""
+    if target.startswith("s3://"):
+        bucket, _, key = target[len("s3://") :].partition("/")
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.parquet.write_table(table, sink)
+        _s3_client(endpoint_url).put_object(
+            Bucket=bucket, Key=key, Body=sink.getvalue().to_pybytes()
+        )
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        pyarrow.parquet.write_table(table, target)
+
+
+def convert(
+    sources, destination, workers=None, endpoint_url=None, include_cookies=False
+):
+    """
+    Convert many log files in a process pool.
+
+    :param sources: Iterable of paths or ``s3://`` URLs.
+    :param destination: Local directory or ``s3://bucket/prefix``.
+    :param workers: Worker processes; defaults to the CPU count.
+    :param include_cookies: Keep the ``cs(Cookie)`` column; match
+        ``cloudfront_logging_include_cookies``.
+    :return: ``(files, records)`` converted.
+    """
+    workers = workers or os.cpu_count() or 1
+    convert_one = partial(
+        convert_file,
+        destination=destination,
+        fields=log_fields(include_cookies),
+        endpoint_url=endpoint_url,
+    )
+    files = records = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for count in map_bounded(executor, convert_one, sources, 4 * workers):
+            files += 1
+            records += count
+            LOG.debug("%d files converted", files)
+    return files, records
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.log_converter",
+        description="Convert CloudFront legacy access logs to partitioned Parquet.",
+    )
+    parser.add_argument(
+        "source", help="Log file, directory, or s3://bucket/prefix to read"
+    )
+    parser.add_argument(
+        "destination", help="Directory or s3://bucket/prefix to write Parquet to"
+    )
+    parser.add_argument("--endpoint-url", help="S3-compatible endpoint URL")
+    parser.add_argument("--workers", type=int, help="Worker processes")
+    parser.add_argument(
+        "--include-cookies",
+        action="store_true",
+        help="Keep the cs(Cookie) column (cloudfront_logging_include_cookies = true)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    files, records = convert(
+        list_sources(args.source, args.endpoint_url),
+        args.destination,
+        workers=args.workers,
+        endpoint_url=args.endpoint_url,
+        include_cookies=args.include_cookies,
+    )
+    LOG.info("Converted %d records from %d files", records, files)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
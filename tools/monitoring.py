@@ -0,0 +1,410 @@
+"""
+Render the monitoring dashboard and replay alarm thresholds offline.
+
+:func:`dashboard_variables` mirrors the ``templatefile()`` arguments of the
+``create_monitoring`` dashboard (``monitoring.tf`` and ``locals.tf``), so
+:func:`render_dashboard` gives the body Terraform deploys.
+
+:data:`ALARMS` mirrors the alarm definitions in ``locals.tf``.
+:func:`evaluate` replays recorded metric samples through an alarm the way
+CloudWatch evaluates it: the alarm is in ``ALARM`` when at least
+``datapoints_to_alarm`` of the last ``evaluation_periods`` periods are above
+the threshold, and missing periods count as not breaching. Use it to see
+which ``monitoring_thresholds`` would have fired on real traffic before
+changing them. Samples are the output of ``aws cloudwatch get-metric-data``
+for the queries the ``queries`` command prints.
+
+Usage::
+
+    python -m tools.monitoring queries E2EXAMPLE --function-name redirect-all-methods-abc \\
+        > queries.json
+    aws cloudwatch get-metric-data --region us-east-1 \\
+        --metric-data-queries file://queries.json \\
+        --start-time 2026-10-01T00:00:00Z --end-time 2026-10-08T00:00:00Z > samples.json
+    python -m tools.monitoring replay samples.json
+    python -m tools.monitoring replay samples.json --threshold origin_latency_ms=800
+    python -m tools.monitoring dashboard E2EXAMPLE --function-name redirect-all-methods-abc
+"""
+
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from collections import namedtuple
+from datetime import datetime, timedelta
+from os import path as osp
+
+from tools.cloudfront_function import MODULE_DIR, jsonencode
+from tools.tftpl import render
+
+LOG = logging.getLogger(__name__)
+
+DASHBOARD_TEMPLATE_PATH = osp.join(MODULE_DIR, "templates", "dashboard.json.tftpl")
+
+# CloudFront publishes its metrics in us-east-1
+REGION = "us-east-1"
+NAMESPACE = "AWS/CloudFront"
+PERIOD = 300
+
+# Defaults of the monitoring_thresholds variable
+DEFAULT_THRESHOLDS = {
+    "origin_latency_ms": 1000,
+    "error_5xx_rate": 1,
+    "function_compute_utilization": 70,
+    "function_throttles": 0,
+}
+
+Alarm = namedtuple(
+    "Alarm",
+    [
+        "metric_name",
+        "statistic",
+        "evaluation_periods",
+        "datapoints_to_alarm",
+        "threshold",
+        "dimension",
+    ],
+)
+
+# Alarm name -> definition, as local.monitoring_distribution_alarms and
+# local.monitoring_function_alarms. ``threshold`` is the monitoring_thresholds
+# attribute, ``dimension`` the metric dimension besides Region = Global.
+ALARMS = {
+    "origin_latency": Alarm(
+        "OriginLatency", "p90", 3, 2, "origin_latency_ms", "DistributionId"
+    ),
+    "error_5xx_rate": Alarm(
+        "5xxErrorRate", "Average", 3, 2, "error_5xx_rate", "DistributionId"
+    ),
+    "function_compute_utilization": Alarm(
+        "FunctionComputeUtilization",
+        "Maximum",
+        3,
+        2,
+        "function_compute_utilization",
+        "FunctionName",
+    ),
+    "function_throttles": Alarm(
+        "FunctionThrottles", "Sum", 1, 1, "function_throttles", "FunctionName"
+    ),
+}
+
+# Dashboard widget -> metrics, as local.monitoring_dashboard_metrics
+DISTRIBUTION_WIDGETS = {
+    "requests": ["Requests"],
+    "error_rates": ["4xxErrorRate", "5xxErrorRate"],
+    "cache_hit_rate": ["CacheHitRate"],
+    "origin_latency": ["OriginLatency"],
+    "bytes_downloaded": ["BytesDownloaded"],
+}
+FUNCTION_WIDGETS = {
+    "function_utilization": ["FunctionComputeUtilization"],
+    "function_invocations": [
+        "FunctionInvocations",
+        "FunctionThrottles",
+        "FunctionExecutionErrors",
+    ],
+}
+
+
+def _metric(name, dimension, value):
+    """Dashboard metric row of a CloudFront metric."""
+    return [NAMESPACE, name, dimension, value, "Region", "Global"]
+
+
+def dashboard_variables(
+    distribution_ids, function_name=None, edge_only=False, thresholds=None
+):
+    """
+    Build the template variables of the dashboard.
+
+    :param distribution_ids: IDs of the distributions, in group key order
+        (``"0"``, ``"1"``, ``"10"``, ``"2"``, ... as Terraform sorts them).
+    :param function_name: Name of the CloudFront Function, ``None`` without
+        one.
+    :param edge_only: The ``edge_only`` input; no origin widgets when set.
+    :param thresholds: ``monitoring_thresholds``; missing attributes take
+        their defaults.
+    """
+    metrics = {
+        widget: jsonencode(
+            [
+                _metric(name, "DistributionId", id_)
+                for name in names
+                for id_ in distribution_ids
+            ]
+        )
+        for widget, names in DISTRIBUTION_WIDGETS.items()
+    }
+    metrics.update(
+        {
+            widget: jsonencode(
+                [_metric(name, "FunctionName", function_name or "-") for name in names]
+            )
+            for widget, names in FUNCTION_WIDGETS.items()
+        }
+    )
+    return {
+        "region": REGION,
+        "has_origin": not edge_only,
+        "use_function": function_name is not None,
+        "metrics": metrics,
+        "thresholds": {**DEFAULT_THRESHOLDS, **(thresholds or {})},
+    }
+
+
+def render_dashboard(*args, **kwargs):
+    """
+    Render the dashboard body; arguments as :func:`dashboard_variables`.
+
+    :return: The dashboard as a dictionary.
+    """
+    with open(DASHBOARD_TEMPLATE_PATH, encoding="utf-8") as fp:
+        return json.loads(render(fp.read(), dashboard_variables(*args, **kwargs)))
+
+
+def metric_data_queries(distribution_id, function_name=None):
+    """
+    ``get-metric-data`` queries for the metrics of :data:`ALARMS`.
+
+    Query IDs are the alarm names, so :func:`load_samples` output feeds
+    :func:`evaluate` directly. Function alarms are left out without
+    ``function_name``.
+    """
+    dimensions = {"DistributionId": distribution_id, "FunctionName": function_name}
+    queries = []
+    for name, alarm in ALARMS.items():
+        if dimensions[alarm.dimension] is None:
+            continue
+        queries.append(
+            {
+                "Id": name,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": NAMESPACE,
+                        "MetricName": alarm.metric_name,
+                        "Dimensions": [
+                            {
+                                "Name": alarm.dimension,
+                                "Value": dimensions[alarm.dimension],
+                            },
+                            {"Name": "Region", "Value": "Global"},
+                        ],
+                    },
+                    "Period": PERIOD,
+                    "Stat": alarm.statistic,
+                },
+            }
+        )
+    return queries
+
+
+def load_samples(path):
+    """
+    Read recorded ``aws cloudwatch get-metric-data`` output.
+
+    :return: Dictionary query ID -> list of ``(timestamp, value)`` in time
+        order. Results of several pages (``NextToken``) may be concatenated
+        in a JSON list.
+    """
+    with open(path, encoding="utf-8") as fp:
+        content = json.load(fp)
+    pages = content if isinstance(content, list) else [content]
+    samples = {}
+    for page in pages:
+        for result in page["MetricDataResults"]:
+            points = samples.setdefault(result["Id"], [])
+            points.extend(
+                (datetime.fromisoformat(timestamp), value)
+                for timestamp, value in zip(result["Timestamps"], result["Values"])
+            )
+    for points in samples.values():
+        points.sort()
+    return samples
+
+
+def _periods(samples, period):
+    """Values of consecutive periods from the first to the last sample; ``None`` if missing."""
+    if not samples:
+        return []
+    values = dict(samples)
+    start, end = samples[0][0], samples[-1][0]
+    step = timedelta(seconds=period)
+    periods = []
+    timestamp = start
+    while timestamp <= end:
+        periods.append((timestamp, values.get(timestamp)))
+        timestamp += step
+    return periods
+
+
+def evaluate(alarm, samples, threshold, period=PERIOD):
+    """
+    Replay samples through an alarm.
+
+    :param alarm: :class:`Alarm`, e.g. ``ALARMS["origin_latency"]``.
+    :param samples: ``(timestamp, value)`` pairs in time order, one per
+        period at most.
+    :param threshold: The alarm fires on values above it.
+    :return: List of ``(timestamp, value, state)`` per period, ``state``
+        being ``"ALARM"`` or ``"OK"`` after evaluating that period.
+    """
+    result = []
+    breaching = []
+    for timestamp, value in _periods(samples, period):
+        breaching.append(value is not None and value > threshold)
+        window = breaching[-alarm.evaluation_periods :]
+        state = "ALARM" if sum(window) >= alarm.datapoints_to_alarm else "OK"
+        result.append((timestamp, value, state))
+    return result
+
+
+def alarm_episodes(evaluation):
+    """
+    Collapse :func:`evaluate` output into alarm episodes.
+
+    :return: List of ``(start, end, peak)``: first and last period in
+        ``ALARM`` and the highest value in between.
+    """
+    episodes = []
+    current = None
+    for timestamp, value, state in evaluation:
+        if state == "ALARM":
+            if current is None:
+                current = [timestamp, timestamp, value]
+            current[1] = timestamp
+            if value is not None and (current[2] is None or value > current[2]):
+                current[2] = value
+        elif current is not None:
+            episodes.append(tuple(current))
+            current = None
+    if current is not None:
+        episodes.append(tuple(current))
+    return episodes
+
+
+def quiet_threshold(alarm, samples, period=PERIOD):
+    """
+    Lowest threshold that would never have fired on ``samples``.
+
+    In every window of ``evaluation_periods`` periods, the alarm needs
+    ``datapoints_to_alarm`` values above the threshold, so the threshold
+    must be at least the ``datapoints_to_alarm``-th highest value of each
+    window.
+
+    :return: The threshold, or ``None`` if no window has enough
+        datapoints to fire.
+    """
+    values = [value for _, value in _periods(samples, period)]
+    quiet = None
+    for end in range(len(values)):
+        window = values[max(0, end - alarm.evaluation_periods + 1) : end + 1]
+        present = sorted((v for v in window if v is not None), reverse=True)
+        if len(present) >= alarm.datapoints_to_alarm:
+            candidate = present[alarm.datapoints_to_alarm - 1]
+            quiet = candidate if quiet is None else max(quiet, candidate)
+    return quiet
+
+
+def _threshold_argument(text):
+    name, _, value = text.partition("=")
+    if name not in DEFAULT_THRESHOLDS or not value:
+        raise ValueError(text)
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.monitoring",
+        description="Render the monitoring dashboard and replay alarm thresholds "
+        "over recorded CloudWatch metrics.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    queries_parser = subparsers.add_parser(
+        "queries", help="print get-metric-data queries for the alarm metrics"
+    )
+    queries_parser.add_argument("distribution_id", help="CloudFront distribution ID")
+    queries_parser.add_argument(
+        "--function-name", help="CloudFront Function name (cloudfront_function_name)"
+    )
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="replay recorded get-metric-data output through the alarms"
+    )
+    replay_parser.add_argument("samples", help="get-metric-data output (JSON)")
+    replay_parser.add_argument(
+        "--threshold",
+        type=_threshold_argument,
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="monitoring_thresholds attribute to replay, e.g. origin_latency_ms=800",
+    )
+    replay_parser.add_argument("--json", action="store_true", help="Print JSON")
+
+    dashboard_parser = subparsers.add_parser(
+        "dashboard", help="print the dashboard body"
+    )
+    dashboard_parser.add_argument(
+        "distribution_ids", nargs="+", help="CloudFront distribution IDs"
+    )
+    dashboard_parser.add_argument("--function-name", help="CloudFront Function name")
+    dashboard_parser.add_argument("--edge-only", action="store_true")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if args.command == "queries":
+        print(
+            json.dumps(
+                metric_data_queries(args.distribution_id, args.function_name),
+                indent=2,
+            )
+        )
+        return 0
+
+    if args.command == "dashboard":
+        dashboard = render_dashboard(
+            args.distribution_ids, args.function_name, args.edge_only
+        )
+        print(json.dumps(dashboard, indent=2))
+        return 0
+
+    thresholds = {**DEFAULT_THRESHOLDS, **dict(args.threshold)}
+    report = []
+    for name, samples in load_samples(args.samples).items():
+        if name not in ALARMS:
+            LOG.warning("%s: not an alarm metric, skipped", name)
+            continue
+        alarm = ALARMS[name]
+        threshold = thresholds[alarm.threshold]
+        episodes = alarm_episodes(evaluate(alarm, samples, threshold))
+        report.append(
+            {
+                "alarm": name,
+                "threshold": threshold,
+                "quiet_threshold": quiet_threshold(alarm, samples),
+                "episodes": [
+                    {"start": start.isoformat(), "end": end.isoformat(), "peak": peak}
+                    for start, end, peak in episodes
+                ],
+            }
+        )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for entry in report:
+            print(
+                f"{entry['alarm']}: {len(entry['episodes'])} alarm(s) above "
+                f"{entry['threshold']:g}; quiet at {entry['quiet_threshold']}"
+            )
+            for episode in entry["episodes"]:
+                print(
+                    f"  {episode['start']} .. {episode['end']}  peak {episode['peak']}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
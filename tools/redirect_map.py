@@ -0,0 +1,250 @@
+"""
+Import exact-path redirect lists into the module's ``redirect_map`` input.
+
+Supported sources:
+
+- CSV with ``source,target`` columns (an optional header row is skipped).
+- nginx configuration with any of:
+
+  - ``rewrite ^/old$ https://example.com/new permanent;``
+  - ``location = /old { return 301 https://example.com/new; }``
+  - ``map $uri $new { /old https://example.com/new; }`` entries
+
+Only exact-path rules are imported. Regex rewrites with captures, internal
+rewrites (``last``/``break``) and similar rules are skipped with a warning.
+
+The output is a JSON object that Terraform can load directly::
+
+    redirect_map = jsondecode(file("${path.module}/redirect_map.json"))
+
+Usage::
+
+    python -m tools.redirect_map csv old-urls.csv --default-host example.com
+    python -m tools.redirect_map nginx rewrites.conf -o redirect_map.json
+"""
+
+import csv
+import json
+import logging
+import re
+import sys
+from argparse import ArgumentParser
+from urllib.parse import urlsplit
+
+LOG = logging.getLogger(__name__)
+
+REDIRECT_STATUS_CODES = {"301", "302", "303", "307", "308"}
+
+# Lowercase hostname, as in the redirect_to validation in variables.tf
+HOSTNAME_PATTERN = re.compile(
+    r"^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$"
+)
+
+# Characters that make an nginx rewrite pattern more than a literal path.
+# An unescaped "." is tolerated because "^/page.html$" is almost always
+# meant literally.
+_REGEX_SPECIAL = re.compile(r"(?<!\\)[*+?()\[\]{}|^$]")
+_NGINX_TOKEN = re.compile(r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|[{};]|[^\s{};]+")
+
+
+def compact_target(target, default_host=None):
+    """
+    Convert a redirect target into the form ``redirect_map`` expects.
+
+    :param target: Absolute URL (``https://host/path``), ``host/path``
+        or ``/path``.
+    :param default_host: Hostname of ``redirect_to``. Targets on this host
+        are shortened to a bare path, which keeps the compiled function small.
+    :return: ``/path`` or ``host/path``; runs of ``/`` in the path are
+        collapsed.
+    :raises ValueError: If the target has a query string or fragment,
+        uses a scheme other than http(s), or has no valid hostname (ports
+        and credentials included).
+    """
+    if target.startswith("/"):
+        # "//host/path" would be split as a network location
+        parts = urlsplit(re.sub(r"^/+", "/", target))
+        host = None
+    else:
+        if "://" not in target:
+            target = "https://" + target
+        parts = urlsplit(target)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported scheme in target {target!r}")
+        host = parts.hostname
+        if not host or parts.netloc.lower() != host or not HOSTNAME_PATTERN.match(host):
+            raise ValueError(f"Invalid hostname in target {target!r}")
+    if parts.query or parts.fragment:
+        raise ValueError(
+            f"Query strings and fragments are not supported in targets: {target!r}"
+        )
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if host is None or host == default_host:
+        return path
+    return f"{host}{path}"
+
+
+def _add(mapping, source, target, default_host):
+    if not source.startswith("/"):
+        LOG.warning("Skipping %r: source must be a path starting with '/'", source)
+        return
+    try:
+        compacted = compact_target(target, default_host)
+    except ValueError as err:
+        LOG.warning("Skipping %r: %s", source, err)
+        return
+    if source in mapping:
+        LOG.warning(
+            "Duplicate source %r, keeping %r over %r",
+            source,
+            mapping[source],
+            compacted,
+        )
+        return
+    mapping[source] = compacted
+
+
+def load_csv(fp, default_host=None):
+    """
+    Read ``source,target`` rows from a CSV file.
+
+    :param fp: Open text file.
+    :param default_host: See :func:`compact_target`.
+    :return: Dictionary source path -> target.
+    """
+    mapping = {}
+    for row in csv.reader(fp):
+        if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+            continue
+        if len(row) < 2:
+            LOG.warning("Skipping malformed row %r", row)
+            continue
+        source, target = row[0].strip(), row[1].strip()
+        if not mapping and source.lower() == "source":
+            continue
+        _add(mapping, source, target, default_host)
+    return mapping
+
+
+def _unquote(token):
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in "\"'":
+        return token[1:-1]
+    return token
+
+
+def _literal_path(pattern):
+    """Return the path an exact nginx rewrite regex matches, or None."""
+    if not (pattern.startswith("^/") and pattern.endswith("$")):
+        return None
+    body = pattern[1:-1]
+    if body.endswith("\\"):
+        return None
+    if _REGEX_SPECIAL.search(body):
+        return None
+    return re.sub(r"\\(.)", r"\1", body)
+
+
+def _nginx_statements(text):
+    """
+    Yield ``(context, tokens, terminator)`` for each nginx statement.
+
+    ``context`` is the token list of the innermost enclosing block.
+    """
+    text = re.sub(r"(?m)#.*$", "", text)
+    stack = []
+    tokens = []
+    for token in _NGINX_TOKEN.findall(text):
+        if token in ("{", ";"):
+            yield (stack[-1] if stack else []), tokens, token
+            if token == "{":
+                stack.append(tokens)
+            tokens = []
+        elif token == "}":
+            if stack:
+                stack.pop()
+            tokens = []
+        else:
+            tokens.append(_unquote(token))
+
+
+def load_nginx(fp, default_host=None):
+    """
+    Extract exact-path redirects from nginx configuration.
+
+    :param fp: Open text file.
+    :param default_host: See :func:`compact_target`.
+    :return: Dictionary source path -> target.
+    """
+    mapping = {}
+    for context, tokens, terminator in _nginx_statements(fp.read()):
+        if terminator != ";" or not tokens:
+            continue
+        directive = tokens[0]
+        if directive == "rewrite" and len(tokens) >= 3:
+            flag = tokens[3] if len(tokens) > 3 else None
+            if flag not in ("permanent", "redirect") and "://" not in tokens[2]:
+                LOG.warning("Skipping internal rewrite %s", " ".join(tokens))
+                continue
+            source = _literal_path(tokens[1])
+            if source is None or "$" in tokens[2]:
+                LOG.warning("Skipping non-exact rewrite %s", " ".join(tokens))
+                continue
+            _add(mapping, source, tokens[2], default_host)
+        elif directive == "return" and len(tokens) == 3:
+            if tokens[1] not in REDIRECT_STATUS_CODES:
+                continue
+            if len(context) == 3 and context[:2] == ["location", "="]:
+                _add(mapping, context[2], tokens[2], default_host)
+            else:
+                LOG.warning(
+                    "Skipping return outside an exact location: %s",
+                    " ".join(context + tokens),
+                )
+        elif context and context[0] == "map" and len(tokens) == 2:
+            if directive in ("default", "hostnames", "include", "volatile"):
+                continue
+            _add(mapping, tokens[0], tokens[1], default_host)
+    return mapping
+
+
+LOADERS = {
+    "csv": load_csv,
+    "nginx": load_nginx,
+}
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.redirect_map",
+        description="Convert redirect lists into a redirect_map JSON object.",
+    )
+    parser.add_argument("format", choices=sorted(LOADERS))
+    parser.add_argument("input", help="Path to the CSV or nginx file")
+    parser.add_argument(
+        "--default-host",
+        help="redirect_to hostname; targets on it are stored as bare paths",
+    )
+    parser.add_argument(
+        "-o", "--output", help="Write JSON here instead of standard output"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    with open(args.input, encoding="utf-8", newline="") as fp:
+        mapping = LOADERS[args.format](fp, default_host=args.default_host)
+
+    payload = json.dumps(dict(sorted(mapping.items())), indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(payload)
+    else:
+        sys.stdout.write(payload)
+
+    # Same encoding the module uses when compiling the map into the function.
+    compiled = len(json.dumps(mapping, separators=(",", ":")).encode("utf-8"))
+    LOG.info("Imported %d redirects (%d bytes compiled)", len(mapping), compiled)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""
+Verify that old URLs redirect where they should, in one hop.
+
+Reads a CSV of ``source,expected_location,expected_status`` rows (the
+status is optional and defaults to 301; an optional header row and ``#``
+comments are skipped) and requests every source concurrently. Each row
+passes when:
+
+- the source answers with ``expected_status``
+- its ``Location`` is ``expected_location`` (query parameters in any order)
+- following the redirect does not redirect again: the chain is one hop
+
+Redirects are followed up to ``--max-hops``, so longer chains and loops
+are reported with every hop. Connections are kept alive and pooled per
+host, and ``--rate`` limits the requests per second sent to each host,
+so the destination site is not flooded while tens of thousands of rows
+are checked. Results are written as JSON Lines, one object per row in
+input order; the exit code is non-zero if any row failed. The
+``Server-Timing`` header of the first response, when there is one, is kept
+for :mod:`tools.server_timing`.
+
+Expectations can be generated from the module configuration: the
+``generate`` scenario runs each source URL through the module's rendered
+CloudFront Function (see :mod:`tools.cloudfront_function`), which builds
+locations the way the deployed module does. The configuration is a JSON
+object with the arguments of
+:func:`tools.cloudfront_function.template_variables`, e.g.
+``{"redirect_to": "example.com", "redirect_map": {...}}``.
+
+Usage::
+
+    python -m tools.redirect_verifier generate urls.txt --config redirect.json \\
+        -o expected.csv
+    python -m tools.redirect_verifier check expected.csv --rate 20 -o results.jsonl
+    python -m tools.redirect_verifier check expected.csv --no-follow
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import ssl
+import sys
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from urllib.parse import urljoin, urlsplit
+
+from tools.benchmark import make_event, make_querystring
+from tools.cloudfront_function import CloudFrontFunction, render_function
+from tools.load_benchmark import Connection, same_location
+
+LOG = logging.getLogger(__name__)
+
+REDIRECT_STATUSES = frozenset([301, 302, 303, 307, 308])
+DEFAULT_STATUS = 301
+DEFAULT_MAX_HOPS = 10
+DEFAULT_TIMEOUT = 10.0
+
+CSV_FIELDS = ["source", "expected_location", "expected_status"]
+
+
+def load_rows(fp, default_status=DEFAULT_STATUS):
+    """
+    Read ``source,expected_location[,expected_status]`` rows.
+
+    :param fp: Open text file.
+    :return: List of dictionaries with the keys of :data:`CSV_FIELDS`.
+    :raises ValueError: On a row without an expected location or with a
+        status that is not a number.
+    """
+    rows = []
+    for number, row in enumerate(csv.reader(fp), 1):
+        if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+            continue
+        if not rows and row[0].strip().lower() == "source":
+            continue
+        if len(row) < 2 or not row[1].strip():
+            raise ValueError(f"Line {number}: expected source,expected_location")
+        status = row[2].strip() if len(row) > 2 and row[2].strip() else None
+        if status is not None and not status.isdigit():
+            raise ValueError(f"Line {number}: invalid status {status!r}")
+        rows.append(
+            {
+                "source": row[0].strip(),
+                "expected_location": row[1].strip(),
+                "expected_status": int(status) if status else default_status,
+            }
+        )
+    return rows
+
+
+class HostPool:
+    """
+    Keep-alive connections and a request rate limit per host.
+
+    :param rate: Requests per second per host, or ``None`` for no limit.
+    """
+
+    def __init__(self, rate=None, ssl_context=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.ssl_context = ssl_context
+        self.idle = defaultdict(list)
+        self.next_slot = defaultdict(float)
+
+    async def _throttle(self, origin):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.next_slot[origin])
+        self.next_slot[origin] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def request(self, method, url):
+        """
+        Send one request to ``url`` and return ``(status, headers)``.
+
+        A pooled connection the server has closed meanwhile is replaced by
+        a new one once.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        await self._throttle(origin)
+        while True:
+            reused = bool(self.idle[origin])
+            if reused:
+                connection = self.idle[origin].pop()
+            else:
+                connection = await Connection.open(origin, self.ssl_context)
+            try:
+                status, headers = await connection.request(method, target)
+            except (OSError, asyncio.IncompleteReadError):
+                await connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                await connection.close()
+                raise
+            break
+        keep_alive = headers.get("connection", "").lower() != "close" and (
+            "content-length" in headers or "transfer-encoding" in headers
+        )
+        if keep_alive:
+            self.idle[origin].append(connection)
+        else:
+            await connection.close()
+        return status, headers
+
+    async def close(self):
+        for connections in self.idle.values():
+            for connection in connections:
+                await connection.close()
+        self.idle.clear()
+
+
+async def check_row(
+    pool,
+    row,
+    method="GET",
+    follow=True,
+    max_hops=DEFAULT_MAX_HOPS,
+    timeout=DEFAULT_TIMEOUT,
+):
+    """
+    Check one row; see the module documentation for the rules.
+
+    :param pool: :class:`HostPool` to send requests through.
+    :param row: Dictionary as returned by :func:`load_rows`.
+    :param follow: Follow the redirect to count the hops; ``False`` only
+        checks the first response.
+    :return: The row plus ``status``, ``location`` (of the first response),
+        ``hops``, ``chain`` (every ``Location``) and ``problems``, a list
+        that is empty when the row passed; ``server_timing`` too when the
+        first response has that header.
+    """
+    result = dict(row, status=None, location=None, hops=0, chain=[], problems=[])
+    url = row["source"]
+    try:
+        while True:
+            status, headers = await asyncio.wait_for(pool.request(method, url), timeout)
+            if result["status"] is None:
+                result["status"] = status
+                if "server-timing" in headers:
+                    result["server_timing"] = headers["server-timing"]
+            if status not in REDIRECT_STATUSES or "location" not in headers:
+                break
+            location = urljoin(url, headers["location"])
+            if result["location"] is None:
+                result["location"] = location
+            result["hops"] += 1
+            if location in result["chain"] or location == row["source"]:
+                result["problems"].append("loop")
+                result["chain"].append(location)
+                break
+            result["chain"].append(location)
+            if not follow or result["hops"] > max_hops:
+                break
+            url = location
+    except (
+        OSError,
+        ValueError,
+        IndexError,
+        ssl.SSLError,
+        asyncio.IncompleteReadError,
+        asyncio.TimeoutError,
+    ) as error:
+        result["problems"].append(f"error: {type(error).__name__}: {error}")
+        LOG.debug("%s failed at %s: %r", row["source"], url, error)
+        return result
+
+    if result["status"] != row["expected_status"]:
+        result["problems"].append("status")
+    if not same_location(result["location"], row["expected_location"]):
+        result["problems"].append("location")
+    if result["hops"] > 1:
+        result["problems"].append("chain")
+    return result
+
+
+async def verify(
+    rows,
+    concurrency=20,
+    rate=None,
+    method="GET",
+    follow=True,
+    max_hops=DEFAULT_MAX_HOPS,
+    timeout=DEFAULT_TIMEOUT,
+    ssl_context=None,
+):
+    """
+    Check many rows concurrently.
+
+    :param concurrency: Rows checked at the same time.
+    :param rate: Requests per second per host, see :class:`HostPool`.
+    :return: Results of :func:`check_row`, in the order of ``rows``.
+    """
+    pool = HostPool(rate=rate, ssl_context=ssl_context)
+    results = [None] * len(rows)
+    pending = iter(enumerate(rows))
+
+    async def worker():
+        for index, row in pending:
+            results[index] = await check_row(
+                pool,
+                row,
+                method=method,
+                follow=follow,
+                max_hops=max_hops,
+                timeout=timeout,
+            )
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await pool.close()
+    return results
+
+
+def summarize(results):
+    """Count rows by outcome: ``passed`` and one key per problem kind."""
+    counts = Counter()
+    for result in results:
+        if not result["problems"]:
+            counts["passed"] += 1
+        for problem in result["problems"]:
+            counts[problem.split(":", 1)[0]] += 1
+    counts["rows"] = len(results)
+    return dict(counts)
+
+
+def expected_redirect(function, url, method="GET"):
+    """
+    ``(location, status)`` the module's function returns for ``url``.
+
+    :param function: :class:`tools.cloudfront_function.CloudFrontFunction`.
+    :param url: Source URL; its host selects ``host_redirects`` targets.
+    """
+    parts = urlsplit(url)
+    pairs = [param.partition("=")[::2] for param in parts.query.split("&") if param]
+    event = make_event(
+        parts.path or "/",
+        make_querystring(pairs),
+        method=method,
+        host=parts.hostname,
+    )
+    response = function.invoke(event)
+    return response["headers"]["location"]["value"], response["statusCode"]
+
+
+def generate(sources, config, method="GET"):
+    """
+    Build rows for ``sources`` from the module configuration.
+
+    :param sources: Iterable of source URLs.
+    :param config: Keyword arguments of
+        :func:`tools.cloudfront_function.template_variables`.
+    :return: List of rows, as :func:`load_rows` returns.
+    """
+    function = CloudFrontFunction(render_function(**config))
+    rows = []
+    for source in sources:
+        location, status = expected_redirect(function, source, method)
+        rows.append(
+            {
+                "source": source,
+                "expected_location": location,
+                "expected_status": status,
+            }
+        )
+    return rows
+
+
+def read_sources(fp):
+    """Source URLs from a file: one per line, or the first CSV column."""
+    for row in csv.reader(fp):
+        if row and row[0].strip() and not row[0].lstrip().startswith("#"):
+            if row[0].strip().lower() != "source":
+                yield row[0].strip()
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.redirect_verifier",
+        description="Verify that old URLs redirect to the expected URLs in one hop.",
+    )
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+
+    check = subparsers.add_parser("check", help="check source,expected rows")
+    check.add_argument("input", help="CSV of source,expected_location,expected_status")
+    check.add_argument("--concurrency", type=int, default=20)
+    check.add_argument(
+        "--rate", type=float, help="Requests per second per host (no limit)"
+    )
+    check.add_argument("--method", default="GET")
+    check.add_argument(
+        "--no-follow",
+        dest="follow",
+        action="store_false",
+        help="Only check the first response; do not count hops",
+    )
+    check.add_argument("--max-hops", type=int, default=DEFAULT_MAX_HOPS)
+    check.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    check.add_argument(
+        "-o", "--output", help="Write JSON Lines here instead of standard output"
+    )
+
+    gen = subparsers.add_parser("generate", help="generate expected rows")
+    gen.add_argument("input", help="Source URLs, one per line or first CSV column")
+    gen.add_argument(
+        "--config", required=True, help="JSON file with the module configuration"
+    )
+    gen.add_argument("--method", default="GET")
+    gen.add_argument("-o", "--output", help="Write CSV here instead of standard output")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    output = (
+        open(args.output, "w", encoding="utf-8", newline="") if args.output else None
+    )
+    out = output or sys.stdout
+    try:
+        if args.scenario == "generate":
+            with open(args.config, encoding="utf-8") as fp:
+                config = json.load(fp)
+            with open(args.input, encoding="utf-8", newline="") as fp:
+                rows = generate(read_sources(fp), config, method=args.method)
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+            LOG.info("Generated %d rows", len(rows))
+            return 0
+
+        with open(args.input, encoding="utf-8", newline="") as fp:
+            rows = load_rows(fp)
+        results = asyncio.run(
+            verify(
+                rows,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                method=args.method,
+                follow=args.follow,
+                max_hops=args.max_hops,
+                timeout=args.timeout,
+            )
+        )
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+    finally:
+        if output:
+            output.close()
+
+    summary = summarize(results)
+    LOG.info("%s", json.dumps(summary, sort_keys=True))
+    return 0 if summary.get("passed", 0) == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Aggregate redirect ``Server-Timing`` headers into latency breakdowns.
+
+With ``diagnostics_headers``, redirect responses carry a ``Server-Timing``
+header:
+
+- S3 website redirects get CloudFront's own metrics from the response
+  headers policy: ``cdn-cache-hit`` or ``cdn-cache-miss``, origin times on
+  misses (``cdn-upstream-dns``, ``cdn-upstream-connect``,
+  ``cdn-upstream-fbl``), the edge location ``cdn-pop`` and the request ID
+  ``cdn-rid``
+- CloudFront Function redirects get the function's: ``edge;dur=`` (run
+  time), ``redirect;desc=function``, ``match;desc=`` (``map``, ``kvs``,
+  ``rule``, ``host``, ``kvs-host`` or ``default``), ``geo;desc=`` (the
+  viewer country, when it picked a ``geo_redirects`` host) and ``rid``
+
+Input is JSON Lines with a ``server_timing`` field and, optionally, the
+client-side ``latency_ms``, as written by ``tools.load_benchmark run
+--record`` and ``tools.redirect_verifier check``. Responses are grouped by
+redirect mode and match (or ``--by``), and each group reports the number of
+responses, the cache hit ratio and the p50, p90 and p99 of the client
+latency, the edge (function) time and the origin first-byte time.
+
+Usage::
+
+    python -m tools.load_benchmark run https://old.example.com --record responses.jsonl
+    python -m tools.server_timing responses.jsonl
+    python -m tools.server_timing responses.jsonl results.jsonl --by mode pop --json
+    python -m tools.server_timing responses.jsonl --by geo
+"""
+
+import json
+import logging
+import re
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict, namedtuple
+
+from tools.load_benchmark import PERCENTILES, percentiles
+
+LOG = logging.getLogger(__name__)
+
+Metric = namedtuple("Metric", ["name", "dur", "desc"])
+
+GROUP_FIELDS = ("mode", "match", "geo", "cache", "pop")
+DEFAULT_GROUP_BY = ("mode", "match")
+
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+_QUOTED = re.compile(r'"((?:[^"\\]|\\.)*)"')
+_SPACE = re.compile(r"[ \t]*")
+
+
+def _value(text, position):
+    """Token or quoted string at ``position``; ``(value, next position)``."""
+    match = _QUOTED.match(text, position)
+    if match:
+        return re.sub(r"\\(.)", r"\1", match.group(1)), match.end()
+    match = _TOKEN.match(text, position)
+    if match:
+        return match.group(0), match.end()
+    return "", position
+
+
+def parse(value):
+    """
+    Parse a ``Server-Timing`` header value.
+
+    Several header lines may be joined with commas. Malformed parts are
+    skipped up to the next comma, and parameters other than ``dur`` and
+    ``desc`` are ignored.
+
+    :return: List of :class:`Metric`; ``dur`` is a float or ``None``.
+    """
+    metrics = []
+    position = 0
+    while position < len(value):
+        position = _SPACE.match(value, position).end()
+        name = _TOKEN.match(value, position)
+        if not name:
+            comma = value.find(",", position)
+            position = len(value) if comma < 0 else comma + 1
+            continue
+        position = name.end()
+        params = {}
+        while True:
+            position = _SPACE.match(value, position).end()
+            if not value.startswith(";", position):
+                break
+            position = _SPACE.match(value, position + 1).end()
+            param = _TOKEN.match(value, position)
+            if not param:
+                break
+            position = _SPACE.match(value, param.end()).end()
+            param_value = ""
+            if value.startswith("=", position):
+                position = _SPACE.match(value, position + 1).end()
+                param_value, position = _value(value, position)
+            params.setdefault(param.group(0).lower(), param_value)
+        try:
+            dur = float(params["dur"]) if "dur" in params else None
+        except ValueError:
+            dur = None
+        metrics.append(Metric(name.group(0), dur, params.get("desc")))
+        comma = value.find(",", position)
+        position = len(value) if comma < 0 else comma + 1
+    return metrics
+
+
+def describe(value):
+    """
+    Interpret the ``Server-Timing`` value of one redirect response.
+
+    :return: Dictionary with ``mode`` (``function``, ``s3``, or ``None``
+        without diagnostics), ``match``, ``geo``, ``cache`` (``hit``,
+        ``miss`` or ``None``), ``edge_ms``, ``origin_ms``, ``pop`` and
+        ``request_id``.
+    """
+    metrics = {}
+    for metric in parse(value or ""):
+        metrics.setdefault(metric.name.lower(), metric)
+    result = {
+        "mode": None,
+        "match": None,
+        "geo": None,
+        "cache": None,
+        "edge_ms": None,
+        "origin_ms": None,
+        "pop": None,
+        "request_id": None,
+    }
+    if "redirect" in metrics:
+        result["mode"] = metrics["redirect"].desc
+    elif any(name.startswith("cdn-") for name in metrics):
+        # S3 website redirects carry CloudFront's metrics only
+        result["mode"] = "s3"
+    if "match" in metrics:
+        result["match"] = metrics["match"].desc
+    if "geo" in metrics:
+        result["geo"] = metrics["geo"].desc
+    if "cdn-cache-hit" in metrics:
+        result["cache"] = "hit"
+    elif "cdn-cache-miss" in metrics:
+        result["cache"] = "miss"
+    if "edge" in metrics:
+        result["edge_ms"] = metrics["edge"].dur
+    if "cdn-upstream-fbl" in metrics:
+        result["origin_ms"] = metrics["cdn-upstream-fbl"].dur
+    if "cdn-pop" in metrics:
+        result["pop"] = metrics["cdn-pop"].desc
+    for name in ("rid", "cdn-rid"):
+        if name in metrics:
+            result["request_id"] = metrics[name].desc
+            break
+    return result
+
+
+def _ms_percentiles(values):
+    # tools.load_benchmark.percentiles takes seconds
+    return percentiles([value / 1000 for value in values])
+
+
+def aggregate(records, group_by=DEFAULT_GROUP_BY):
+    """
+    Group responses and compute their latency breakdown.
+
+    :param records: Dictionaries with ``server_timing`` and optionally
+        ``latency_ms`` (client-side, in milliseconds).
+    :param group_by: Fields of :func:`describe` to group by, see
+        :data:`GROUP_FIELDS`.
+    :return: List of dictionaries, one per group in key order: the group
+        fields, ``responses``, ``cache_hit_ratio`` (``None`` without cache
+        metrics) and :func:`~tools.load_benchmark.percentiles` of
+        ``latency_ms``, ``edge_ms`` and ``origin_ms``.
+    """
+    groups = defaultdict(
+        lambda: {
+            "responses": 0,
+            "hits": 0,
+            "cached": 0,
+            "latency_ms": [],
+            "edge_ms": [],
+            "origin_ms": [],
+        }
+    )
+    for record in records:
+        described = describe(record.get("server_timing"))
+        key = tuple(described[field] or "-" for field in group_by)
+        group = groups[key]
+        group["responses"] += 1
+        if described["cache"] is not None:
+            group["cached"] += 1
+            group["hits"] += described["cache"] == "hit"
+        if record.get("latency_ms") is not None:
+            group["latency_ms"].append(record["latency_ms"])
+        for field in ("edge_ms", "origin_ms"):
+            if described[field] is not None:
+                group[field].append(described[field])
+
+    result = []
+    for key in sorted(groups):
+        group = groups[key]
+        entry = dict(zip(group_by, key))
+        entry["responses"] = group["responses"]
+        entry["cache_hit_ratio"] = (
+            round(group["hits"] / group["cached"], 4) if group["cached"] else None
+        )
+        for field in ("latency_ms", "edge_ms", "origin_ms"):
+            entry[field] = _ms_percentiles(group[field])
+        result.append(entry)
+    return result
+
+
+def read_records(paths):
+    """Records of JSON Lines files; lines that are not JSON objects are skipped."""
+    for path in paths:
+        with open(path, encoding="utf-8") as fp:
+            for number, line in enumerate(fp, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    LOG.warning("%s:%d: not JSON, skipped", path, number)
+                    continue
+                if isinstance(record, dict):
+                    yield record
+
+
+def _format_percentiles(values):
+    return "  ".join(
+        f"{values[f'p{p}']:>8}" if values[f"p{p}"] is not None else f"{'-':>8}"
+        for p in PERCENTILES
+    )
+
+
+def print_breakdown(breakdown, group_by):
+    columns = "  ".join(f"{f'p{p}':>8}" for p in PERCENTILES)
+    width = max(
+        [len(" ".join(group_by))]
+        + [len(" ".join(entry[field] for field in group_by)) for entry in breakdown]
+    )
+    print(
+        f"{' '.join(group_by):<{width}}  {'responses':>9}  {'hit %':>6}  "
+        f"{'':<10}{columns}"
+    )
+    for entry in breakdown:
+        name = " ".join(entry[field] for field in group_by)
+        ratio = entry["cache_hit_ratio"]
+        hits = f"{ratio * 100:.1f}" if ratio is not None else "-"
+        for index, field in enumerate(("latency_ms", "edge_ms", "origin_ms")):
+            if index == 0:
+                prefix = f"{name:<{width}}  {entry['responses']:>9}  {hits:>6}  "
+            else:
+                prefix = " " * (width + 21)
+            print(f"{prefix}{field:<10}{_format_percentiles(entry[field])}")
+
+
+def main(argv=None):
+    parser = ArgumentParser(
+        prog="python -m tools.server_timing",
+        description="Aggregate redirect Server-Timing headers into latency "
+        "breakdowns.",
+    )
+    parser.add_argument(
+        "records",
+        nargs="+",
+        help="JSON Lines with server_timing (and latency_ms) fields",
+    )
+    parser.add_argument(
+        "--by",
+        nargs="+",
+        choices=GROUP_FIELDS,
+        default=list(DEFAULT_GROUP_BY),
+        help="Fields to group responses by (mode match)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    breakdown = aggregate(read_records(args.records), args.by)
+    if not breakdown:
+        LOG.error("No records in %s", ", ".join(args.records))
+        return 1
+    if args.json:
+        print(json.dumps(breakdown, indent=2))
+    else:
+        print_breakdown(breakdown, args.by)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Render Terraform ``templatefile()`` templates in Python.
+
+Supports the subset of the Terraform template language used by
+``templates/*.tftpl``:
+
+- ``${name}`` and ``${name.attribute}`` interpolation
+- ``%{ if name }``, ``%{ if !name }``, ``%{ else }`` and ``%{ endif }``
+- ``%{ for value in name }`` and ``%{ for key, value in name }``
+  (maps are iterated in lexical key order, like Terraform)
+- ``~`` strip markers on either side of a sequence
+
+Anything else raises :class:`TemplateError`, so an unsupported construct
+in a template is caught instead of silently rendered differently.
+"""
+
+import re
+
+_SEQUENCE = re.compile(r"(\$\{|%\{)(~?)(.*?)(~?)\}", re.S)
+_REFERENCE = re.compile(r"^(!?)([A-Za-z_]\w*)((?:\.[A-Za-z_]\w*)*)$")
+_FOR = re.compile(r"^for\s+(\w+)(?:\s*,\s*(\w+))?\s+in\s+(.+)$", re.S)
+
+
+class TemplateError(ValueError):
+    """Unsupported or malformed template construct."""
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    for match in _SEQUENCE.finditer(text):
+        tokens.append(["text", text[position : match.start()]])
+        kind = "interpolation" if match.group(1) == "${" else "directive"
+        tokens.append([kind, match.group(3).strip()])
+        if match.group(2):
+            tokens[-2][1] = tokens[-2][1].rstrip()
+        if match.group(4):
+            tokens.append(["strip", None])
+        position = match.end()
+    tokens.append(["text", text[position:]])
+
+    # Apply right-hand strip markers to the following literal
+    result = []
+    strip_next = False
+    for kind, value in tokens:
+        if kind == "strip":
+            strip_next = True
+            continue
+        if kind == "text" and strip_next:
+            value = value.lstrip()
+        strip_next = False
+        result.append((kind, value))
+    return result
+
+
+def _resolve(expression, variables):
+    match = _REFERENCE.match(expression)
+    if not match:
+        raise TemplateError(f"Unsupported expression: {expression!r}")
+    negate, name, attributes = match.groups()
+    try:
+        value = variables[name]
+        for attribute in filter(None, attributes.split(".")):
+            value = value[attribute]
+    except (KeyError, TypeError) as err:
+        raise TemplateError(f"Unknown variable: {expression!r}") from err
+    return (not value) if negate else value
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    raise TemplateError(f"Cannot interpolate {type(value).__name__}: {value!r}")
+
+
+def _parse(tokens, position, terminators):
+    """Build a node list until one of ``terminators`` directives."""
+    nodes = []
+    while position < len(tokens):
+        kind, value = tokens[position]
+        if kind == "directive":
+            keyword = value.split(None, 1)[0]
+            if keyword in terminators:
+                return nodes, position
+            if keyword == "if":
+                then, position = _parse(tokens, position + 1, ("else", "endif"))
+                otherwise = []
+                if tokens[position][1] == "else":
+                    otherwise, position = _parse(tokens, position + 1, ("endif",))
+                nodes.append(("if", value[2:].strip(), then, otherwise))
+            elif keyword == "for":
+                match = _FOR.match(value)
+                if not match:
+                    raise TemplateError(f"Malformed for directive: {value!r}")
+                body, position = _parse(tokens, position + 1, ("endfor",))
+                nodes.append(("for", match.groups(), body))
+            else:
+                raise TemplateError(f"Unexpected directive: {value!r}")
+        else:
+            nodes.append((kind, value))
+        position += 1
+    if terminators:
+        raise TemplateError(f"Missing {' or '.join(terminators)}")
+    return nodes, position
+
+
+def _evaluate(nodes, variables, output):
+    for node in nodes:
+        kind = node[0]
+        if kind == "text":
+            output.append(node[1])
+        elif kind == "interpolation":
+            output.append(_format(_resolve(node[1], variables)))
+        elif kind == "if":
+            branch = node[2] if _resolve(node[1], variables) else node[3]
+            _evaluate(branch, variables, output)
+        elif kind == "for":
+            (first, second, collection), body = node[1], node[2]
+            values = _resolve(collection.strip(), variables)
+            if isinstance(values, dict):
+                items = sorted(values.items())
+            else:
+                items = list(enumerate(values))
+            for key, value in items:
+                scope = dict(variables)
+                if second:
+                    scope[first], scope[second] = key, value
+                else:
+                    scope[first] = value
+                _evaluate(body, scope, output)
+
+
+def render(text, variables):
+    """
+    Render template ``text`` with ``variables``.
+
+    :param text: Template source.
+    :param variables: Dictionary of template variables, as passed to
+        ``templatefile()``.
+    :return: Rendered string.
+    :raises TemplateError: On unsupported syntax or unknown variables.
+    """
+    nodes, _ = _parse(_tokenize(text), 0, ())
+    output = []
+    _evaluate(nodes, variables, output)
+    return "".join(output)
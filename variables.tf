@@ -31,7 +31,8 @@ variable "redirect_to" {
 
     Note: Query parameters in redirect_to are not supported due to S3 routing
     rule limitations. Source query parameters will be preserved in redirects.
-    Do not include protocol (https://).
+    Do not include protocol (https://). Trailing slashes of the path are
+    dropped, since the request path that is appended starts with one.
   EOT
   type        = string
 
@@ -49,6 +50,223 @@ variable "redirect_to" {
   }
 }
 
+variable "host_redirects" {
+  description = <<-EOT
+    Per-host targets: hostname prefix (like redirect_hostnames, '' for the apex)
+    => target in the redirect_to format ('example.com' or 'example.com/path').
+    Requests for these hosts go to their target instead of redirect_to; the
+    request path and query string are appended the same way (trailing slashes
+    of the target path are dropped first). Hosts not already
+    in redirect_hostnames are added to the distribution(s).
+
+    Only subdomains of the zone_id zone are supported: keys are single-label
+    prefixes, and DNS and certificate validation records are created in that
+    one zone. Domains in other zones need a module instance per zone.
+
+    Note: When set to a non-empty map, a CloudFront Function is deployed and
+    dispatches on the Host header. The map is compiled into the function code
+    (10 KB limit, checked at plan time, about 200 short entries). For large
+    host lists, put the prefixes in redirect_hostnames and their targets in
+    the KeyValueStore as host keys (create_key_value_store).
+  EOT
+  type        = map(string)
+  default     = {}
+
+  validation {
+    condition = alltrue([
+      for hostname, target in var.host_redirects :
+      can(regex("^([a-z0-9]([a-z0-9-]*[a-z0-9])?)?$", hostname)) && can(regex(
+        "^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*(/[^?#]*)?$",
+        target
+      ))
+    ])
+    error_message = <<-EOT
+      host_redirects keys must be hostname prefixes (lowercase letters, numbers
+      and hyphens, '' for the apex). Values must be a hostname optionally
+      followed by a path, without protocol or query string.
+      Example: { "shop" = "store.example.com", "docs" = "example.com/docs" }
+    EOT
+  }
+}
+
+variable "geo_redirects" {
+  description = <<-EOT
+    Regional target hosts, chosen by the viewer's location:
+    - countries: ISO 3166-1 alpha-2 country code (CloudFront-Viewer-Country)
+      => hostname
+    - continents: continent code (AF, AN, AS, EU, NA, OC or SA) => hostname,
+      for the countries of that continent (templates/country-continents.json)
+      without their own entry
+
+    The host replaces the redirect_to hostname, also for redirect_map and
+    redirect_rules targets that are paths; viewers from other countries keep
+    redirect_to. Targets with their own hostname (host_redirects, "host/path"
+    entries) are not changed.
+
+    Note: When set, a CloudFront Function is deployed and the cache policy
+    includes the CloudFront-Viewer-Country header, which CloudFront only
+    passes to the function when the cache policy has it. With
+    cache_policy_id, the supplied policy must include it (modules/redirect-policies
+    cache_key_headers).
+  EOT
+  type = object({
+    countries  = optional(map(string), {})
+    continents = optional(map(string), {})
+  })
+  default = {}
+
+  validation {
+    condition = alltrue(concat(
+      [
+        for country, hostname in var.geo_redirects.countries :
+        can(regex("^[A-Z]{2}$", country))
+      ],
+      [
+        for continent, hostname in var.geo_redirects.continents :
+        contains(["AF", "AN", "AS", "EU", "NA", "OC", "SA"], continent)
+      ],
+      [
+        for hostname in concat(values(var.geo_redirects.countries), values(var.geo_redirects.continents)) :
+        can(regex("^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$", hostname))
+      ],
+    ))
+    error_message = <<-EOT
+      geo_redirects countries keys must be uppercase ISO 3166-1 alpha-2 codes
+      (e.g. "DE"), continents keys one of AF, AN, AS, EU, NA, OC or SA. Values
+      must be hostnames, without protocol, path or query string.
+      Example: { continents = { "EU" = "eu.example.com" }, countries = { "MX" = "us.example.com" } }
+    EOT
+  }
+}
+
+variable "weighted_targets" {
+  description = <<-EOT
+    Split redirected traffic across target hosts by weight. Each viewer gets
+    the host of its share, which replaces the redirect_to hostname like
+    geo_redirects (viewers with a geo_redirects host keep it). The share
+    comes from a stable hash of weighted_target_cookie or, without it, the
+    viewer's IP address, so a viewer keeps landing on the same host while
+    the list does not change. Weights are relative; a weight of 0 drains a
+    host.
+
+    Note: When set, a CloudFront Function is deployed. Browsers cache
+    permanent redirects; use permanent_redirect = false or a short
+    permanent_redirect_cache_control while the split may still change.
+  EOT
+  type = list(object({
+    host   = string
+    weight = number
+  }))
+  default = []
+
+  validation {
+    condition = alltrue([
+      for target in var.weighted_targets :
+      target.weight >= 0 && floor(target.weight) == target.weight && can(regex(
+        "^[a-z0-9]([a-z0-9-]*[a-z0-9])?(\\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*$",
+        target.host
+      ))
+    ])
+    error_message = <<-EOT
+      weighted_targets hosts must be hostnames, without protocol, path or query
+      string, and weights whole numbers of at least 0.
+    EOT
+  }
+
+  validation {
+    condition = length(var.weighted_targets) == 0 || (
+      length(var.weighted_targets) <= 10 &&
+      sum(concat([0], [for target in var.weighted_targets : target.weight])) > 0
+    )
+    error_message = <<-EOT
+      weighted_targets can have at most 10 hosts, and at least one with a weight above 0.
+    EOT
+  }
+}
+
+variable "weighted_target_cookie" {
+  description = <<-EOT
+    Name of a cookie whose value selects the viewer's weighted_targets host,
+    e.g. a session or visitor ID, so a viewer keeps its host when its IP
+    address changes. Viewers without the cookie are split by IP address.
+  EOT
+  type        = string
+  default     = null
+
+  validation {
+    condition = (
+      var.weighted_target_cookie == null ||
+      can(regex("^[!#$%&'*+\\-.^_`|~0-9A-Za-z]+$", var.weighted_target_cookie))
+    )
+    error_message = "weighted_target_cookie must be a valid cookie name."
+  }
+}
+
+variable "target_canonicalization" {
+  description = <<-EOT
+    Rewrite the path of redirect targets into the form the destination site
+    serves, so it does not redirect the viewer again:
+    - trailing_slash: "keep" (default), "add" (except to paths whose last
+      segment has a file extension) or "remove" (except from "/")
+    - collapse_slashes: replace runs of "/" with one
+    - lowercase: lowercase the path
+    - index_files: last path segments to drop, e.g. ["index.html"]
+
+    Applied in that order (index files before the trailing-slash policy) to
+    every target, after the request path is appended; the query string is not
+    changed. Trailing slashes of the redirect_to and host_redirects paths are
+    always dropped before the request path is appended, and runs of "/" in
+    configured targets are collapsed, in both S3 and function mode.
+
+    Note: Any option other than the defaults deploys a CloudFront Function;
+    S3 routing rules cannot rewrite paths.
+  EOT
+  type = object({
+    trailing_slash   = optional(string, "keep")
+    collapse_slashes = optional(bool, false)
+    lowercase        = optional(bool, false)
+    index_files      = optional(list(string), [])
+  })
+  default = {}
+
+  validation {
+    condition     = contains(["keep", "add", "remove"], var.target_canonicalization.trailing_slash)
+    error_message = "target_canonicalization.trailing_slash must be one of: keep, add, or remove."
+  }
+
+  validation {
+    condition = alltrue([
+      for name in var.target_canonicalization.index_files :
+      can(regex("^[^/?#*]+$", name))
+    ])
+    error_message = <<-EOT
+      target_canonicalization.index_files must be file names, e.g. "index.html",
+      without "/", "?", "#" or "*".
+    EOT
+  }
+}
+
+variable "hosts_per_distribution" {
+  description = <<-EOT
+    Most hostnames served by one CloudFront distribution and its ACM certificate.
+    Hostnames (redirect_hostnames, then host_redirects) are packed in order into
+    as few distributions as this allows. The default is the ACM quota of 10
+    names per certificate; accounts with a raised ACM quota can set up to 100,
+    the CloudFront alias quota per distribution.
+  EOT
+  type        = number
+  default     = 10
+
+  validation {
+    condition = (
+      var.hosts_per_distribution >= 1 &&
+      var.hosts_per_distribution <= 100 &&
+      floor(var.hosts_per_distribution) == var.hosts_per_distribution
+    )
+    error_message = "hosts_per_distribution must be a whole number between 1 and 100."
+  }
+}
+
 variable "zone_id" {
   description = "Route53 hosted zone ID where DNS records will be created"
   type        = string
@@ -95,12 +313,59 @@ variable "create_logging_bucket" {
   default     = true
 }
 
+variable "cloudfront_logging_bucket_name" {
+  description = <<-EOT
+    Name of an existing S3 bucket to write CloudFront access logs to, instead of
+    creating one per instance. Give each instance sharing the bucket its own
+    cloudfront_logging_prefix. The bucket must have ACLs enabled (object ownership
+    BucketOwnerPreferred) for legacy logs, and its policy must include the
+    cloudfront_logs_bucket_policy_json output of each instance. When set, no
+    bucket is created and logging is enabled regardless of create_logging_bucket.
+  EOT
+  type        = string
+  default     = null
+
+  validation {
+    condition = (
+      var.cloudfront_logging_bucket_name == null ||
+      can(regex("^[a-z0-9][a-z0-9.-]{1,61}[a-z0-9]$", var.cloudfront_logging_bucket_name))
+    )
+    error_message = "cloudfront_logging_bucket_name must be a valid S3 bucket name (not an ARN or URL)."
+  }
+}
+
 variable "cloudfront_logging_prefix" {
   description = "Prefix for CloudFront log files in the logging bucket"
   type        = string
   default     = "cloudfront-logs/"
 }
 
+variable "cloudfront_logging_format" {
+  description = <<-EOT
+    Format of CloudFront access logs in the logging bucket.
+    "legacy" writes tab-separated gzip files under cloudfront_logging_prefix.
+    "parquet" uses standard logging v2 to deliver Parquet files partitioned by hour:
+    <prefix>/year=YYYY/month=MM/day=DD/hour=HH/.
+  EOT
+  type        = string
+  default     = "legacy"
+
+  validation {
+    condition     = contains(["legacy", "parquet"], var.cloudfront_logging_format)
+    error_message = "cloudfront_logging_format must be \"legacy\" or \"parquet\"."
+  }
+}
+
+variable "create_log_table" {
+  description = <<-EOT
+    Create a Glue Data Catalog database and table over the Parquet access logs, with
+    partition projection so Athena queries only read the hours they ask for.
+    Requires cloudfront_logging_format = "parquet".
+  EOT
+  type        = bool
+  default     = false
+}
+
 variable "cloudfront_logging_include_cookies" {
   description = "Include cookies in CloudFront logs"
   type        = bool
@@ -201,8 +466,13 @@ variable "permanent_redirect" {
 
     - true (default): Permanent redirect. Browsers cache it. Best for SEO
       and domain migrations. GET/HEAD return 301, other methods return 308.
-    - false: Temporary redirect. Not cached by browsers. Good for maintenance
-      or A/B testing. GET/HEAD return 302, other methods return 307.
+    - false: Temporary redirect. Browsers revalidate it on every visit.
+      Good for maintenance or A/B testing. GET/HEAD return 302, other
+      methods return 307.
+
+    Caching of each kind is set by permanent_redirect_ttl /
+    permanent_redirect_cache_control and temporary_redirect_ttl /
+    temporary_redirect_cache_control.
 
     | permanent_redirect | GET/HEAD | POST/PUT/DELETE/PATCH |
     |--------------------|----------|----------------------|
@@ -213,6 +483,93 @@ variable "permanent_redirect" {
   default     = true
 }
 
+variable "permanent_redirect_ttl" {
+  description = <<-EOT
+    Seconds a permanent (301/308) redirect is cached. Used as the CloudFront
+    cache policy default TTL (edge caching in S3 mode) and, unless
+    permanent_redirect_cache_control is set, as the browser max-age.
+  EOT
+  type        = number
+  default     = 86400
+
+  validation {
+    condition = (
+      var.permanent_redirect_ttl >= 0 &&
+      var.permanent_redirect_ttl <= 31536000 &&
+      floor(var.permanent_redirect_ttl) == var.permanent_redirect_ttl
+    )
+    error_message = <<-EOT
+      permanent_redirect_ttl must be a whole number of seconds between 0 and 31536000 (one year).
+    EOT
+  }
+}
+
+variable "permanent_redirect_cache_control" {
+  description = <<-EOT
+    Cache-Control header of permanent (301/308) redirects, in both S3 and
+    CloudFront Function mode. For example "public, max-age=31536000,
+    immutable" so repeat visitors never reach the edge again.
+    Default (null): "max-age=<permanent_redirect_ttl>", or "no-store" when
+    the TTL is 0.
+  EOT
+  type        = string
+  default     = null
+
+  validation {
+    condition = (
+      var.permanent_redirect_cache_control == null ||
+      can(regex("^[^\r\n]+$", var.permanent_redirect_cache_control))
+    )
+    error_message = <<-EOT
+      permanent_redirect_cache_control must be a non-empty single-line header value.
+    EOT
+  }
+}
+
+variable "temporary_redirect_ttl" {
+  description = <<-EOT
+    Seconds a temporary (302/307) redirect is cached. Used as the CloudFront
+    cache policy default TTL (edge caching in S3 mode) and, when
+    temporary_redirect_cache_control is null, as the browser max-age.
+  EOT
+  type        = number
+  default     = 86400
+
+  validation {
+    condition = (
+      var.temporary_redirect_ttl >= 0 &&
+      var.temporary_redirect_ttl <= 31536000 &&
+      floor(var.temporary_redirect_ttl) == var.temporary_redirect_ttl
+    )
+    error_message = <<-EOT
+      temporary_redirect_ttl must be a whole number of seconds between 0 and 31536000 (one year).
+    EOT
+  }
+}
+
+variable "temporary_redirect_cache_control" {
+  description = <<-EOT
+    Cache-Control header of temporary (302/307) redirects, in both S3 and
+    CloudFront Function mode. The default "no-cache" makes browsers
+    revalidate on every visit, so a changed target takes effect once the
+    edge cache (temporary_redirect_ttl) expires. Use "no-store" to keep
+    redirects out of browser caches entirely, or null for
+    "max-age=<temporary_redirect_ttl>".
+  EOT
+  type        = string
+  default     = "no-cache"
+
+  validation {
+    condition = (
+      var.temporary_redirect_cache_control == null ||
+      can(regex("^[^\r\n]+$", var.temporary_redirect_cache_control))
+    )
+    error_message = <<-EOT
+      temporary_redirect_cache_control must be a non-empty single-line header value.
+    EOT
+  }
+}
+
 variable "response_headers" {
   description = <<-EOT
     Additional HTTP headers to include in redirect responses. Each key is a
@@ -239,6 +596,335 @@ variable "response_headers" {
   }
 }
 
+variable "redirect_map" {
+  description = <<-EOT
+    Exact-path redirects that take precedence over redirect_to. Each key is a
+    request path (as received, e.g. '/old/page.html') and each value is the
+    target, either:
+    - a path on the redirect_to hostname: '/new/page'
+    - a hostname with path: 'blog.example.com/new/page'
+
+    Source query parameters are preserved, same as for redirect_to.
+    Use `python -m tools.redirect_map` to import CSV or nginx rewrite lists.
+
+    Note: When set to a non-empty map, a CloudFront Function is deployed.
+    The map is compiled into the function code, so it is bound by the
+    CloudFront Functions 10 KB code size limit (checked at plan time).
+  EOT
+  type        = map(string)
+  default     = {}
+
+  validation {
+    condition = alltrue([
+      for source, target in var.redirect_map :
+      can(regex("^/[^?#]*$", source)) && can(regex(
+        "^(/[^?#]*|[a-z0-9]([a-z0-9-]*[a-z0-9])?(\\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*(/[^?#]*)?)$",
+        target
+      ))
+    ])
+    error_message = <<-EOT
+      redirect_map keys must be paths starting with '/'. Values must be a path
+      starting with '/' or a hostname optionally followed by a path.
+      Query strings, fragments and protocols are not supported.
+      Examples: { "/old" = "/new", "/legacy/page" = "docs.example.com/page" }
+    EOT
+  }
+}
+
+variable "redirect_rules" {
+  description = <<-EOT
+    Ordered wildcard redirect rules, matched by longest source prefix.
+    Each rule has:
+    - source: path prefix ending in '/*', e.g. '/blog/*' (matches '/blog/'
+      and everything under it)
+    - target: '/path' on the redirect_to hostname or 'hostname/path'. A
+      trailing '*' is replaced by the rest of the request path, e.g.
+      '/blog/*' -> 'news.example.com/articles/*' sends '/blog/2024/post'
+      to 'https://news.example.com/articles/2024/post'.
+
+    Exact redirect_map entries take precedence. When several rules share a
+    source, the first one wins. Source query parameters are preserved.
+
+    Note: When non-empty, a CloudFront Function is deployed. Rules are
+    compiled into the function code and count towards its 10 KB limit.
+  EOT
+  type = list(object({
+    source = string
+    target = string
+  }))
+  default = []
+
+  validation {
+    condition = alltrue([
+      for rule in var.redirect_rules :
+      can(regex("^/([^*?#]*/)?\\*$", rule.source))
+    ])
+    error_message = <<-EOT
+      redirect_rules sources must be path prefixes ending in '/*'.
+      Examples: '/*', '/blog/*', '/docs/v1/*'
+    EOT
+  }
+
+  validation {
+    condition = alltrue([
+      for rule in var.redirect_rules :
+      can(regex(
+        "^(/[^*?#]*|[a-z0-9]([a-z0-9-]*[a-z0-9])?(\\.[a-z0-9]([a-z0-9-]*[a-z0-9])?)*(/[^*?#]*)?)$",
+        trimsuffix(rule.target, "*")
+      )) && (!endswith(rule.target, "*") || endswith(rule.target, "/*"))
+    ])
+    error_message = <<-EOT
+      redirect_rules targets must be a path starting with '/' or a hostname
+      optionally followed by a path, with an optional trailing '/*'.
+      Query strings, fragments and protocols are not supported.
+      Examples: '/new/*', 'news.example.com/articles/*', 'docs.example.com/legacy'
+    EOT
+  }
+}
+
+variable "create_key_value_store" {
+  description = <<-EOT
+    Create a CloudFront KeyValueStore for redirect entries and associate it
+    with the CloudFront Function. Entries can then be changed without
+    republishing the function:
+    - path keys ('/old/page') hold an exact target, same format as
+      redirect_map values
+    - host keys ('www.example.com') replace redirect_to for that host
+
+    Lookup order: redirect_map, KeyValueStore path, redirect_rules,
+    KeyValueStore host, then redirect_to. Populate the store with `python -m tools.kvs_sync`.
+
+    Note: When true, a CloudFront Function is deployed to handle redirects.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "single_hop_http_redirect" {
+  description = <<-EOT
+    Redirect plain-HTTP requests straight to https://<redirect_to>/... in a
+    single response.
+
+    - false (default): CloudFront first upgrades http://<source>/... to
+      https://<source>/... (viewer protocol policy), and only the HTTPS
+      request is redirected to the target. Two hops.
+    - true: CloudFront accepts HTTP requests and returns the final redirect
+      directly. One hop, saving a round trip and a TLS handshake on the
+      source domain.
+
+    Works in both S3 routing-rule mode and CloudFront Function mode; paths
+    and query strings are preserved the same way as for HTTPS requests.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "edge_only" {
+  description = <<-EOT
+    Answer every request, GET included, with the CloudFront Function and
+    create no S3 bucket or website configuration.
+
+    - false (default): without other function features, redirects come from
+      S3 website routing rules; cache misses go to the S3 website endpoint
+      over HTTP in the bucket's region.
+    - true: the function builds every redirect at the edge. No origin
+      requests, and five fewer resources per instance. Each request is a
+      function invocation (billed per request).
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "cache_key_query_string_behavior" {
+  description = <<-EOT
+    Function-mode query handling for campaign traffic:
+    - all (default): S3 website redirects are cached per full query string,
+      so every utm_*, gclid or fbclid value is a cache miss and an S3
+      origin fetch.
+    - function: the CloudFront Function builds every redirect from the
+      viewer request at the edge. Redirects are neither cached nor fetched
+      from the origin, so tracking parameters cost one function invocation
+      per request and never reach S3.
+
+    All parameters are copied into the Location header either way. The
+    cache policy always keys on every parameter: a cached S3 redirect
+    carries the query string it was built for, so leaving parameters out of
+    the cache key would hand one viewer's parameters to another.
+  EOT
+  type        = string
+  default     = "all"
+
+  validation {
+    condition     = contains(["all", "function"], var.cache_key_query_string_behavior)
+    error_message = <<-EOT
+      cache_key_query_string_behavior must be one of: all or function.
+    EOT
+  }
+}
+
+variable "cache_policy_id" {
+  description = <<-EOT
+    ID of an existing CloudFront cache policy to use instead of creating one.
+    CloudFront allows 20 custom cache policies per account by default; share one
+    (e.g. from the modules/redirect-policies submodule) across many instances.
+    The policy sets the edge TTL, so the permanent_redirect_ttl /
+    temporary_redirect_ttl of this instance do not change it.
+  EOT
+  type        = string
+  default     = null
+}
+
+variable "response_headers_policy_id" {
+  description = <<-EOT
+    ID of an existing CloudFront response headers policy to use instead of
+    creating one (e.g. from the modules/redirect-policies submodule). The policy
+    sets the security headers and the Cache-Control of S3 website redirects.
+  EOT
+  type        = string
+  default     = null
+}
+
+variable "invalidate_on_change" {
+  description = <<-EOT
+    Invalidate the CloudFront cache when the redirect configuration changes
+    (redirect_to, permanent_redirect, the redirect TTL or Cache-Control, or
+    the switch between S3 and CloudFront Function mode), so cached S3
+    redirects do not keep the old target for up to the redirect TTL.
+
+    The invalidation is created by a local-exec provisioner running
+    `python3 -m tools.invalidation` from the module directory: the machine
+    running Terraform needs python3 with boto3 and AWS credentials allowed
+    to call cloudfront:CreateInvalidation (and cloudfront:GetInvalidation
+    with wait_for_invalidation). Also runs when first enabled.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "invalidation_paths" {
+  description = <<-EOT
+    Paths to invalidate with invalidate_on_change. Coalesced into wildcards
+    (/blog/a and /blog/b become /blog/*) until they fit the CloudFront
+    limits of 3000 paths and 15 wildcard paths in progress, so they go out
+    in one invalidation.
+  EOT
+  type        = list(string)
+  default     = ["/*"]
+
+  validation {
+    condition = length(var.invalidation_paths) > 0 && alltrue([
+      for path in var.invalidation_paths : startswith(path, "/")
+    ])
+    error_message = <<-EOT
+      invalidation_paths must have at least one path, and each path must start with "/".
+    EOT
+  }
+}
+
+variable "wait_for_invalidation" {
+  description = <<-EOT
+    With invalidate_on_change, make terraform apply wait until the
+    invalidation has completed (usually a few minutes, up to 30).
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "invalidation_role_arn" {
+  description = <<-EOT
+    IAM role the invalidate_on_change provisioner assumes (STS AssumeRole)
+    before creating the invalidation. Set it to the role of the AWS
+    provider's assume_role: the provisioner otherwise runs with the
+    credentials of its environment, which may belong to another account
+    and fail with NoSuchDistribution.
+  EOT
+  type        = string
+  default     = null
+
+  validation {
+    condition = (
+      var.invalidation_role_arn == null ||
+      can(regex("^arn:aws[a-z-]*:iam::[0-9]{12}:role/", var.invalidation_role_arn))
+    )
+    error_message = "invalidation_role_arn must be an IAM role ARN."
+  }
+}
+
+variable "diagnostics_headers" {
+  description = <<-EOT
+    Add a Server-Timing header to redirect responses for real-user
+    monitoring. Browsers expose it to scripts through the Resource Timing API
+    only with a Timing-Allow-Origin header; set one in response_headers.
+
+    - S3 website redirects: CloudFront's Server-Timing from the response
+      headers policy. It reports a cache hit or miss, origin DNS, connect
+      and first-byte times, the edge location (cdn-pop) and the request ID
+      (cdn-rid).
+    - CloudFront Function redirects: edge;dur=<function run time in ms>,
+      redirect;desc=function, match;desc=<map, kvs, rule, host, kvs-host or
+      default>, geo;desc=<viewer country> when it picked a geo_redirects
+      host, and rid;desc="<request ID>", after any Server-Timing value from
+      response_headers.
+
+    With response_headers_policy_id, enable server_timing on the supplied
+    policy instead (modules/redirect-policies). Analyze the headers with
+    `python -m tools.server_timing`.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "create_monitoring" {
+  description = <<-EOT
+    Enable CloudFront additional metrics (cache hit rate, origin latency,
+    error rates by status code) on the distribution(s), and create CloudWatch
+    alarms and a dashboard in us-east-1, where CloudFront publishes its
+    metrics. Alarms cover origin latency and the 5xx error rate, plus
+    CloudFront Function compute utilization and throttles when the function
+    is deployed; see monitoring_thresholds.
+
+    Note: Additional metrics are billed per distribution, alarms per alarm
+    and the dashboard per month (see CloudFront and CloudWatch pricing).
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "alarm_actions" {
+  description = <<-EOT
+    ARNs notified when a create_monitoring alarm fires and when it recovers,
+    e.g. SNS topics. The alarms are in us-east-1, so the topics must be too.
+  EOT
+  type        = list(string)
+  default     = []
+}
+
+variable "monitoring_thresholds" {
+  description = <<-EOT
+    Alarm thresholds of create_monitoring. An alarm fires when its metric is
+    above the threshold in 2 of 3 consecutive 5-minute periods (throttles:
+    in any period).
+
+    - origin_latency_ms: p90 latency of cache misses at the S3 origin, in
+      milliseconds (not with edge_only)
+    - error_5xx_rate: percentage of responses with a 5xx status
+    - function_compute_utilization: peak CloudFront Function compute
+      utilization, in percent of its time budget (invocations over 100 are
+      throttled)
+    - function_throttles: throttled function invocations per 5 minutes
+
+    Replay recorded metrics with `python -m tools.monitoring replay` to see
+    which thresholds would have fired.
+  EOT
+  type = object({
+    origin_latency_ms            = optional(number, 1000)
+    error_5xx_rate               = optional(number, 1)
+    function_compute_utilization = optional(number, 70)
+    function_throttles           = optional(number, 0)
+  })
+  default = {}
+}
+
 variable "create_certificate_dns_records" {
   description = <<-EOT
     Whether to create DNS records required for certificate issuance.